@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import inphase
+from inphase.compression import COMPRESSION_SUFFIXES, openFile
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description='Compares size and load time of an experiment file compressed with '
+                                             'gzip, xz and bz2 at different compression levels')
+parser.add_argument('experiment_filename', type=str,
+                    help='uncompressed YAML (.yml) or binary (.ibx) experiment file')
+parser.add_argument('-L', '--levels', type=int, nargs='+', default=[1, 6, 9],
+                    help='compression levels to compare')
+parser.add_argument('-r', '--repeat', type=int, default=3,
+                    help='number of loads per file, the fastest one is reported')
+parser.add_argument('--lazy', action='store_true',
+                    help='also measure iterating over a lazy experiment')
+
+args = parser.parse_args()
+
+
+def loadTime(path, lazy=False):
+    best = None
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        experiment = inphase.Experiment(path, caching=False, lazy=lazy)
+        count = sum(1 for _ in experiment) if lazy else len(experiment)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, count
+
+
+temp_dir = tempfile.mkdtemp()
+try:
+    name = os.path.basename(args.experiment_filename)
+    reference = os.path.join(temp_dir, name)
+    shutil.copy(args.experiment_filename, reference)
+
+    columns = ['compression', 'level', 'size [MiB]', 'ratio', 'compress [s]', 'load [s]']
+    if args.lazy:
+        columns.append('lazy [s]')
+    print(' | '.join(columns))
+
+    size = os.path.getsize(reference)
+    load, count = loadTime(reference)
+    row = ['none', '-', '%.2f' % (size / 2**20), '1.00', '-', '%.3f' % load]
+    if args.lazy:
+        row.append('%.3f' % loadTime(reference, lazy=True)[0])
+    print(' | '.join(row))
+
+    for suffix in sorted(COMPRESSION_SUFFIXES):
+        for level in args.levels:
+            path = reference + suffix
+            start = time.perf_counter()
+            with open(reference, 'rb') as source, openFile(path, 'wb', level=level) as target:
+                shutil.copyfileobj(source, target)
+            compress = time.perf_counter() - start
+
+            load, compressed_count = loadTime(path)
+            if compressed_count != count:
+                raise Exception('%s contains %d instead of %d measurements' % (path, compressed_count, count))
+            row = [suffix[1:], str(level), '%.2f' % (os.path.getsize(path) / 2**20),
+                   '%.2f' % (size / os.path.getsize(path)), '%.3f' % compress, '%.3f' % load]
+            if args.lazy:
+                row.append('%.3f' % loadTime(path, lazy=True)[0])
+            print(' | '.join(row))
+            os.unlink(path)
+finally:
+    shutil.rmtree(temp_dir)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from inphase.binarydecoder import decodeBinaryFile, _decodeBinaryFileRange, _splitBinaryFile
+
+import argparse
+import concurrent.futures
+import itertools
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description='Measures how decoding a binary capture file scales with the number of '
+                                             'processes, compared to workers passing measurements back')
+parser.add_argument('capture_filename', type=str,
+                    help='uncompressed binary capture file, e.g. tests/testdata/serial_data/test_13.txt')
+parser.add_argument('-c', '--copies', type=int, default=20,
+                    help='number of times the capture is repeated in the decoded file')
+parser.add_argument('-p', '--processes', type=int, nargs='+', default=[1, 2, 4, 8],
+                    help='numbers of processes to compare')
+parser.add_argument('-r', '--repeat', type=int, default=3,
+                    help='number of decodes per setting, the fastest one is reported')
+
+args = parser.parse_args()
+
+# captures usually contain some broken frames, they would be reported for every decode
+logging.getLogger('inphase.binarydecoder').setLevel(logging.CRITICAL)
+
+
+def decodeReference(file_name, processes):
+    # workers pass whole measurements back, which the parent has to unpickle
+    borders = _splitBinaryFile(file_name, processes * 4, 1024 * 1024)
+    measurements = list()
+    with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+        parts = executor.map(_decodeBinaryFileRange, itertools.repeat(file_name), borders[:-1], borders[1:],
+                             itertools.repeat(False))
+        for m, r, c in parts:
+            measurements += m
+    return measurements
+
+
+def decodeTime(decode, file_name, processes):
+    best = None
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        measurements = decode(file_name, processes)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(measurements)
+
+
+temp_dir = tempfile.mkdtemp()
+try:
+    file_name = os.path.join(temp_dir, 'capture.bin')
+    with open(args.capture_filename, 'rb') as source, open(file_name, 'wb') as target:
+        data = source.read()
+        for _ in range(args.copies):
+            target.write(data)
+
+    print('%.2f MiB, %d CPUs' % (os.path.getsize(file_name) / 2**20, os.cpu_count()))
+    print(' | '.join(['processes', 'decode [s]', 'measurements/s', 'speedup', 'reference [s]', 'reference speedup']))
+
+    single = None
+    for processes in args.processes:
+        duration, count = decodeTime(lambda f, p: decodeBinaryFile(f, p, timestamp=False)[0], file_name, processes)
+        reference_duration, reference_count = decodeTime(decodeReference, file_name, processes)
+        if reference_count != count:
+            raise Exception('decoded %d instead of %d measurements' % (count, reference_count))
+        if single is None:
+            single = duration
+        print(' | '.join([str(processes), '%.3f' % duration, '%.1f' % (count / duration), '%.2f' % (single / duration),
+                          '%.3f' % reference_duration, '%.2f' % (single / reference_duration)]))
+finally:
+    shutil.rmtree(temp_dir)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from inphase.binarydecoder import SERIAL_FRAME_START, SERIAL_FRAME_END, SERIAL_ESCAPE_BYTE, SERIAL_ESCAPE_ADD
+from inphase.binarydecoder import _unescape
+
+import argparse
+import random
+import timeit
+
+parser = argparse.ArgumentParser(description='Compares the frame unescaping of the binary decoder with the original '
+                                             'list based implementation')
+parser.add_argument('-l', '--length', type=int, default=403,
+                    help='frame length in bytes, a version 2 frame with 200 frequencies has 403 bytes')
+parser.add_argument('-n', '--number', type=int, default=1000,
+                    help='number of frames unescaped per measurement')
+parser.add_argument('-e', '--escape-ratios', type=float, nargs='+', default=[0, 0.1, 0.5],
+                    help='ratios of escape sequences in the frames')
+
+args = parser.parse_args()
+
+
+def randomFrame(rng, length, escape_ratio):
+    # random frame content where escape_ratio of the bytes are escape sequences
+    plain = [b for b in range(256) if b not in (SERIAL_FRAME_START, SERIAL_FRAME_END, SERIAL_ESCAPE_BYTE)]
+    escaped = [(b - SERIAL_ESCAPE_ADD) % 256 for b in (SERIAL_FRAME_START, SERIAL_FRAME_END, SERIAL_ESCAPE_BYTE, 0x05)]
+    frame = bytearray([SERIAL_FRAME_START])
+    while len(frame) < length - 1:
+        if rng.random() < escape_ratio:
+            frame += bytes([SERIAL_ESCAPE_BYTE, rng.choice(escaped)])
+        else:
+            frame.append(rng.choice(plain))
+    frame.append(SERIAL_FRAME_END)
+    return bytes(frame)
+
+
+def unescapeReference(frame):
+    # the original list based implementation
+    indices = [i for i, x in enumerate(frame) if x == SERIAL_ESCAPE_BYTE]
+    for i in indices:
+        frame[i + 1] = (frame[i + 1] + SERIAL_ESCAPE_ADD) % 256
+    return bytearray([i for j, i in enumerate(frame) if j not in indices])
+
+
+rng = random.Random(42)
+print(' | '.join(['escape ratio', 'unescape [frames/s]', 'reference [frames/s]', 'speedup']))
+for escape_ratio in args.escape_ratios:
+    frame = randomFrame(rng, args.length, escape_ratio)
+    if _unescape(bytearray(frame)) != unescapeReference(bytearray(frame)):
+        raise Exception('unescaped frames differ for escape ratio %s' % escape_ratio)
+    duration = timeit.timeit(lambda: _unescape(bytearray(frame)), number=args.number)
+    reference_duration = timeit.timeit(lambda: unescapeReference(bytearray(frame)), number=args.number)
+    print(' | '.join(['%.2f' % escape_ratio, '%.1f' % (args.number / duration),
+                      '%.1f' % (args.number / reference_duration), '%.2f' % (reference_duration / duration)]))
@@ -1,13 +1,30 @@
 from .dataformat import Experiment
 from .dataformat import Measurement
+from .dataformat import ProjectedMeasurement
+from .dataformat import FieldNotLoadedError
 from .dataformat import Node
+from .dataformat import internNode
 from .dataformat import Sample
+from .dataformat import SampleArray
+from .dataformat import validateMeasurements
+from .experimentwriter import ExperimentWriter
+from .experimentset import ExperimentSet
+from .experimentsummary import ExperimentSummary
+from .columnar import ColumnarMeasurements
 from .binarydecoder import decodeBinary
+from .binarydecoder import encodeBinary
+from .binarydecoder import decodeBinaryColumnar
+from .binarydecoder import decodeBinaryFile
+from .binarydecoder import StreamingBinaryDecoder
+from .binarydecoder import BinaryFileIndex
 from .parameterdecoder import decodeParameters
+from .parameterdecoder import ParameterDecoder
+from .demultiplexer import StreamDemultiplexer
 from . import math
 from .measurementprovider import ConstantRateMeasurementProvider
 from .measurementprovider import SerialMeasurementProvider
 from .measurementprovider import BinaryFileMeasurementProvider
+from .measurementprovider import IndexedBinaryFileMeasurementProvider
 from .measurementprovider import InPhaseBridgeMeasurementProvider
 from .measurementprovider import YAMLMeasurementProvider
 from .measurementprovider import SawtoothMeasurementProvider
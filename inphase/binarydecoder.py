@@ -1,6 +1,13 @@
-from inphase.dataformat import Measurement, Node, Sample
-
-from struct import unpack, calcsize
+from inphase.compression import isCompressed, openFile
+from inphase.dataformat import Measurement, Sample
+
+from struct import Struct
+import concurrent.futures
+import functools
+import itertools
+import mmap
+import os
+import numpy as np
 import time
 import logging
 
@@ -12,135 +19,630 @@ SERIAL_FRAME_END       = 0x3E      # ">" in ascii
 SERIAL_ESCAPE_BYTE     = 0x40      # "@" in ascii
 SERIAL_ESCAPE_ADD      = 0x10      # add this to byte after escape
 
+_HEADER = Struct('>BB')  # samples/protocol version, frequency step
+_HEADER_2 = Struct('>3H4B')  # start frequency, frequencies, reflector address, distance, dqi, status
+MINIMUM_FRAME_LENGTH = _HEADER.size + _HEADER_2.size
+
+DEFAULT_CHUNK_SIZE = 64 * 1024  # bytes decoded at once when reading files
+DEFAULT_SPLIT_SIZE = 1024 * 1024  # minimum part size when decoding files in parallel
+
+
+class StreamingBinaryDecoder:
+    """Incrementally decodes binary frames from a byte stream.
+
+    The decoder owns its receive buffer and remembers where it stopped scanning, so feeding a stream in small
+    chunks costs amortized O(bytes) instead of re-scanning the whole unconsumed tail on every call.
+
+    Args:
+        timestamp (bool, optional): Add the current time as timestamp to every decoded measurement.
+    """
+
+    def __init__(self, timestamp=True):
+        self.timestamp = timestamp
+        self._buffer = bytearray()
+        self._pos = 0  # start of unconsumed data in the buffer
+        self._start = -1  # position of the current frame start byte, -1 if none was found yet
+        self._scan = 0  # position from which to continue searching for the frame end byte
+        self._offset = 0  # position of the buffer start in the stream
+
+    @property
+    def remaining(self):
+        """Data that still needs parsing, i.e. the beginning of an incomplete frame."""
+        return bytes(self._buffer[self._pos:])
+
+    def feed(self, data):
+        """Adds data to the stream and returns decoded measurements and clean data that does not contain any other binary data."""
+        measurements = list()
+        clean_data = bytearray()
+
+        for offset, raw_frame, measurement_data in self._frames(data, clean_data):
+            if measurement_data is not None:
+                measurements.append(_toMeasurement(measurement_data, self.timestamp))
+
+        return measurements, clean_data
+
+    def feedColumnar(self, data):
+        """Adds data to the stream and returns decoded measurements as a columnar batch (see :func:`decodeBinaryColumnar`) and clean data."""
+        packets = list()
+        clean_data = bytearray()
+
+        for offset, raw_frame, measurement_data in self._frames(data, clean_data):
+            if measurement_data is not None:
+                packets.append(measurement_data)
+
+        return _toColumnar(packets, self.timestamp), clean_data
+
+    def _frames(self, data, clean_data):
+        # yields stream offset and contents of all complete frames in the stream together with their parsed contents (None if invalid)
+        buf = self._buffer
+        buf += data
+
+        while True:
+            if self._start == -1:
+                self._start = buf.find(SERIAL_FRAME_START, self._pos)
+
+                if self._start == -1:
+                    # no start byte detected
+                    clean_data += buf[self._pos:]
+                    self._pos = len(buf)
+                    break
+
+                self._scan = self._start + 1
+
+            end = buf.find(SERIAL_FRAME_END, self._scan)
+            if end == -1:
+                # no end byte detected, only keep data from the last start byte on
+                last_start = buf.rfind(SERIAL_FRAME_START, self._scan)
+                if last_start != -1:
+                    self._start = last_start
+                clean_data += buf[self._pos:self._start]
+                self._pos = self._start
+                self._scan = len(buf)
+                break
+
+            start = self._start
+            last_start = buf.rfind(SERIAL_FRAME_START, self._scan, end)
+            if last_start != -1:
+                start = last_start
+
+            # if we reach this, next frame is found
+
+            # data before the frame does not contain any more binary frames
+            clean_data += buf[self._pos:start]
+            # extract frame, remaining data is now everything after the current frame
+            raw_frame = buf[start:end + 1]
+            self._pos = end + 1
+            self._start = -1
+
+            measurement_data = _parseFrame(raw_frame)
+            if measurement_data is None:
+                # frame was invalid, add it to clean_data as it might contain other output
+                clean_data += raw_frame
+            yield self._offset + start, raw_frame, measurement_data
+
+        # drop consumed data once it makes up most of the buffer, this keeps the amortized cost linear
+        if self._pos > len(buf) // 2:
+            del buf[:self._pos]
+            self._offset += self._pos
+            if self._start != -1:
+                self._start -= self._pos
+                self._scan -= self._pos
+            self._pos = 0
+
 
 def decodeBinary(data, timestamp=True):
     """Returns parsed measurements from binary data, also returns remaining data that still needs parsing and clean data that does not contain any other binary data."""
+    decoder = StreamingBinaryDecoder(timestamp)
+    measurements, clean_data = decoder.feed(data)
+    return measurements, decoder.remaining, clean_data
+
+
+def encodeBinary(measurements):
+    """Returns the serial frames of measurements, the counterpart of :func:`decodeBinary`.
+
+    Only measurements a node could have sent can be encoded: equally spaced integer start frequency with a step of
+    0.5 or a whole number of MHz, one to four PMU values per sample (or one PMU value and one RSSI value for protocol
+    version 2) and a reflector address, distance, dqi and status that fit into the frame header.
+
+    Raises:
+        ValueError: If a measurement can not be represented as a frame.
+    """
+    return b''.join(_encodeFrame(measurement) for measurement in measurements)
+
+
+def decodeBinaryColumnar(data, timestamp=True):
+    """Returns parsed measurements from binary data as a batch of NumPy arrays, also returns remaining data that still needs parsing and clean data that does not contain any other binary data.
+
+    Unlike :func:`decodeBinary` no :class:`Measurement` objects are created. The batch is a dict with the following entries:
+        * `pmu_values`: int8 array of shape (n_frames, n_freqs, n_samples)
+        * `rssi`: uint8 array of shape (n_frames, n_freqs), only filled for frames with protocol version 2
+        * `frequency_start`, `frequency_step`: start frequency and step width of every frame in MHz
+        * `frequency_count`, `sample_count`: number of frequencies and samples per frequency of every frame
+        * `reflector`, `dqi`, `measured_distance` (in millimeters), `status`, `protocol_version`: one value per frame
+        * `timestamp`: decoding time of every frame, only present if `timestamp` is set
+
+    Frames with fewer frequencies or samples than the largest frame in the batch are padded with zeros.
+    """
+    decoder = StreamingBinaryDecoder(timestamp)
+    batch, clean_data = decoder.feedColumnar(data)
+    return batch, decoder.remaining, clean_data
+
+
+INDEX_SUFFIX = '.idx'  # file name suffix of frame offset index sidecar files
+
+
+class BinaryFileIndex:
+    """Frame offset index of a binary capture file for random access.
+
+    The capture is scanned once and the byte offset, length, reflector address and protocol version of every valid
+    frame are stored in a sidecar file next to the capture. The index is rebuilt if the capture changed since.
+    Afterwards arbitrary frame ranges or the frames of a single reflector can be decoded without touching the rest
+    of the file. Compressed capture files can not be accessed randomly and are not supported.
+
+    Args:
+        file_name (str): binary capture file
+        index_path (str, optional): sidecar file, defaults to `file_name` + '.idx'
+        rebuild (bool, optional): ignore an existing sidecar file
+    """
+
+    dtype = np.dtype([('offset', '<u8'), ('length', '<u4'), ('reflector', '<u2'), ('protocol_version', 'u1')])
+
+    def __init__(self, file_name, index_path=None, rebuild=False):
+        self.file_name = file_name
+        self.index_path = index_path if index_path is not None else file_name + INDEX_SUFFIX
+        if isCompressed(file_name):
+            raise Exception('compressed capture files can not be indexed, decompress %s first' % file_name)
+
+        file_size = os.path.getsize(file_name)
+        self.entries = None
+
+        if not rebuild and os.path.exists(self.index_path):
+            # only use the index if it is newer than the capture and was built for the same amount of data
+            if os.path.getmtime(file_name) < os.path.getmtime(self.index_path):
+                with np.load(self.index_path) as index:
+                    if index['file_size'] == file_size:
+                        self.entries = index['entries']
+
+        if self.entries is None:
+            self.entries = self._scan()
+            with open(self.index_path, 'wb') as f:
+                np.savez(f, entries=self.entries, file_size=file_size)
+
+    def _scan(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        entries = list()
+        decoder = StreamingBinaryDecoder(timestamp=False)
+        clean_data = bytearray()
+        with open(self.file_name, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # empty files can not be mapped
+                return np.zeros(0, dtype=self.dtype)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for offset in range(0, len(data), chunk_size):
+                    for frame_offset, raw_frame, measurement_data in decoder._frames(data[offset:offset + chunk_size], clean_data):
+                        if measurement_data is not None:
+                            entries.append((frame_offset, len(raw_frame), measurement_data['reflector_address'], measurement_data['protocol_version']))
+                    # clean data is not needed for the index
+                    del clean_data[:]
+        return np.array(entries, dtype=self.dtype)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def select(self, start=None, stop=None, reflector=None):
+        """Returns the index entries of frames `start` to `stop` (frame numbers, like slicing), optionally only those of one reflector."""
+        entries = self.entries[start:stop]
+        if reflector is not None:
+            entries = entries[entries['reflector'] == reflector]
+        return entries
+
+    def iterMeasurements(self, start=None, stop=None, reflector=None, timestamp=True):
+        """Decodes frames `start` to `stop` (frame numbers, like slicing), optionally only those of one reflector, and yields the measurements."""
+        entries = self.select(start, stop, reflector)
+        if len(entries) == 0:
+            return
+        with open(self.file_name, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for offset, length in zip(entries['offset'].tolist(), entries['length'].tolist()):
+                    measurement_data = _parseFrame(data[offset:offset + length])
+                    if measurement_data is None:
+                        raise Exception('index of %s does not match the file contents' % self.file_name)
+                    yield _toMeasurement(measurement_data, timestamp)
+
+    def decode(self, start=None, stop=None, reflector=None, timestamp=True):
+        """Returns a list of the measurements from frames `start` to `stop`, see :meth:`iterMeasurements`."""
+        return list(self.iterMeasurements(start, stop, reflector, timestamp))
+
+
+def iterBinaryFile(file_name, chunk_size=DEFAULT_CHUNK_SIZE, timestamp=True):
+    """Decodes a binary capture file lazily.
+
+    The file is memory-mapped and fed to a :class:`StreamingBinaryDecoder` in chunks of `chunk_size` bytes, so only
+    the measurements of one chunk are held in memory at a time. Compressed files are decompressed chunk by chunk
+    instead, see :func:`inphase.compression.openFile`.
+
+    Yields:
+        * list of measurements decoded from the chunk
+        * clean data of the chunk that does not contain any binary data
+    """
+    decoder = StreamingBinaryDecoder(timestamp)
+    for chunk in _iterFileChunks(file_name, 0, None, chunk_size):
+        yield decoder.feed(chunk)
+
+
+def decodeBinaryFile(file_name, processes=None, timestamp=True, split_size=DEFAULT_SPLIT_SIZE):
+    """Decodes a binary capture file with a pool of processes.
+
+    The file is split in front of frame start bytes. As escaped frame contents never contain a start byte, no frame
+    can straddle such a border. The parts are decoded in parallel into columnar batches (see
+    :func:`decodeBinaryColumnar`), which are much cheaper to pass back from the workers than measurements, and merged
+    in their original order. The measurements are built from the batches in the calling process while the workers
+    decode the following parts. Data of incomplete frames at the end of a part becomes clean data like in a
+    sequential run. Compressed files can not be split without decompressing them, they are decompressed and decoded
+    chunk by chunk in the calling process, like files with a single part or with a single process.
+
+    Args:
+        file_name (str): binary capture file
+        processes (int, optional): number of worker processes, defaults to the number of CPUs
+        timestamp (bool, optional): Add the current time as timestamp to every decoded measurement.
+        split_size (int, optional): minimum size of a part in bytes
+
+    Returns:
+        The same as :func:`decodeBinary` for the whole file contents.
+    """
+    if processes is None:
+        processes = os.cpu_count()
+
+    if processes == 1 or isCompressed(file_name):
+        return _decodeBinaryFileRange(file_name, 0, None, timestamp)
+
+    borders = _splitBinaryFile(file_name, processes * 4, split_size)
+    if len(borders) < 3:
+        # empty file or a single part
+        return _decodeBinaryFileRange(file_name, 0, None, timestamp)
+
     measurements = list()
-    remaining_data = data
+    remaining_data = bytes()
     clean_data = bytearray()
 
-    while True:
-        start = remaining_data.find(SERIAL_FRAME_START)
-
-        if start == -1:
-            # no start byte detected
+    with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+        parts = executor.map(_decodeBinaryFileRangeColumnar, itertools.repeat(file_name), borders[:-1], borders[1:])
+        for batches, r, c in parts:
+            for batch in batches:
+                measurements += _fromColumnar(batch, timestamp)
+            # the incomplete frame of the previous part was not completed by this part
             clean_data += remaining_data
-            remaining_data = bytearray()
-            break
-
-        end = remaining_data.find(SERIAL_FRAME_END, start)
-        if end == -1:
-            # no end byte detected
-            clean_data += remaining_data[0:start]
-            remaining_data = remaining_data[start:]
-            start = remaining_data.rfind(SERIAL_FRAME_START)
-            if start != -1:
-                clean_data += remaining_data[0:start]
-                remaining_data = remaining_data[start:]
-            break
-
-        last_start = remaining_data.rfind(SERIAL_FRAME_START, start, end)
-        if last_start != -1:
-            if last_start > start:
-                start = last_start
+            clean_data += c
+            remaining_data = r
 
-        # if we reach this, next frame is found
+    return measurements, remaining_data, clean_data
 
-        # remove data before the frame from remaining data, it does not contain any more binary frames
-        clean_data += remaining_data[0:start]
-        # extract frame from remaining data
-        raw_frame = remaining_data[start:end + 1]
-        # remaining data is now everything after the current frame
-        remaining_data = remaining_data[end + 1:]
 
-        if len(raw_frame) == 2:
-            # we have found an empty frame
-            logger.error("frame invalid! no data between start and stop symbol.")
-            clean_data += raw_frame
-            continue
+def _splitBinaryFile(file_name, parts, split_size):
+    # returns the borders of up to the given number of parts, each border is in front of a frame start byte
+    file_size = os.path.getsize(file_name)
+    if file_size == 0:
+        return []
 
-        # now parse the frame contents
-        frame = bytearray(raw_frame)
+    parts = max(1, min(parts, file_size // split_size))
+    borders = [0]
+    with open(file_name, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for i in range(1, parts):
+                border = data.find(bytes([SERIAL_FRAME_START]), max(i * file_size // parts, borders[-1] + 1))
+                if border == -1:
+                    break
+                borders.append(border)
+    borders.append(file_size)
+    return borders
 
-        # remove all byte stuffing instances
-        frame = _unescape(frame)
 
-        # unpack the byte sin the frame
-        measurement_data = _parsePacket(frame)
+def _decodeBinaryFileRange(file_name, begin, end, timestamp):
+    decoder = StreamingBinaryDecoder(timestamp)
+    measurements = list()
+    clean_data = bytearray()
+    for chunk in _iterFileChunks(file_name, begin, end, DEFAULT_CHUNK_SIZE):
+        m, c = decoder.feed(chunk)
+        measurements += m
+        clean_data += c
+    return measurements, decoder.remaining, clean_data
 
-        if not measurement_data:
-            # frame was invalid, this means byte were lost on serial connection or we found frame delimiter that do not actually delimit a frame at all
-            # add the frame to clean_data, as it is not a valid frame and might contain other output
-            clean_data += raw_frame
-            continue
 
-        # set up a measurement in the correct data format
-        reflector = Node({
-            'uid': measurement_data['reflector_address']
-        })
+def _decodeBinaryFileRangeColumnar(file_name, begin, end):
+    # like _decodeBinaryFileRange, but returns a columnar batch per chunk, timestamps are added by the caller
+    decoder = StreamingBinaryDecoder(timestamp=False)
+    batches = list()
+    clean_data = bytearray()
+    for chunk in _iterFileChunks(file_name, begin, end, DEFAULT_CHUNK_SIZE):
+        batch, c = decoder.feedColumnar(chunk)
+        if len(batch['reflector']):
+            batches.append(batch)
+        clean_data += c
+    return batches, decoder.remaining, clean_data
+
+
+def _iterFileChunks(file_name, begin, end, chunk_size):
+    # yields the bytes from begin to end (None for the end of the file) in chunks, memory-mapped or decompressed
+    if isCompressed(file_name):
+        with openFile(file_name, 'rb') as f:
+            f.seek(begin)
+            remaining = end - begin if end is not None else None
+            while remaining is None or remaining > 0:
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        return
+
+    with open(file_name, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            # empty files can not be mapped
+            return
+        end = size if end is None else min(end, size)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for offset in range(begin, end, chunk_size):
+                yield data[offset:min(offset + chunk_size, end)]
+
+
+def _parseFrame(raw_frame):
+    if len(raw_frame) == 2:
+        # we have found an empty frame
+        logger.error("frame invalid! no data between start and stop symbol.")
+        return None
+
+    # remove all byte stuffing instances
+    frame = _unescape(bytearray(raw_frame))
 
-        samples = list()
+    # unpack the bytes in the frame
+    measurement_data = _parsePacket(frame)
 
-        if 'rssi' in measurement_data:
-            for freq, values, rssi in zip(measurement_data['frequencies'], measurement_data['values'], measurement_data['rssi']):
-                samples.append(Sample({
-                    'frequency': freq,
-                    'pmu_values': values,
-                    'rssi': rssi
-                }))
+    if not measurement_data:
+        # frame was invalid, this means byte were lost on serial connection or we found frame delimiter that do not actually delimit a frame at all
+        return None
+
+    return measurement_data
+
+
+def _toMeasurement(measurement_data, timestamp=True):
+    # set up a measurement in the correct data format, the decoded values need no validation
+    reflector = {
+        'uid': measurement_data['reflector_address']
+    }
+
+    samples = list()
+
+    frequencies = measurement_data['frequencies'].tolist()
+    values_list = measurement_data['values'].tolist()
+
+    if 'rssi' in measurement_data:
+        for freq, values, rssi in zip(frequencies, values_list, measurement_data['rssi'].tolist()):
+            samples.append(Sample.trusted({
+                'frequency': freq,
+                'pmu_values': values,
+                'rssi': rssi
+            }))
+    else:
+        for freq, values in zip(frequencies, values_list):
+            samples.append(Sample.trusted({
+                'frequency': freq,
+                'pmu_values': values
+            }))
+
+    measurement = Measurement.trusted({
+        'dqi': measurement_data['dist_quality'],
+        'measured_distance': measurement_data['dist_meter'] * 1000 + measurement_data['dist_centimeter'] * 10,
+        'reflector': reflector,
+        'samples': samples
+    })
+
+    if timestamp:
+        measurement['timestamp'] = time.time()
+
+    return measurement
+
+
+def _toColumnar(packets, timestamp=True):
+    n_frames = len(packets)
+    n_freqs = max((p['measurements'] for p in packets), default=0)
+    n_samples = max((p['samples'] for p in packets), default=0)
+
+    batch = {
+        'pmu_values': np.zeros((n_frames, n_freqs, n_samples), dtype=np.int8),
+        'rssi': np.zeros((n_frames, n_freqs), dtype=np.uint8),
+        'frequency_start': np.array([p['frequency_start'] for p in packets], dtype=np.float64),
+        'frequency_step': np.array([p['step'] for p in packets], dtype=np.float64),
+        'frequency_count': np.array([p['measurements'] for p in packets], dtype=np.uint16),
+        'sample_count': np.array([p['samples'] for p in packets], dtype=np.uint8),
+        'reflector': np.array([p['reflector_address'] for p in packets], dtype=np.uint16),
+        'dqi': np.array([p['dist_quality'] for p in packets], dtype=np.uint8),
+        'measured_distance': np.array([p['dist_meter'] * 1000 + p['dist_centimeter'] * 10 for p in packets], dtype=np.int32),
+        'status': np.array([p['status'] for p in packets], dtype=np.uint8),
+        'protocol_version': np.array([p['protocol_version'] for p in packets], dtype=np.uint8),
+    }
+
+    for i, p in enumerate(packets):
+        batch['pmu_values'][i, :p['measurements'], :p['samples']] = p['values']
+        if 'rssi' in p:
+            batch['rssi'][i, :p['measurements']] = np.ravel(p['rssi'])
+
+    if timestamp:
+        batch['timestamp'] = np.full(n_frames, time.time())
+
+    return batch
+
+
+def _fromColumnar(batch, timestamp=True):
+    # yields the measurements of a columnar batch, equal to the ones _toMeasurement returns for its frames
+    columns = zip(batch['frequency_start'].tolist(), batch['frequency_step'].tolist(),
+                  batch['frequency_count'].tolist(), batch['sample_count'].tolist(), batch['reflector'].tolist(),
+                  batch['dqi'].tolist(), batch['measured_distance'].tolist(), batch['protocol_version'].tolist())
+    for i, (start, step, n_freqs, n_samples, reflector, dqi, distance, protocol_version) in enumerate(columns):
+        # like in _parsePacket the frequencies are integers unless the step is 0.5 MHz
+        frequencies = (int(start) + np.arange(n_freqs) * (int(step) if step.is_integer() else step)).tolist()
+        values_list = batch['pmu_values'][i, :n_freqs, :n_samples].tolist()
+
+        if protocol_version == 2:
+            rssi_list = batch['rssi'][i, :n_freqs, np.newaxis].tolist()
+            samples = [{'frequency': freq, 'pmu_values': values, 'rssi': rssi}
+                       for freq, values, rssi in zip(frequencies, values_list, rssi_list)]
         else:
-            for freq, values in zip(measurement_data['frequencies'], measurement_data['values']):
-                samples.append(Sample({
-                    'frequency': freq,
-                    'pmu_values': values
-                }))
-
-        measurement = Measurement({
-            'dqi': measurement_data['dist_quality'],
-            'measured_distance': measurement_data['dist_meter'] * 1000 + measurement_data['dist_centimeter'] * 10,
-            'reflector': reflector,
+            samples = [{'frequency': freq, 'pmu_values': values} for freq, values in zip(frequencies, values_list)]
+
+        # the samples and the node are copied to their classes
+        measurement = Measurement.trusted({
+            'dqi': dqi,
+            'measured_distance': distance,
+            'reflector': {'uid': reflector},
             'samples': samples
         })
 
         if timestamp:
             measurement['timestamp'] = time.time()
 
-        measurements.append(measurement)
+        yield measurement
 
-    return measurements, remaining_data, clean_data
+
+def _encodeFrame(measurement, strict=True):
+    # returns the escaped frame of a measurement, if not strict, header fields that do not fit are set to 0
+    samples = measurement.get('samples')
+    if not samples:
+        raise ValueError('measurement has no samples')
+
+    values = np.array([s.get('pmu_values') for s in samples])
+    if values.ndim != 2 or values.dtype.kind not in 'iu' or values.min() < -128 or values.max() > 127:
+        raise ValueError('pmu_values are not lists of equal length with 8 bit integers')
+    values = values.astype(np.int8)
+
+    measurements, samples_per_frequency = values.shape
+    protocol_version = 1
+    if all('rssi' in s for s in samples):
+        rssi = np.array([s['rssi'] for s in samples])
+        if rssi.shape != (measurements, 1) or rssi.dtype.kind not in 'iu' or rssi.min() < 0 or rssi.max() > 255:
+            raise ValueError('rssi values do not fit protocol version 2')
+        protocol_version = 2
+    elif any('rssi' in s for s in samples):
+        raise ValueError('rssi values are missing for some samples')
+
+    if protocol_version == 1 and not 1 <= samples_per_frequency <= 4:
+        raise ValueError('%d pmu values per sample do not fit protocol version 1' % samples_per_frequency)
+    if protocol_version == 2 and samples_per_frequency != 1:
+        raise ValueError('%d pmu values per sample do not fit protocol version 2' % samples_per_frequency)
+
+    frequencies = [s.get('frequency') for s in samples]
+    frequency_start = frequencies[0]
+    step = frequencies[1] - frequencies[0] if measurements > 1 else 1
+    if not isinstance(frequency_start, (int, float)) or frequency_start != int(frequency_start) or not 0 <= frequency_start <= 0xFFFF:
+        raise ValueError('start frequency does not fit into the frame header')
+    if step != 0.5 and (step != int(step) or not 1 <= step <= 0xFF):
+        raise ValueError('frequency step does not fit into the frame header')
+    if frequencies != (int(frequency_start) + np.arange(measurements) * step).tolist():
+        raise ValueError('frequencies are not equally spaced')
+
+    def header_field(value, maximum, name):
+        if isinstance(value, (int, float)) and value == int(value) and 0 <= value <= maximum:
+            return int(value)
+        if strict:
+            raise ValueError('%s does not fit into the frame header' % name)
+        return 0
+
+    reflector_address = header_field(measurement.get('reflector', {}).get('uid'), 0xFFFF, 'reflector address')
+    distance = header_field(measurement.get('measured_distance', 0), 0xFF * 1000 + 990, 'measured_distance')
+    if distance % 10 != 0:
+        distance = header_field(None, 0, 'measured_distance')
+    dist_quality = header_field(measurement.get('dqi', 0), 0xFF, 'dqi')
+    status = header_field(measurement.get('status', 0), 0xFF, 'status')
+
+    frame = bytearray(_HEADER.pack(5 if protocol_version == 2 else samples_per_frequency, 0 if step == 0.5 else int(step)))
+    frame += _HEADER_2.pack(int(frequency_start), measurements, reflector_address, distance // 1000, distance % 1000 // 10, dist_quality, status)
+    payload = np.zeros(1, dtype=_payloadLayout(protocol_version, measurements, samples_per_frequency))
+    payload['values'] = values
+    if protocol_version == 2:
+        payload['rssi'] = rssi
+    frame += payload.tobytes()
+
+    return bytes([SERIAL_FRAME_START]) + _escape(frame) + bytes([SERIAL_FRAME_END])
+
+
+def _escape(frame):
+    data = np.frombuffer(frame, dtype=np.uint8)
+
+    # find all bytes that would be taken for frame delimiters or escape bytes
+    escapes = (data == SERIAL_FRAME_START) | (data == SERIAL_FRAME_END) | (data == SERIAL_ESCAPE_BYTE)
+    if not escapes.any():
+        return bytes(frame)
+
+    data = data.copy()
+    data[escapes] -= SERIAL_ESCAPE_ADD
+    return np.insert(data, np.flatnonzero(escapes), SERIAL_ESCAPE_BYTE).tobytes()
 
 
 def _unescape(frame):
+    if SERIAL_ESCAPE_BYTE not in frame:
+        return frame
+
+    data = np.frombuffer(frame, dtype=np.uint8)
+
     # find all escape bytes
-    indices = [i for i, x in enumerate(frame) if x == SERIAL_ESCAPE_BYTE]
+    escapes = data == SERIAL_ESCAPE_BYTE
+
+    # unescape all bytes after escape bytes, uint8 arithmetic wraps around at 256
+    data = data.copy()
+    data[1:][escapes[:-1]] += SERIAL_ESCAPE_ADD
+
+    # remove all escape bytes found in the first step
+    return bytearray(data[~escapes].tobytes())
+
+
+def _protocolVersion(samples):
+    # returns protocol version and number of samples for the version field of a frame, None for an unknown version
+    if 1 <= samples <= 4:
+        return 1, samples
+    elif samples == 5:
+        return 2, 1
+    return None, samples
 
-    # unescape all bytes after escape bytes
-    for i in indices:
-        frame[i + 1] = (frame[i + 1] + SERIAL_ESCAPE_ADD) % 256
 
-    # remove all escape bytes fround in the first step
-    frame = bytearray([i for j, i in enumerate(frame) if j not in indices])
+def _escapedFrameLengthLimit(data):
+    # upper bound for the length of an escaped frame starting with data (start byte excluded), None if the header is invalid
+    header = _unescape(bytearray(data[:2 * MINIMUM_FRAME_LENGTH]))[:MINIMUM_FRAME_LENGTH]
+    if len(header) < MINIMUM_FRAME_LENGTH:
+        return None
+
+    samples, step = _HEADER.unpack_from(header)
+    protocol_version, samples = _protocolVersion(samples)
+    if protocol_version is None:
+        return None
+    measurements = _HEADER_2.unpack_from(header, _HEADER.size)[1]
 
-    return frame
+    # every byte might be escaped, plus start and end byte
+    return 2 * (MINIMUM_FRAME_LENGTH + _payloadLayout(protocol_version, measurements, samples).itemsize) + 2
+
+
+@functools.lru_cache(maxsize=128)
+def _payloadLayout(protocol_version, measurements, samples):
+    # the payload following the frame header, compiled once per protocol version and frame geometry
+    fields = [('values', 'i1', (measurements, samples))]
+    if protocol_version == 2:
+        # there is one extra RSSI value per sample in version 2
+        fields.append(('rssi', 'u1', (measurements, 1)))
+    return np.dtype(fields)
 
 
 def _parsePacket(frame):
     protocol_version = None  # keeps track of the protocol version of the received frame
 
     # remove frame delimiter
-    frame = frame[1:-1]
+    frame = memoryview(frame)[1:-1]
 
     data = dict()
 
-    unpack_str = '>BB'
-    unpack_str_2 = '>3H4B'
-    minimum_frame_length = calcsize(unpack_str) + calcsize(unpack_str_2)
-
-    if len(frame) < minimum_frame_length:
-        logger.error("frame invalid! length was: %d, minimum length is: %d", len(frame), minimum_frame_length)
+    if len(frame) < MINIMUM_FRAME_LENGTH:
+        logger.error("frame invalid! length was: %d, minimum length is: %d", len(frame), MINIMUM_FRAME_LENGTH)
         return None
 
-    samples, step = unpack(unpack_str, frame[0:calcsize(unpack_str)])
+    samples, step = _HEADER.unpack_from(frame)
     if samples <= 0:
         logger.error("invalid number of samples/protocol version: %d", samples)
         return None
@@ -153,21 +655,20 @@ def _parsePacket(frame):
         logger.error("unknown protocol version, version field is: %d", samples)
         return None
 
-    frequency_start, measurements, reflector_address, dist_meter, dist_centimeter, dist_quality, status = unpack(unpack_str_2, frame[calcsize(unpack_str):calcsize(unpack_str) + calcsize(unpack_str_2)])
+    frequency_start, measurements, reflector_address, dist_meter, dist_centimeter, dist_quality, status = _HEADER_2.unpack_from(frame, _HEADER.size)
 
     if (step == 0):  # by definition 0 step size is 0.5
         step = 0.5
 
-    if protocol_version == 1:
-        expected_frame_length = measurements * samples + minimum_frame_length
-    elif protocol_version == 2:
-        # there is one extra RSSI value per sample in version 2
-        expected_frame_length = measurements * samples * 2 + minimum_frame_length
+    layout = _payloadLayout(protocol_version, measurements, samples)
+    expected_frame_length = layout.itemsize + MINIMUM_FRAME_LENGTH
 
     if (expected_frame_length != len(frame)):
         logger.error("frame invalid! length was: %d, expected length is: %d", len(frame), expected_frame_length)
         return None
 
+    data['protocol_version'] = protocol_version
+    data['frequency_start'] = frequency_start
     data['measurements'] = measurements
     data['samples'] = samples
     data['step'] = step
@@ -179,23 +680,11 @@ def _parsePacket(frame):
 
     logger.debug(data)
 
-    data['frequencies'] = list()
-
-    for i in range(measurements):
-        data['frequencies'].append(frequency_start + i * step)
+    data['frequencies'] = frequency_start + np.arange(measurements) * step
 
-    data['values'] = list()
-    if protocol_version == 1:
-        values = unpack('>' + str(measurements * samples) + 'b', frame[minimum_frame_length:])
-    elif protocol_version == 2:
-        data['rssi'] = list()
-        values = unpack('>' + str(measurements * samples) + 'b' + str(measurements) + 'B', frame[minimum_frame_length:])
-
-    for i in range(measurements):
-        data['values'].append(list())
-        for j in range(samples):
-            data['values'][i].append(values[i * samples + j])
-        if protocol_version == 2:
-            data['rssi'].append([values[measurements * samples + i]])
+    payload = np.frombuffer(frame, dtype=layout, count=1, offset=MINIMUM_FRAME_LENGTH)[0]
+    data['values'] = payload['values']
+    if protocol_version == 2:
+        data['rssi'] = payload['rssi']
 
     return data
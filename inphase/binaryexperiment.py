@@ -0,0 +1,162 @@
+from inphase.binarydecoder import _encodeFrame, _parseFrame, _toMeasurement
+from inphase.compression import openFile
+from inphase.dataformat import Measurement, _internNodes, validateMeasurements
+
+from struct import Struct
+import collections.abc
+import json
+import logging
+import lzma
+import os
+
+logger = logging.getLogger(__name__)
+
+BINARY_EXPERIMENT_SUFFIX = '.ibx'  # file name suffix of new binary experiment files
+BINARY_EXPERIMENT_MAGIC = b'INPHASEX'
+BINARY_EXPERIMENT_VERSION = 1
+
+_FILE_HEADER = Struct('<8sH')  # magic, format version
+_RECORD_HEADER = Struct('<II')  # frame length, metadata length
+
+# keys of a decoded frame that can be overridden without converting the measurement again
+_SCALAR_KEYS = frozenset(['dqi', 'measured_distance', 'timestamp', 'real_distance', 'real_nlos', 'status'])
+
+
+def isBinaryExperiment(path):
+    """Returns whether path is an existing binary experiment file, which may be compressed."""
+    try:
+        with openFile(path, 'rb') as f:
+            return f.read(len(BINARY_EXPERIMENT_MAGIC)) == BINARY_EXPERIMENT_MAGIC
+    except (OSError, EOFError, lzma.LZMAError):
+        # also raised for files that are not compressed like their name says
+        return False
+
+
+def createBinaryExperiment(path):
+    """Creates an empty binary experiment file."""
+    with openFile(path, 'wb') as f:
+        f.write(_FILE_HEADER.pack(BINARY_EXPERIMENT_MAGIC, BINARY_EXPERIMENT_VERSION))
+
+
+def appendBinaryExperiment(path, measurements):
+    """Appends measurements to a binary experiment file.
+
+    Every measurement is stored as its serial frame (see :func:`inphase.binarydecoder.encodeBinary`) followed by a
+    JSON metadata block holding everything the frame can not represent, e.g. timestamp, initiator and reflector
+    nodes, real_distance and real_nlos. Measurements that do not fit into a frame at all are stored as metadata only,
+    so no field is lost.
+    """
+    new = not os.path.exists(path) or os.path.getsize(path) == 0
+    with openFile(path, 'ab') as f:
+        if new:
+            f.write(_FILE_HEADER.pack(BINARY_EXPERIMENT_MAGIC, BINARY_EXPERIMENT_VERSION))
+        f.write(b''.join(_encodeRecord(measurement) for measurement in measurements))
+
+
+def iterBinaryExperiment(path):
+    """Yields the measurements of a binary experiment file, one record is read at a time."""
+    with openFile(path, 'rb') as f:
+        header = f.read(_FILE_HEADER.size)
+        if len(header) < _FILE_HEADER.size:
+            raise Exception('binary experiment file is truncated')
+        magic, version = _FILE_HEADER.unpack(header)
+        if magic != BINARY_EXPERIMENT_MAGIC:
+            raise Exception('file is no binary experiment file')
+        if version != BINARY_EXPERIMENT_VERSION:
+            raise Exception('unsupported binary experiment format version %d' % version)
+
+        # identical nodes of this file share their values, see inphase.dataformat.internNode
+        registry = dict()
+        while True:
+            record_header = f.read(_RECORD_HEADER.size)
+            if not record_header:
+                break
+            if len(record_header) < _RECORD_HEADER.size:
+                raise Exception('binary experiment file is truncated')
+            frame_length, metadata_length = _RECORD_HEADER.unpack(record_header)
+            record = f.read(frame_length + metadata_length)
+            if len(record) < frame_length + metadata_length:
+                raise Exception('binary experiment file is truncated')
+
+            yield _decodeRecord(record[:frame_length], record[frame_length:], registry)
+
+
+def countBinaryExperiment(path):
+    """Returns the number of measurements of a binary experiment file without decoding them."""
+    count = 0
+    offset = _FILE_HEADER.size
+    with openFile(path, 'rb') as f:
+        # only seeks forward, compressed files are decompressed once
+        f.seek(offset)
+        while True:
+            record_header = f.read(_RECORD_HEADER.size)
+            if len(record_header) < _RECORD_HEADER.size:
+                break
+            frame_length, metadata_length = _RECORD_HEADER.unpack(record_header)
+            offset += _RECORD_HEADER.size + frame_length + metadata_length
+            f.seek(offset)
+            count += 1
+        size = f.seek(0, 2)
+    if offset != max(size, _FILE_HEADER.size):
+        raise Exception('binary experiment file is truncated')
+    return count
+
+
+def readBinaryExperiment(path):
+    """Returns a list of all measurements of a binary experiment file."""
+    return list(iterBinaryExperiment(path))
+
+
+def _encodeRecord(measurement):
+    try:
+        frame = _encodeFrame(measurement, strict=False)
+        decoded = _toMeasurement(_parseFrame(frame), timestamp=False)
+    except ValueError:
+        frame = b''
+        decoded = dict()
+
+    # only store what does not survive the round trip through the frame
+    metadata = dict()
+    fields = {key: value for key, value in measurement.items() if key not in decoded or decoded[key] != value}
+    if fields:
+        metadata['fields'] = fields
+    drop = [key for key in decoded if key not in measurement]
+    if drop:
+        metadata['drop'] = drop
+
+    metadata = json.dumps(metadata, separators=(',', ':'), default=_toJSON).encode() if metadata else b''
+    return _RECORD_HEADER.pack(len(frame), len(metadata)) + frame + metadata
+
+
+def _toJSON(value):
+    # a SampleArray and its samples are stored like a list of dicts
+    if isinstance(value, collections.abc.Mapping):
+        return dict(value)
+    return list(value)
+
+
+def _decodeRecord(frame, metadata, registry):
+    metadata = json.loads(metadata.decode()) if metadata else dict()
+    fields = metadata.get('fields', dict())
+
+    if not frame:
+        validateMeasurements([fields])
+        return _internNodes(Measurement.trusted(fields), registry)
+
+    measurement_data = _parseFrame(frame)
+    if measurement_data is None:
+        raise Exception('binary experiment file contains an invalid frame')
+    measurement = _toMeasurement(measurement_data, timestamp=False)
+
+    for key in metadata.get('drop', list()):
+        del measurement[key]
+
+    if _SCALAR_KEYS.issuperset(fields):
+        measurement.update(fields)
+        measurement.validate()
+    else:
+        measurement.update(fields)
+        validateMeasurements([measurement])
+        measurement = Measurement.trusted(measurement)
+
+    return _internNodes(measurement, registry)
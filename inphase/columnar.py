@@ -0,0 +1,323 @@
+from inphase.dataformat import TEMP_SUFFIX, Measurement, ProjectedMeasurement, _compact, _internNodes, validateMeasurements
+
+import collections.abc
+import json
+import os
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+COLUMNAR_EXPERIMENT_SUFFIX = '.npz'  # file name suffix of columnar experiment files
+COLUMNAR_FORMAT_VERSION = 1
+
+# kinds of fields, numeric and boolean fields are stored as one array with one entry per measurement or sample,
+# list fields as flat arrays of all values plus offsets, node fields as indices into a table of unique nodes and
+# everything else as JSON
+_LIST = ('int_list', 'float_list')
+_NODE = 'node'
+_JSON = 'json'
+
+# integer lists use the smallest dtype holding their values, it is widened when larger values are added
+_DTYPES = {'int': np.int64, 'float': np.float64, 'bool': np.bool_, 'int_list': np.int8, 'float_list': np.float64}
+
+
+class ColumnarMeasurements(collections.abc.Sequence):
+    """A sequence of measurements stored as contiguous NumPy arrays.
+
+    Instead of one dict per measurement and sample, every field is stored as one array over all measurements or
+    all samples, e.g. ``columns['timestamp']``, ``columns['samples.frequency']`` or ``columns['samples.pmu_values']``.
+    Samples of measurement ``i`` are ``sample_offsets[i]:sample_offsets[i + 1]``, list fields of samples have their
+    own offsets, e.g. ``columns['samples.pmu_values.offsets']``. Integer lists are stored with the smallest dtype holding
+    their values, recorded in ``schema['dtypes']``. Nodes are stored once and referenced by index,
+    ``columns['reflector']`` holds the node id of every measurement and -1 if it has none. Missing fields are marked
+    in ``<field>.present`` arrays.
+
+    Indexing and iterating create :class:`inphase.dataformat.Measurement` objects on demand, so the columnar store
+    can be used wherever a list of measurements is expected.
+
+    Args:
+        measurements (iterable, optional): measurements to store
+    """
+
+    def __init__(self, measurements=()):
+        self.fields = None
+        self.schema = {'measurement': dict(), 'sample': dict(), 'dtypes': dict()}
+        self.columns = {'sample_offsets': np.zeros(1, dtype=np.int64), 'samples.present': np.zeros(0, dtype=bool)}
+        self.nodes = list()
+        self._node_ids = dict()
+        self._node_registry = dict()  # shared values of the nodes of made measurements, see internNode
+        self._length = 0
+        self.extend(measurements)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._measurement(i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('measurement index out of range')
+        return self._measurement(index)
+
+    def __iadd__(self, measurements):
+        self.extend(measurements)
+        return self
+
+    def extend(self, measurements):
+        """Appends measurements to the store."""
+        if self.fields is not None:
+            raise Exception('a store loaded with fields can not be extended')
+        measurements = list(measurements)
+        if not measurements:
+            return
+        # validated once here, measurements are created from the columns without validation
+        validateMeasurements(measurements)
+
+        # the new columns are built with the kinds of both sides combined, so only the store has to be converted
+        schema, columns = _buildColumns(measurements, self)
+        counts = {'measurement': len(measurements), 'sample': columns['sample_offsets'][-1]}
+        for level in ('measurement', 'sample'):
+            for key, kind in schema[level].items():
+                if key not in self.schema[level]:
+                    _emptyField(self.columns, level, key, kind, self._count(level))
+                    self.schema[level][key] = kind
+                elif self.schema[level][key] != kind:
+                    self._convertField(level, key, kind)
+            for key, kind in self.schema[level].items():
+                if key not in schema[level]:
+                    _emptyField(columns, level, key, kind, counts[level])
+
+        columns['sample_offsets'] = columns['sample_offsets'][1:] + self.columns['sample_offsets'][-1]
+        for name, array in columns.items():
+            if name.endswith('.offsets'):
+                array = array[1:] + self.columns[name][-1]
+            self.columns[name] = np.concatenate((self.columns[name], array))
+        self._length += len(measurements)
+        self._updateDtypes()
+
+    @classmethod
+    def load(cls, path, fields=None):
+        """Loads a columnar store saved with :meth:`save`.
+
+        With `fields`, only the arrays of these fields are read and measurements are created as
+        :class:`inphase.dataformat.ProjectedMeasurement` objects. Such a store can not be extended or saved.
+        """
+        store = cls()
+        with np.load(path) as data:
+            header = json.loads(str(data['header']))
+            if header['version'] != COLUMNAR_FORMAT_VERSION:
+                raise Exception('unsupported columnar experiment format version %d' % header['version'])
+            store.schema = header['schema']
+            store.nodes = header['nodes']
+            store._length = header['length']
+            names = data.files
+            if fields is not None:
+                store.fields = frozenset(fields)
+                store.schema['measurement'] = {k: v for k, v in store.schema['measurement'].items() if k in fields}
+                if 'samples' not in fields:
+                    store.schema['sample'] = dict()
+                # only the arrays of the fields are read from the file
+                names = [name for name in names
+                         if name.split('.')[0] in fields or (name == 'sample_offsets' and 'samples' in fields)]
+            store.columns = {name: data[name] for name in names if name != 'header'}
+        for name, dtype in store.schema.setdefault('dtypes', dict()).items():
+            if name in store.columns:
+                store.columns[name] = store.columns[name].astype(dtype, copy=False)
+        store._node_ids = {_nodeKey(node): node_id for node_id, node in enumerate(store.nodes)}
+        return store
+
+    def save(self, path):
+        """Saves the store as uncompressed `.npz` file, the file is replaced atomically."""
+        if self.fields is not None:
+            raise Exception('a store loaded with fields can not be saved')
+        header = {'version': COLUMNAR_FORMAT_VERSION, 'schema': self.schema, 'nodes': self.nodes, 'length': self._length}
+        temp_path = path + TEMP_SUFFIX
+        with open(temp_path, 'wb') as f:
+            np.savez(f, header=np.array(json.dumps(header)), **self.columns)
+        os.replace(temp_path, path)
+
+    def _measurement(self, index):
+        columns = self.columns
+        measurement = dict()
+        for key, kind in self.schema['measurement'].items():
+            if not columns[key + '.present'][index]:
+                continue
+            if kind == _NODE:
+                measurement[key] = self.nodes[columns[key][index]]
+            elif kind == _JSON:
+                measurement[key] = json.loads(str(columns[key][index]))
+            else:
+                measurement[key] = columns[key][index].item()
+
+        if 'samples.present' in columns and columns['samples.present'][index]:
+            begin, end = columns['sample_offsets'][index:index + 2]
+            samples = [dict() for i in range(end - begin)]
+            for key, kind in self.schema['sample'].items():
+                name = 'samples.' + key
+                present = columns[name + '.present'][begin:end].tolist()
+                if kind in _LIST:
+                    offsets = columns[name + '.offsets'][begin:end + 1]
+                    values = columns[name][offsets[0]:offsets[-1]].tolist()
+                    offsets = (offsets - offsets[0]).tolist()
+                    for i, sample in enumerate(samples):
+                        if present[i]:
+                            sample[key] = values[offsets[i]:offsets[i + 1]]
+                elif kind == _JSON:
+                    for i, value in enumerate(columns[name][begin:end].tolist()):
+                        if present[i]:
+                            samples[i][key] = json.loads(value)
+                else:
+                    for i, value in enumerate(columns[name][begin:end].tolist()):
+                        if present[i]:
+                            samples[i][key] = value
+            measurement['samples'] = samples
+
+        if self.fields is not None:
+            return ProjectedMeasurement.trusted(measurement, loaded_fields=self.fields, registry=self._node_registry)
+        return _internNodes(Measurement.trusted(measurement), self._node_registry)
+
+    def _updateDtypes(self):
+        # concatenating widens the dtype of list columns if new values do not fit
+        self.schema['dtypes'] = {'samples.' + key: self.columns['samples.' + key].dtype.name
+                                 for key, kind in self.schema['sample'].items() if kind in _LIST}
+
+    def _count(self, level):
+        return self._length if level == 'measurement' else self.columns['sample_offsets'][-1]
+
+    def _convertField(self, level, key, kind):
+        # ints become floats, everything else is rebuilt from its values as JSON
+        name = key if level == 'measurement' else 'samples.' + key
+        if kind in _DTYPES:
+            self.columns[name] = self.columns[name].astype(_DTYPES[kind])
+        else:
+            if level == 'measurement':
+                values = [m[key] for m in self if key in m]
+            else:
+                values = [s[key] for m in self for s in m.get('samples', ()) if key in s]
+            self.columns.pop(name + '.offsets', None)
+            self.columns[name] = _fill(values, self.columns[name + '.present'], _JSON)
+        self.schema[level][key] = kind
+
+
+def _promote(kind, other):
+    if kind == other:
+        return kind
+    if {kind, other} == {'int', 'float'}:
+        return 'float'
+    if {kind, other} == {'int_list', 'float_list'}:
+        return 'float_list'
+    return _JSON
+
+
+def _emptyField(columns, level, key, kind, count):
+    name = key if level == 'measurement' else 'samples.' + key
+    columns[name + '.present'] = np.zeros(count, dtype=bool)
+    if kind == _NODE:
+        columns[name] = np.full(count, -1, dtype=np.int32)
+    elif kind == _JSON:
+        columns[name] = np.full(count, 'null')
+    elif kind in _LIST:
+        columns[name] = np.zeros(0, dtype=_DTYPES[kind])
+        columns[name + '.offsets'] = np.zeros(count + 1, dtype=np.int64)
+    else:
+        columns[name] = np.zeros(count, dtype=_DTYPES[kind])
+
+
+def _kind(values):
+    # kind of a field from its present values
+    if all(isinstance(v, bool) for v in values):
+        return 'bool'
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return 'int'
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return 'float'
+    if all(isinstance(v, list) for v in values):
+        flat = [x for v in values for x in v]
+        kind = _kind(flat) if flat else 'int'
+        if kind in ('int', 'float'):
+            return kind + '_list'
+    return _JSON
+
+
+def _nodeKey(node):
+    return json.dumps(node, sort_keys=True)
+
+
+def _buildColumns(measurements, store):
+    # returns schema and columns of measurements, combined with the kinds already in the store
+    schema = {'measurement': dict(), 'sample': dict()}
+    columns = dict()
+
+    keys = dict.fromkeys(key for m in measurements for key in m if key != 'samples')
+    for key in keys:
+        present = np.array([key in m for m in measurements], dtype=bool)
+        values = [m[key] for m in measurements if key in m]
+        if all(isinstance(v, dict) for v in values):
+            kind = _NODE
+        else:
+            kind = _kind(values)
+            if kind in _LIST:
+                kind = _JSON
+        kind = _promote(kind, store.schema['measurement'].get(key, kind))
+        if kind == _NODE:
+            ids = np.full(len(measurements), -1, dtype=np.int32)
+            ids[present] = [_nodeId(store, v) for v in values]
+            columns[key] = ids
+        else:
+            columns[key] = _fill(values, present, kind)
+        columns[key + '.present'] = present
+        schema['measurement'][key] = kind
+
+    columns['samples.present'] = np.array(['samples' in m for m in measurements], dtype=bool)
+    samples = [s for m in measurements for s in m.get('samples', ())]
+    columns['sample_offsets'] = np.cumsum([0] + [len(m.get('samples', ())) for m in measurements], dtype=np.int64)
+
+    keys = dict.fromkeys(key for s in samples for key in s)
+    for key in keys:
+        name = 'samples.' + key
+        present = np.array([key in s for s in samples], dtype=bool)
+        values = [s[key] for s in samples if key in s]
+        kind = _kind(values)
+        kind = _promote(kind, store.schema['sample'].get(key, kind))
+        if kind in _LIST:
+            lengths = np.zeros(len(samples), dtype=np.int64)
+            lengths[present] = [len(v) for v in values]
+            columns[name + '.offsets'] = np.concatenate(([0], np.cumsum(lengths)))
+            columns[name] = _listArray([x for v in values for x in v], kind)
+        else:
+            columns[name] = _fill(values, present, kind)
+        columns[name + '.present'] = present
+        schema['sample'][key] = kind
+
+    return schema, columns
+
+
+def _listArray(values, kind):
+    # the flat values of a list field, integers with the smallest dtype holding them
+    if kind == 'float_list':
+        return np.array(values, dtype=_DTYPES[kind])
+    if not values:
+        return np.zeros(0, dtype=_DTYPES[kind])
+    return _compact(np.array(values, dtype=np.int64))
+
+
+def _fill(values, present, kind):
+    if kind == _JSON:
+        array = np.full(len(present), 'null', dtype=object)
+        array[present] = [json.dumps(v) for v in values]
+        return array.astype(str)
+    array = np.zeros(len(present), dtype=_DTYPES[kind])
+    array[present] = values
+    return array
+
+
+def _nodeId(store, node):
+    node = dict(node)
+    key = _nodeKey(node)
+    if key not in store._node_ids:
+        store._node_ids[key] = len(store.nodes)
+        store.nodes.append(node)
+    return store._node_ids[key]
@@ -0,0 +1,68 @@
+import bz2
+import gzip
+import lzma
+import os
+
+# file name suffixes of compressed files and the modules handling them
+COMPRESSION_SUFFIXES = {
+    '.gz': gzip,
+    '.xz': lzma,
+    '.bz2': bz2,
+}
+
+
+def compressionModule(path):
+    """Returns the module (gzip, lzma or bz2) handling a file by its name suffix, None for uncompressed files."""
+    return COMPRESSION_SUFFIXES.get(os.path.splitext(path)[1])
+
+
+def isCompressed(path):
+    """Returns whether a file is compressed according to its name suffix."""
+    return compressionModule(path) is not None
+
+
+def stripCompressionSuffix(path):
+    """Returns the file name without the suffix of the compression, e.g. to get the suffix of the contained format."""
+    if isCompressed(path):
+        return os.path.splitext(path)[0]
+    return path
+
+
+def openFile(path, mode='rb', level=None):
+    """Opens a file like :func:`open`, files ending with '.gz', '.xz' or '.bz2' are compressed transparently.
+
+    Compressed files are streamed, i.e. decompressed or compressed while they are read or written. Appending to a
+    compressed file adds a new gzip member or xz/bz2 stream to its end, files consisting of several of them are
+    decompressed as a whole when read. Seeking in compressed files is emulated by reading, so only forward seeks and
+    going back to the start are reasonably fast. The mode can not contain '+'.
+
+    Args:
+        path (str): file to open
+        mode (str, optional): mode like for :func:`open`, text mode if it does not contain 'b'
+        level (int, optional): compression level (gzip and bz2: 1-9, xz: preset 0-9), the default of the module if
+            None
+
+    Returns:
+        file object
+    """
+    module = compressionModule(path)
+    if module is None:
+        return open(path, mode)
+
+    if 'b' not in mode and 't' not in mode:
+        mode += 't'
+    kwargs = dict()
+    if level is not None and 'r' not in mode:
+        kwargs['preset' if module is lzma else 'compresslevel'] = level
+    return module.open(path, mode, **kwargs)
+
+
+def decompress(path, data):
+    """Decompresses data read directly from a compressed file, e.g. complete members appended to it.
+
+    Data of uncompressed files is returned unchanged.
+    """
+    module = compressionModule(path)
+    if module is None:
+        return data
+    return module.decompress(data)
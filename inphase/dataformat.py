@@ -1,7 +1,13 @@
+import collections.abc
 import datetime
+import itertools
 import os
 import warnings
 
+import numpy as np
+
+from inphase.compression import isCompressed, openFile, stripCompressionSuffix
+
 import yaml
 try:
     from yaml import CLoader as Loader, CDumper as Dumper
@@ -9,89 +15,393 @@ except ImportError:
     warnings.warn("Using pure python yaml library, this might be very slow!", ImportWarning)
     from yaml import Loader, Dumper
 
-import pickle  # for caching
+CACHE_SUFFIX = '.cache'  # file name suffix of experiment cache files
+SUMMARY_SUFFIX = '.summary'  # file name suffix of experiment summary files
+TEMP_SUFFIX = '.tmp'  # file name suffix of files written before they atomically replace their target
+# files next to experiments that are not experiments themselves, e.g. '.cache' and '.cache.tmp'
+SIDECAR_SUFFIXES = (CACHE_SUFFIX, SUMMARY_SUFFIX, TEMP_SUFFIX)
+
+
+class _NoAliasDumper(Dumper):
+    # measurements of one dump often share nodes, write them out every time instead of using anchors
+    def ignore_aliases(self, data):
+        return True
 
 
 class Experiment:
+    """A list of measurements stored in a file.
+
+    Experiments are stored as YAML or, if the file name ends with '.ibx' or the file is one, in the compact binary
+    experiment format of :mod:`inphase.binaryexperiment`. Both formats can be read and appended to.
+
+    YAML and binary experiment files ending with an additional '.gz', '.xz' or '.bz2', e.g. 'experiment.yml.gz', are
+    compressed and decompressed transparently while they are read or appended to, see
+    :func:`inphase.compression.openFile`. Every append adds a new compressed member, so appending measurements in
+    batches, e.g. with :class:`inphase.experimentwriter.ExperimentWriter`, compresses better.
+
+    Files ending with '.npz' use the columnar store of :mod:`inphase.columnar`, `measurements` is then a
+    :class:`inphase.columnar.ColumnarMeasurements` holding all fields as NumPy arrays and creating measurements on
+    demand. Appending rewrites the whole file.
+
+    Measurements can be filtered by node, link, time window, real distance and real_nlos with :meth:`query`, which
+    uses an index built on first use, see :class:`inphase.experimentindex.ExperimentIndex`.
+
+    Huge YAML and binary experiments can be opened with `lazy`, measurements are then not loaded up front but read
+    from the file one at a time whenever the experiment is iterated, see :meth:`iterMeasurements`.
+
+    With `fields`, only these fields of the measurements are loaded, e.g. ``fields=['timestamp', 'reflector', 'dqi']``
+    for statistics that do not need the samples. YAML files are filtered before they are parsed, cache files and
+    columnar files only read the requested fields. The measurements are :class:`ProjectedMeasurement` objects raising
+    :class:`FieldNotLoadedError` if a field that was not loaded is accessed. Such experiments can not be appended to.
+
+    An overview of an experiment, e.g. its links, time span and real distances, is available without loading it with
+    :meth:`summary`. With `summarize`, the summary sidecar file it reads is updated whenever measurements are added.
+
+    Args:
+        path (str): experiment file, it is created if it does not exist
+        caching (bool, optional): cache parsed and validated YAML files to speed up loading, see
+            :class:`inphase.experimentcache.ExperimentCache`
+        cache_dir (str, optional): keep cache and summary files in this directory instead of next to the experiment
+            file
+        max_cache_size (int, optional): maximum total size of the cache files in `cache_dir` in bytes
+        lazy (bool, optional): do not load the measurements, `measurements` stays empty. Not used for '.npz' files.
+        fields (iterable, optional): names of the fields of the measurements to load, all fields if None
+        processes (int, optional): number of processes parsing YAML files in parallel, `None` uses all CPUs, see
+            :func:`inphase.yamlstream.loadYAMLList`. Compressed files are always parsed by a single process.
+        summarize (bool, optional): keep the summary sidecar file of :meth:`summary` up to date when measurements are
+            added
+    """
+
+    def __init__(self, path, caching=True, cache_dir=None, max_cache_size=None, lazy=False, fields=None,
+                 processes=1, summarize=False):
+        from inphase import binaryexperiment, columnar  # imported here, both depend on this module
 
-    def __init__(self, path, caching=True):
         self.file_path = path
         self.measurements = list()
+        self.binary = False
+        self.columnar = False
+        self.lazy = False
+        self.cache = None
+        self.fields = frozenset(fields) if fields is not None else None
+        self.summarize = summarize
+        self.cache_dir = cache_dir
+        self._index = None
+
+        if path.endswith(columnar.COLUMNAR_EXPERIMENT_SUFFIX):
+            self.columnar = True
+            if os.path.exists(path):
+                self.measurements = columnar.ColumnarMeasurements.load(path, fields=self.fields)
+            else:
+                self.measurements = columnar.ColumnarMeasurements()
+                self.measurements.save(path)
+            return
 
-        cache_path = path + '.cache'  # a possible caching file resides next to the original file
+        self.lazy = lazy
 
-        cache_loaded = False
+        if binaryexperiment.isBinaryExperiment(path):
+            self.binary = True
+            if not lazy:
+                self.measurements = self._project(binaryexperiment.readBinaryExperiment(path))
+            return
+        if not os.path.exists(path) and stripCompressionSuffix(path).endswith(binaryexperiment.BINARY_EXPERIMENT_SUFFIX):
+            self.binary = True
+            binaryexperiment.createBinaryExperiment(path)
+            return
+
+        if lazy:
+            if not os.path.exists(path):
+                # make a new empty file
+                openFile(path, 'w').close()
+            return
+
+        cache = None
+        if caching:
+            from inphase.experimentcache import ExperimentCache
+            cache = self.cache = ExperimentCache(cache_dir, max_cache_size)
 
         # check if the experiment file exists
-        if os.path.exists(path):
-            # if it does, read it from disc
-            mode = 'r'
-
-            if caching:
-                # caching is enabled, check if a cached file exists
-                if os.path.exists(cache_path):
-                    # a cache file exists, check if it is newer than the original yml
-                    yaml_time = os.path.getmtime(path)
-                    cache_time = os.path.getmtime(cache_path)
-                    if yaml_time < cache_time:
-                        # cache file is newer than yaml file, load cache file instead of yaml
-                        with open(cache_path, 'rb') as f:
-                            data = pickle.load(f)  # load data from pickled file instead of yaml
-                        cache_loaded = True
-        else:
+        if not os.path.exists(path):
             # if not, make a new empty file
-            mode = 'w+'
+            openFile(path, 'w').close()
+            return
 
-        if not cache_loaded:
-            # open the experiment yaml file
-            with open(self.file_path, mode) as f:
+        if cache is not None:
+            # caching is enabled, use the cached measurements if they were made from this very file
+            measurements = cache.load(path, fields=self.fields)
+            if measurements is not None:
+                self.measurements = measurements
+                return
+
+        if processes != 1 and not isCompressed(path):
+            # parsed, projected and validated by the worker processes
+            from inphase.yamlstream import loadYAMLList
+            data = loadYAMLList(path, processes, fields=self.fields, check=validateMeasurements)
+        else:
+            # open the experiment yaml file, compressed files are decompressed while they are parsed
+            with openFile(self.file_path, 'r') as f:
                 # read YAML data
-                data = yaml.load(f, Loader=Loader)
+                if self.fields is None:
+                    data = yaml.load(f, Loader=Loader)
+                else:
+                    # leave out the other fields before parsing
+                    from inphase.yamlstream import iterFieldLines
+                    data = yaml.load(''.join(iterFieldLines(f, self.fields)), Loader=Loader)
+            if not data:
+                return
+            if not isinstance(data, list):
+                raise Exception('experiment file does not contain a list of measurements')
+            if self.fields is not None:
+                data = [{key: value for key, value in (m or dict()).items() if key in self.fields} for m in data]
+            validateMeasurements(data)
         if not data:
             return
-        if not isinstance(data, list):
-            raise Exception('experiment file does not contain a list of measurements')
 
-        for measurement in data:
-            self.measurements.append(Measurement(measurement))
+        # identical nodes of this load share their values, see internNode
+        registry = dict()
+        if self.fields is not None:
+            self.measurements = [ProjectedMeasurement.trusted(m, loaded_fields=self.fields, registry=registry)
+                                 for m in data]
+            # a cache needs all fields
+            return
+
+        self.measurements = [_internNodes(Measurement.trusted(measurement), registry) for measurement in data]
 
-        if not cache_loaded:
-            # if we made it until here, it means the cached file was not valid, save a new one if caching is requested
-            if caching:
-                with open(cache_path, 'wb') as f:
-                    pickle.dump(data, f)
+        if cache is not None:
+            # if we made it until here, it means there was no valid cache file, save a new one
+            cache.store(path, self.measurements)
 
     def __iter__(self):
+        if self.lazy:
+            return self.iterMeasurements()
         return self.measurements.__iter__()
 
     def __len__(self):
+        if self.lazy:
+            # count the measurements in the file without loading them
+            if self.binary:
+                from inphase.binaryexperiment import countBinaryExperiment
+                return countBinaryExperiment(self.file_path)
+            from inphase.yamlstream import countYAMLList
+            return countYAMLList(self.file_path)
         return self.measurements.__len__()
 
+    def iterMeasurements(self):
+        """Returns an iterator over the measurements in the experiment file.
+
+        Measurements are read from the file one at a time, so memory usage does not depend on the size of the
+        experiment. YAML files are split into their list items, see :func:`inphase.yamlstream.iterYAMLList`.
+        """
+        if self.columnar:
+            return iter(self.measurements)
+        if self.binary:
+            from inphase.binaryexperiment import iterBinaryExperiment
+            measurements = iterBinaryExperiment(self.file_path)
+        else:
+            from inphase.yamlstream import iterYAMLList
+            measurements = (Measurement(m) for m in iterYAMLList(self.file_path))
+        if self.fields is not None:
+            registry = dict()
+            return (ProjectedMeasurement.trusted(m, loaded_fields=self.fields, registry=registry) for m in measurements)
+        return measurements
+
+    def _project(self, measurements):
+        # only keeps the loaded fields of already validated measurements
+        if self.fields is None:
+            return measurements
+        return [ProjectedMeasurement.trusted(m, loaded_fields=self.fields) for m in measurements]
+
+    def getIndex(self):
+        """Returns the :class:`inphase.experimentindex.ExperimentIndex` of the measurements.
+
+        The index is built on first use. For cached YAML experiments it is stored in the cache file as well and
+        loaded from there the next time. Experiments loaded with `fields` do not share their index with the cache file,
+        it only covers the loaded fields.
+        """
+        if self.lazy:
+            raise Exception('lazy experiments can not be indexed')
+        if self._index is None:
+            from inphase.experimentindex import ExperimentIndex
+            cache = self.cache if self.fields is None else None
+            if cache is not None:
+                self._index = cache.loadIndex(self.file_path)
+            if self._index is None or self._index.count != len(self.measurements):
+                self._index = ExperimentIndex(self.measurements)
+                if cache is not None:
+                    cache.storeIndex(self.file_path, self._index)
+        return self._index
+
+    def query(self, **criteria):
+        """Returns a list of the measurements matching all criteria, using the index of the experiment.
+
+        Example: ``experiment.query(link=(initiator_uid, reflector_uid), start=t, end=t + 60, nlos=False)``. See
+        :meth:`inphase.experimentindex.ExperimentIndex.select` for all criteria.
+        """
+        return [self.measurements[i] for i in self.getIndex().select(**criteria).tolist()]
+
+    @staticmethod
+    def summary(path, cache_dir=None):
+        """Returns the :class:`inphase.experimentsummary.ExperimentSummary` of an experiment file.
+
+        Only the small summary sidecar file is read, so scanning many experiments is fast. If it is missing or
+        outdated, e.g. because measurements were added without `summarize`, the experiment is read once measurement
+        by measurement to create it.
+
+        Args:
+            path (str): experiment file
+            cache_dir (str, optional): directory of the summary file, like the `cache_dir` of the experiment
+        """
+        from inphase.experimentsummary import ExperimentSummary, loadSummary, storeSummary
+        summary = loadSummary(path, cache_dir)
+        if summary is None:
+            if not os.path.exists(path):
+                raise Exception('experiment file %s does not exist' % path)
+            summary = ExperimentSummary(Experiment(path, caching=False, lazy=True))
+            storeSummary(path, summary, cache_dir)
+        return summary
+
     def addMeasurements(self, measurements):
         # this adds the measurement and saves it to the disk (appends to file)
-        self.measurements += measurements
-
-        # write to disk
-        # make sure it writes pure yaml, no python objects
-        with open(self.file_path, 'a') as f:
-            for measurement in measurements:
-                d = dict(measurement)
-                if 'initiator' in d:
-                    d['initiator'] = dict(d['initiator'])
-                if 'reflector' in d:
-                    d['reflector'] = dict(d['reflector'])
-                if 'samples' in d:
-                    samples = list()
-                    for s in d['samples']:
-                        samples.append(dict(s))
-                    d['samples'] = samples
-                yaml.dump([d], f, Dumper=Dumper, default_flow_style=None)
+        if self.fields is not None:
+            raise Exception('experiments loaded with fields can not be appended to')
+        summary = None
+        if self.summarize:
+            from inphase.experimentsummary import loadSummary
+            # has to be up to date before the file changes
+            summary = loadSummary(self.file_path, self.cache_dir)
+
+        self._index = None
+        if not self.lazy:
+            self.measurements += measurements
+        self._append(measurements)
+
+        if self.summarize:
+            self._updateSummary(summary, measurements)
 
     def addMeasurement(self, measurement):
         self.addMeasurements([measurement])
 
+    def _append(self, measurements):
+        # writes the measurements to the file
+        if self.columnar:
+            self.measurements.save(self.file_path)
+            return
+
+        if self.binary:
+            from inphase.binaryexperiment import appendBinaryExperiment
+            appendBinaryExperiment(self.file_path, measurements)
+            return
+
+        # write to disk, all measurements with a single dump
+        # make sure it writes pure yaml, no python objects
+        data = [_toPlainDict(measurement) for measurement in measurements]
+        if not data:
+            return
+        with openFile(self.file_path, 'a') as f:
+            f.write(yaml.dump(data, Dumper=_NoAliasDumper, default_flow_style=None))
+
+    def _updateSummary(self, summary, measurements):
+        # an up to date summary only needs the new measurements, otherwise it is made from all loaded measurements
+        from inphase.experimentsummary import ExperimentSummary, storeSummary
+        if summary is not None:
+            summary.update(measurements)
+        elif not self.lazy:
+            summary = ExperimentSummary(self.measurements)
+        else:
+            return
+        storeSummary(self.file_path, summary, self.cache_dir)
+
+
+def _toPlainDict(measurement):
+    # converts a measurement with its nodes and samples to builtin dicts
+    d = dict(measurement)
+    # the lists of shared nodes are only read, see internNode
+    if 'initiator' in d:
+        d['initiator'] = dict(dict.items(d['initiator']))
+    if 'reflector' in d:
+        d['reflector'] = dict(dict.items(d['reflector']))
+    if 'samples' in d:
+        samples = list()
+        for s in d['samples']:
+            samples.append(dict(s))
+        d['samples'] = samples
+    return d
+
+
+def validateMeasurements(measurements):
+    """Validates a list of measurement dicts at once.
+
+    Does the same checks as constructing a :class:`Measurement` from every dict, but numeric fields and sample values
+    of all measurements are checked together with NumPy instead of value by value. Afterwards the dicts can be turned
+    into measurements with :meth:`Measurement.trusted`.
+
+    Raises:
+        Exception: If a measurement is invalid.
+    """
+    samples = list()
+    for measurement in measurements:
+        for key in ('initiator', 'reflector'):
+            if key in measurement:
+                if not isinstance(measurement[key], dict):
+                    raise Exception(key + ' is not a dict')
+                Node.validate(measurement[key])
+        if 'samples' in measurement and not isinstance(measurement['samples'], SampleArray):
+            if not isinstance(measurement['samples'], list):
+                raise Exception('samples are not a list')
+            samples += measurement['samples']
+
+    timestamps = [m['timestamp'] for m in measurements if 'timestamp' in m]
+    if timestamps and _isNumeric(timestamps):
+        if any(t != t for t in timestamps):  # NaN
+            raise Exception('timestamp is not parsable')
+        # only the extremes can be out of range
+        timestamps = [min(timestamps), max(timestamps)]
+    for timestamp in timestamps:
+        Measurement.validate({'timestamp': timestamp})
+
+    for key in ('dqi', 'measured_distance', 'real_distance'):
+        if not _isNumeric([m[key] for m in measurements if key in m]):
+            raise Exception(key + ' is neither integer nor float')
+
+    if not all(isinstance(m['real_nlos'], bool) for m in measurements if 'real_nlos' in m):
+        raise Exception('real_nlos is no boolean value')
+
+    for sample in samples:
+        if not isinstance(sample, dict):
+            raise Exception('sample is not a dict')
+    if not _isNumeric([s['frequency'] for s in samples if 'frequency' in s]):
+        raise Exception('frequency is neither integer nor float')
+    for key in ('pmu_values', 'pmu_initiator', 'pmu_reflector', 'rssi'):
+        values = [s[key] for s in samples if key in s]
+        if not all(isinstance(v, list) for v in values):
+            raise Exception(key + ' is not a list')
+        if not _isNumeric(list(itertools.chain.from_iterable(values))):
+            raise Exception(key + ' is neither integer nor float')
+
+
+def _isNumeric(values):
+    # whether all values are int or float (bool included), checked by the dtype NumPy infers for all of them at once
+    try:
+        array = np.array(values)
+    except ValueError:
+        array = np.array(None)
+    # nested lists give more dimensions, they are rejected below
+    if array.ndim == 1 and array.dtype.kind in 'biuf':
+        return True
+    # e.g. integers too large for NumPy, check them one by one
+    return all(isinstance(v, (int, float)) for v in values)
+
 
 class Measurement(dict):
+    """A single measurement, nested dicts are converted to :class:`Node` and :class:`Sample` and everything is
+    validated on construction.
+
+    Samples can also be a :class:`SampleArray`, it is copied but not converted.
+
+    Data that is known to be valid, e.g. because it was decoded or loaded by this package, can be turned into a
+    measurement without validation by :meth:`trusted`. :func:`validateMeasurements` validates many measurements at
+    once.
+    """
+
     def __init__(self, *arg, **kw):
         super(Measurement, self).__init__(*arg, **kw)
 
@@ -104,7 +414,10 @@ class Measurement(dict):
                 raise Exception('reflector is not a dict')
             self['reflector'] = Node(self['reflector'])
 
-        if 'samples' in self:
+        if 'samples' in self and isinstance(self['samples'], SampleArray):
+            # typed arrays, nothing to validate
+            self['samples'] = self['samples'].copy()
+        elif 'samples' in self:
             if not isinstance(self['samples'], list):
                 raise Exception('samples are not a list')
             samples = list()
@@ -114,6 +427,26 @@ class Measurement(dict):
 
         self.validate()
 
+    @classmethod
+    def trusted(cls, *arg, **kw):
+        """Creates a measurement without validating it.
+
+        Like the constructor, nodes and samples are copied to new :class:`Node` and :class:`Sample` objects, but their
+        types and values are not checked.
+        """
+        measurement = cls.__new__(cls)
+        dict.__init__(measurement, *arg, **kw)
+        if 'initiator' in measurement:
+            measurement['initiator'] = Node.trusted(measurement['initiator'])
+        if 'reflector' in measurement:
+            measurement['reflector'] = Node.trusted(measurement['reflector'])
+        if 'samples' in measurement:
+            if isinstance(measurement['samples'], SampleArray):
+                measurement['samples'] = measurement['samples'].copy()
+            else:
+                measurement['samples'] = [Sample.trusted(s) for s in measurement['samples']]
+        return measurement
+
     def validate(self):
         # check if timestamp is a parsable unix timestamp (float)
         if 'timestamp' in self:
@@ -146,11 +479,47 @@ class Measurement(dict):
         # TODO: check if status is valid
 
 
+class FieldNotLoadedError(KeyError):
+    """Raised when a field of a :class:`ProjectedMeasurement` is accessed that was not loaded."""
+
+
+class ProjectedMeasurement(Measurement):
+    """A measurement of which only some fields were loaded, see the `fields` argument of :class:`Experiment`.
+
+    Accessing a field that exists in the file but was not loaded raises :class:`FieldNotLoadedError` instead of
+    returning a wrong result. `in` and `get` only know the loaded fields.
+
+    Attributes:
+        loaded_fields (frozenset): names of the loaded fields
+    """
+
+    @classmethod
+    def trusted(cls, measurement, loaded_fields, registry=None):
+        """Creates a projected measurement from the loaded fields of a valid measurement, its nodes are interned into
+        `registry`, see :func:`internNode`."""
+        projected = super(ProjectedMeasurement, cls).trusted(
+            {key: value for key, value in measurement.items() if key in loaded_fields})
+        projected.loaded_fields = loaded_fields
+        return _internNodes(projected, registry)
+
+    def __missing__(self, key):
+        if key not in self.loaded_fields:
+            raise FieldNotLoadedError('%s was not loaded, only %s were' % (key, ', '.join(sorted(self.loaded_fields))))
+        raise KeyError(key)
+
+
 class Node(dict):
     def __init__(self, *arg, **kw):
         super(Node, self).__init__(*arg, **kw)
         self.validate()
 
+    @classmethod
+    def trusted(cls, *arg, **kw):
+        """Creates a node without validating it."""
+        node = cls.__new__(cls)
+        dict.__init__(node, *arg, **kw)
+        return node
+
     def validate(self):
         if 'moving' in self:
             if not isinstance(self['moving'], bool):
@@ -178,11 +547,116 @@ class Node(dict):
                 raise Exception('antenna_offset is neither integer nor float')
 
 
+class _SharedNode(Node):
+    # an interned node whose nested lists are shared with identical nodes, see internNode. It turns into a plain Node
+    # with copies of the lists as soon as one of them is handed out, everything else is read without copying.
+
+    def _own(self):
+        for key, value in dict.items(self):
+            if isinstance(value, list):
+                dict.__setitem__(self, key, _copyList(value))
+        self.__class__ = Node
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if isinstance(value, list):
+            self._own()
+            value = dict.__getitem__(self, key)
+        return value
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __iter__(self):
+        # makes dict(node) and {**node} read the values by key instead of copying the shared lists
+        return dict.__iter__(self)
+
+    def __reduce__(self):
+        return _SharedNode._fromShared, (dict(dict.items(self)),)
+
+    @classmethod
+    def _fromShared(cls, shared):
+        node = cls.__new__(cls)
+        dict.__init__(node, shared)
+        return node
+
+    def _owning(name):
+        def method(self, *arg, **kw):
+            self._own()
+            return getattr(self, name)(*arg, **kw)
+        return method
+
+    items = _owning('items')
+    values = _owning('values')
+    pop = _owning('pop')
+    popitem = _owning('popitem')
+    setdefault = _owning('setdefault')
+    copy = _owning('copy')
+    del _owning
+
+
+def internNode(node, registry=None):
+    """Returns a new :class:`Node` with the content of node, sharing its values with identical nodes of `registry`.
+
+    Loaders keep a registry (a dict) for each load, so that the nodes of an experiment, usually a handful repeated for
+    every measurement, do not all hold their own copies of names and locations. Every measurement still gets a node
+    of its own. Nested lists, e.g. the location, are shared until the node hands one of them out, the node then
+    copies them, so they can be changed in place without affecting other measurements. Without a registry nothing is
+    shared. The node is not validated.
+    """
+    if registry is None:
+        return Node.trusted(node)
+    try:
+        key = _nodeKey(node)
+    except TypeError:
+        # unhashable content, e.g. a dict in a field
+        return Node.trusted(node)
+    shared = registry.get(key)
+    if shared is None:
+        shared = registry[key] = {name: _copyList(value) if isinstance(value, list) else value
+                                  for name, value in dict.items(node)}
+    if any(isinstance(value, list) for value in shared.values()):
+        return _SharedNode._fromShared(shared)
+    return Node.trusted(shared)
+
+
+def _internNodes(measurement, registry):
+    # replaces initiator and reflector of a loaded measurement by interned nodes, returns the measurement
+    if 'initiator' in measurement:
+        measurement['initiator'] = internNode(measurement['initiator'], registry)
+    if 'reflector' in measurement:
+        measurement['reflector'] = internNode(measurement['reflector'], registry)
+    return measurement
+
+
+def _nodeKey(node):
+    # types are part of the key, 1 and 1.0 are different nodes when written
+    return tuple(sorted((key, _freeze(value)) for key, value in dict.items(node)))
+
+
+def _freeze(value):
+    if isinstance(value, list):
+        return (list, tuple(_freeze(v) for v in value))
+    hash(value)
+    return (type(value), value)
+
+
+def _copyList(value):
+    return [_copyList(v) if isinstance(v, list) else v for v in value]
+
+
 class Sample(dict):
     def __init__(self, *arg, **kw):
         super(Sample, self).__init__(*arg, **kw)
         self.validate()
 
+    @classmethod
+    def trusted(cls, *arg, **kw):
+        """Creates a sample without validating it."""
+        sample = cls.__new__(cls)
+        dict.__init__(sample, *arg, **kw)
+        return sample
+
     def _validate_list_int_float(self, key):
         if key in self:
             if not isinstance(self[key], list):
@@ -201,3 +675,188 @@ class Sample(dict):
         self._validate_list_int_float('pmu_initiator')
         self._validate_list_int_float('pmu_reflector')
         self._validate_list_int_float('rssi')
+
+
+class SampleArray(collections.abc.MutableSequence):
+    """The samples of a measurement stored in typed arrays instead of a list of :class:`Sample` dicts.
+
+    Every sample field is one NumPy array over all samples, ``columns['frequency']`` with one value per sample and
+    list fields like ``columns['pmu_values']`` with one row per sample. Integers use the smallest dtype holding them,
+    e.g. int8 for PMU values. Indexing and iterating return :class:`SampleView` objects that behave like
+    :class:`Sample` dicts and write through to the arrays, slicing returns a SampleArray sharing the arrays, so a
+    SampleArray can be used wherever a list of samples is expected, e.g. as ``measurement['samples']``.
+
+    All samples need to have the same fields and list fields the same length in all samples.
+
+    Args:
+        samples (iterable, optional): sample dicts to store
+
+    Raises:
+        ValueError: If the samples do not fit into arrays.
+    """
+
+    def __init__(self, samples=()):
+        self.columns = _sampleColumns(list(samples))
+
+    @classmethod
+    def fromColumns(cls, columns):
+        """Creates a SampleArray using the given arrays without copying them."""
+        sample_array = cls.__new__(cls)
+        sample_array.columns = dict(columns)
+        lengths = set(len(column) for column in sample_array.columns.values())
+        if len(lengths) > 1:
+            raise ValueError('columns have different lengths')
+        return sample_array
+
+    def __len__(self):
+        for column in self.columns.values():
+            return len(column)
+        return 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return SampleArray.fromColumns({key: column[index] for key, column in self.columns.items()})
+        return SampleView(self, self._index(index))
+
+    def __setitem__(self, index, sample):
+        if isinstance(index, slice):
+            indices = range(*index.indices(len(self)))
+            sample = list(sample)
+            if len(sample) != len(indices):
+                raise ValueError('SampleArray does not support changing its length by slice assignment')
+            for i, s in zip(indices, sample):
+                self[i] = s
+            return
+        index = self._index(index)
+        if set(sample) != set(self.columns):
+            raise ValueError('sample does not have the fields of the SampleArray')
+        # read all values first, the sample might be a view of this array
+        values = {key: sample[key] for key in self.columns}
+        for key, value in values.items():
+            self._set(key, index, value)
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            index = list(range(*index.indices(len(self))))
+        else:
+            index = self._index(index)
+        self.columns = {key: np.delete(column, index, axis=0) for key, column in self.columns.items()}
+
+    def insert(self, index, sample):
+        new = _sampleColumns([sample])
+        if self.columns and set(new) != set(self.columns):
+            raise ValueError('sample does not have the fields of the SampleArray')
+        index = min(max(index + len(self) if index < 0 else index, 0), len(self))
+        columns = dict()
+        for key, value in new.items():
+            column = self.columns.get(key, value[:0])
+            if column.shape[1:] != value.shape[1:]:
+                raise ValueError(key + ' of the sample has a different length')
+            column = column.astype(np.promote_types(column.dtype, value.dtype), copy=False)
+            columns[key] = np.insert(column, index, value, axis=0)
+        self.columns = columns
+
+    def __eq__(self, other):
+        if not isinstance(other, collections.abc.Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self):
+        return 'SampleArray(%r)' % list(self.toList())
+
+    def copy(self):
+        """Returns a SampleArray with copies of the arrays."""
+        return SampleArray.fromColumns({key: column.copy() for key, column in self.columns.items()})
+
+    def toList(self):
+        """Returns the samples as a list of :class:`Sample` objects."""
+        columns = {key: column.tolist() for key, column in self.columns.items()}
+        return [Sample.trusted(zip(columns, values)) for values in zip(*columns.values())]
+
+    def _index(self, index):
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('sample index out of range')
+        return index
+
+    def _set(self, key, index, value):
+        value = _compact(np.array(value))
+        column = self.columns[key]
+        if value.shape != column.shape[1:]:
+            raise ValueError(key + ' has a different length than in the other samples')
+        if value.dtype.kind not in 'biuf':
+            raise ValueError(key + ' is neither integer nor float')
+        dtype = np.promote_types(column.dtype, value.dtype)
+        if dtype != column.dtype:
+            column = self.columns[key] = column.astype(dtype)
+        column[index] = value
+
+
+class SampleView(collections.abc.MutableMapping):
+    """A single sample of a :class:`SampleArray`.
+
+    Values are returned as Python numbers and lists like those of a :class:`Sample`, assigning values writes them to
+    the arrays of the SampleArray. Fields can not be added or removed.
+    """
+
+    def __init__(self, sample_array, index):
+        self.sample_array = sample_array
+        self.index = index
+
+    def __getitem__(self, key):
+        return self.sample_array.columns[key][self.index].tolist()
+
+    def __setitem__(self, key, value):
+        if key not in self.sample_array.columns:
+            raise KeyError(key)
+        self.sample_array._set(key, self.index, value)
+
+    def __delitem__(self, key):
+        raise TypeError('fields of a SampleView can not be deleted')
+
+    def __iter__(self):
+        return iter(self.sample_array.columns)
+
+    def __len__(self):
+        return len(self.sample_array.columns)
+
+    def __contains__(self, key):
+        return key in self.sample_array.columns
+
+    def __repr__(self):
+        return 'SampleView(%r)' % dict(self)
+
+
+def _sampleColumns(samples):
+    # builds the arrays of a SampleArray, all samples need the same fields
+    if not samples:
+        return dict()
+    keys = list(samples[0])
+    columns = dict()
+    for sample in samples:
+        if len(sample) != len(keys) or not all(key in sample for key in keys):
+            raise ValueError('samples do not all have the same fields')
+    for key in keys:
+        try:
+            column = np.array([sample[key] for sample in samples])
+        except ValueError:
+            raise ValueError(key + ' does not have the same length in all samples')
+        if column.dtype.kind not in 'biuf' or column.ndim > 2:
+            raise ValueError(key + ' is neither integer nor float')
+        columns[key] = _compact(column)
+    return columns
+
+
+def _compact(values):
+    # converts integer arrays to the smallest dtype holding their values
+    if values.dtype.kind not in 'iu' or values.size == 0:
+        return values
+    low, high = int(values.min()), int(values.max())
+    if low >= 0:
+        dtype = np.min_scalar_type(high)
+    else:
+        # signed, the maximum needs to fit as well, e.g. int8 for [-128, 127]
+        dtype = np.result_type(np.min_scalar_type(low), np.min_scalar_type(min(-high - 1, low)))
+    return values.astype(dtype, copy=False)
@@ -0,0 +1,160 @@
+from inphase.binarydecoder import SERIAL_FRAME_START, SERIAL_FRAME_END, SERIAL_ESCAPE_BYTE, SERIAL_ESCAPE_ADD
+from inphase.binarydecoder import MINIMUM_FRAME_LENGTH, _parseFrame, _toMeasurement, _protocolVersion, _escapedFrameLengthLimit
+from inphase.parameterdecoder import LINE_END, _parse_line
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+_TEXT = -1  # a start byte that does not start a frame
+_WAIT = -2  # more data is needed to decide
+
+
+class StreamDemultiplexer:
+    """Splits a byte stream into parameter lines, binary frames and other data in a single pass.
+
+    Every byte is classified once: binary frames (`<...>`) are decoded to measurements, `key: value\\r\\n` lines
+    are decoded to parameters and all other lines are passed on as clean data. A start byte is only taken as the
+    beginning of a frame if it is followed by a valid frame header, so text like `>>-- inphasectl --<<` does not
+    hold back the lines that follow it. Frames interrupting a line are removed from the line.
+
+    Args:
+        on_parameters (callable, optional): called with a dict of decoded parameters
+        on_measurements (callable, optional): called with a list of decoded measurements
+        on_clean (callable, optional): called with clean data
+        timestamp (bool, optional): Add the current time as timestamp to every decoded measurement.
+    """
+
+    def __init__(self, on_parameters=None, on_measurements=None, on_clean=None, timestamp=True):
+        self.on_parameters = on_parameters
+        self.on_measurements = on_measurements
+        self.on_clean = on_clean
+        self.timestamp = timestamp
+        self._buffer = bytearray()
+        self._line = bytearray()  # beginning of the current line if it was interrupted by a frame
+        self._pos = 0  # start of unclassified data in the buffer
+        self._line_end = -1  # position of the next line end, -1 if not found yet
+        self._line_scan = 0  # position from which to continue searching for a line end
+        self._frame_start = -1  # position of the next start byte, -1 if not found yet
+        self._start_scan = 0  # position from which to continue searching for a start byte
+        self._end_scan = 0  # position from which to continue searching for the end byte of a frame
+
+    @property
+    def remaining(self):
+        """Data that still needs parsing, i.e. an incomplete line or frame."""
+        return bytes(self._line + self._buffer[self._pos:])
+
+    def feed(self, data):
+        """Adds data to the stream, dispatches the results to the callbacks and returns decoded parameters, measurements and clean data."""
+        parameters = dict()
+        measurements = list()
+        clean_data = bytearray()
+
+        buf = self._buffer
+        buf += data
+
+        while True:
+            if self._line_end < self._pos:
+                self._line_end = buf.find(LINE_END, max(self._pos, self._line_scan))
+                if self._line_end == -1:
+                    # the last byte might be the first byte of a line end
+                    self._line_scan = max(self._pos, len(buf) - 1)
+
+            if self._frame_start < self._pos:
+                self._frame_start = buf.find(SERIAL_FRAME_START, max(self._pos, self._start_scan))
+                if self._frame_start == -1:
+                    self._start_scan = len(buf)
+
+            if self._frame_start != -1 and (self._line_end == -1 or self._frame_start < self._line_end):
+                start = self._frame_start
+                end = self._frameEnd(start)
+                if end == _WAIT:
+                    break
+                if end == _TEXT:
+                    # continue searching for frames after this start byte
+                    self._start_scan = start + 1
+                    self._frame_start = -1
+                    continue
+
+                # the frame starts at the last start byte in front of the end byte
+                last_start = buf.rfind(SERIAL_FRAME_START, start + 1, end)
+                if last_start != -1:
+                    start = last_start
+
+                raw_frame = buf[start:end + 1]
+                measurement_data = _parseFrame(raw_frame)
+
+                # data in front of the frame belongs to the current line
+                self._line += buf[self._pos:start]
+                if measurement_data is None:
+                    # frame was invalid, it might be part of the line
+                    self._line += raw_frame
+                else:
+                    measurements.append(_toMeasurement(measurement_data, self.timestamp))
+                self._pos = end + 1
+
+            elif self._line_end != -1:
+                line = buf[self._pos:self._line_end]
+                if self._line:
+                    line = self._line + line
+                    self._line = bytearray()
+                self._pos = self._line_end + len(LINE_END)
+
+                key, value = _parse_line(line.decode(errors='replace'))
+                if key:
+                    parameters[key] = value
+                else:
+                    clean_data += line + LINE_END
+
+            else:
+                # incomplete line
+                break
+
+        self._compact()
+
+        if parameters and self.on_parameters:
+            self.on_parameters(parameters)
+        if measurements and self.on_measurements:
+            self.on_measurements(measurements)
+        if clean_data and self.on_clean:
+            self.on_clean(clean_data)
+
+        return parameters, measurements, clean_data
+
+    def _frameEnd(self, start):
+        # returns the position of the end byte of the frame beginning at start, _TEXT or _WAIT
+        buf = self._buffer
+
+        # check the version field, escaped or not
+        if start + 2 >= len(buf):
+            return _WAIT
+        version = buf[start + 1]
+        if version == SERIAL_ESCAPE_BYTE:
+            version = (buf[start + 2] + SERIAL_ESCAPE_ADD) % 256
+        if _protocolVersion(version)[0] is None:
+            return _TEXT
+
+        end = buf.find(SERIAL_FRAME_END, max(start + 1, self._end_scan))
+        if end != -1:
+            return end
+        self._end_scan = len(buf)
+
+        # give up on the frame once more data arrived than a frame with this header can have
+        if len(buf) - start > 2 * MINIMUM_FRAME_LENGTH:
+            limit = _escapedFrameLengthLimit(buf[start + 1:])
+            if limit is None or len(buf) - start > limit:
+                return _TEXT
+        return _WAIT
+
+    def _compact(self):
+        # drop classified data once it makes up most of the buffer, this keeps the amortized cost linear
+        if self._pos <= len(self._buffer) // 2:
+            return
+        pos = self._pos
+        del self._buffer[:pos]
+        self._pos = 0
+        self._line_scan = max(0, self._line_scan - pos)
+        self._start_scan = max(0, self._start_scan - pos)
+        self._end_scan = max(0, self._end_scan - pos)
+        self._line_end = self._line_end - pos if self._line_end >= pos else -1
+        self._frame_start = self._frame_start - pos if self._frame_start >= pos else -1
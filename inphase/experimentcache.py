@@ -0,0 +1,406 @@
+from inphase.compression import decompress
+from inphase.dataformat import CACHE_SUFFIX, TEMP_SUFFIX
+from inphase.dataformat import Measurement, ProjectedMeasurement, _internNodes, internNode
+
+from struct import Struct
+import hashlib
+import os
+import pickle
+import logging
+
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT_VERSION = 5  # increase whenever the layout of cache files or the stored objects change
+CACHE_MAGIC = b'INPHCACH'
+
+_TRAILER = Struct('<Q8s')  # offset of the header, magic
+_HASH_BLOCK_SIZE = 1024 * 1024
+_MIN_STALE_SIZE = 64 * 1024  # bytes of outdated headers and indexes a cache file keeps before it is compacted
+
+
+class ExperimentCache:
+    """Cache of parsed and validated experiment files.
+
+    Measurements are stored field by field as pickled, already validated :class:`inphase.dataformat.Measurement`
+    contents, so loading skips both YAML parsing and validation. A cache file is only used if its format version
+    matches and size and SHA-1 hash of the experiment file are the ones it was created from. The hash is only
+    computed if the modification time of the experiment file changed, the new time is recorded if the hash matches.
+
+    If measurements were appended to the experiment file since, i.e. the start of the file still has size and hash
+    the cache file was created from, only the appended part is parsed and added to the cache file as a new segment.
+    This also works for compressed experiment files, where every append adds complete compressed members that can be
+    decompressed on their own, see :func:`inphase.compression.openFile`. Updates are appended to the cache file,
+    once the outdated parts take more space than the cached data the file is rewritten without them.
+
+    By default the cache file is placed next to the experiment file. With a `cache_dir`, cache files of all
+    experiments are kept in that directory and, if `max_size` is given, the least recently used ones are deleted
+    once their total size exceeds it.
+
+    Args:
+        cache_dir (str, optional): central directory for cache files
+        max_size (int, optional): maximum total size of the cache files in `cache_dir` in bytes
+    """
+
+    def __init__(self, cache_dir=None, max_size=None):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    def path(self, source_path):
+        """Returns the cache file used for an experiment file."""
+        if self.cache_dir is None:
+            return source_path + CACHE_SUFFIX
+        name = hashlib.sha1(os.path.abspath(source_path).encode()).hexdigest()
+        return os.path.join(self.cache_dir, name + CACHE_SUFFIX)
+
+    def load(self, source_path, fields=None):
+        """Returns the cached measurements of an experiment file or None if there is no valid cache file.
+
+        With `fields`, only these fields are read and the measurements are
+        :class:`inphase.dataformat.ProjectedMeasurement` objects.
+        """
+        cache_path = self.path(source_path)
+        try:
+            with open(cache_path, 'rb') as f:
+                header = _readHeader(f)
+                if header is None or header.get('version') != CACHE_FORMAT_VERSION:
+                    logger.info("cache file %s is outdated", cache_path)
+                    return None
+                source_mtime = header.get('source_mtime')
+                source_sha1 = _appendedHash(header, source_path)
+                if source_sha1 is None and not _isValid(header, source_path):
+                    logger.info("cache file %s is outdated", cache_path)
+                    return None
+                segments = list()
+                for segment in header['segments']:
+                    columns = {key: _readSection(f, section) for key, section in segment['fields'].items()
+                               if fields is None or key in fields}
+                    segments.append((columns, segment['count']))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("ignoring unreadable cache file %s: %s", cache_path, e)
+            return None
+
+        measurements = list()
+        registry = dict()  # identical nodes of all segments share their values, see internNode
+        for columns, count in segments:
+            measurements += _fromColumns(columns, count, fields, registry)
+
+        if source_sha1 is not None:
+            # measurements were appended to the experiment file since the cache file was written
+            appended = self._refresh(source_path, header, source_sha1)
+            if appended is None:
+                return None
+            if fields is not None:
+                appended = [ProjectedMeasurement.trusted(m, loaded_fields=fields) for m in appended]
+            measurements += appended
+        else:
+            if header['source_mtime'] != source_mtime:
+                # the experiment file was touched or copied, but not changed
+                self._updateHeader(cache_path, header)
+            if self.cache_dir is not None:
+                # mark as recently used
+                os.utime(cache_path)
+
+        return measurements
+
+    def isValid(self, source_path):
+        """Returns whether the cache file of an experiment file is up to date, without reading the measurements."""
+        try:
+            with open(self.path(source_path), 'rb') as f:
+                header = _readHeader(f)
+                return header is not None and _isValid(header, source_path)
+        except Exception:
+            return False
+
+    def store(self, source_path, measurements):
+        """Writes a cache file for the measurements of an experiment file."""
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+        cache_path = self.path(source_path)
+        temp_path = cache_path + TEMP_SUFFIX
+        stat = os.stat(source_path)
+        header = {
+            'version': CACHE_FORMAT_VERSION,
+            'source_size': stat.st_size,
+            'source_mtime': stat.st_mtime_ns,
+            'source_sha1': _hashFile(source_path),
+            'count': 0,
+            'segments': list(),
+        }
+
+        with open(temp_path, 'wb') as f:
+            _writeSegment(f, header, measurements)
+        os.replace(temp_path, cache_path)
+
+        if self.cache_dir is not None and self.max_size is not None:
+            self.evict(keep=cache_path)
+
+    def _refresh(self, source_path, header, source_sha1):
+        # parses the appended end of the experiment file and adds its measurements to the cache file as a new
+        # segment, returns them or None if that end can not be parsed on its own
+        from inphase.dataformat import Loader, Measurement, validateMeasurements
+        import yaml
+
+        # taken before reading, the hash is checked on the next load if the file changes meanwhile
+        source_mtime = os.stat(source_path).st_mtime_ns
+        with open(source_path, 'rb') as f:
+            f.seek(header['source_size'])
+            tail = f.read()
+        size = header['source_size'] + len(tail)
+        try:
+            tail = decompress(source_path, tail).decode()
+            lines = [line for line in tail.splitlines() if line.strip() and not line.lstrip().startswith('#')]
+            if lines and not lines[0].startswith('-'):
+                # e.g. more samples of the last measurement
+                raise Exception('appended data does not start with a new measurement')
+            data = yaml.load(tail, Loader=Loader) or list()
+            if not isinstance(data, list):
+                raise Exception('appended data is no list of measurements')
+            validateMeasurements(data)
+        except Exception as e:
+            logger.info("can not refresh cache file for %s: %s", source_path, e)
+            return None
+        registry = dict()
+        measurements = [_internNodes(Measurement.trusted(m), registry) for m in data]
+
+        cache_path = self.path(source_path)
+        logger.info("adding %d appended measurements to cache file %s", len(measurements), cache_path)
+        header['source_size'] = size
+        header['source_mtime'] = source_mtime
+        header['source_sha1'] = source_sha1
+        header.pop('index', None)
+        try:
+            with open(cache_path, 'r+b') as f:
+                # the old header stays in the file, the new one follows the new segment
+                f.seek(0, os.SEEK_END)
+                header_offset = _writeSegment(f, header, measurements)
+            self._compactIfStale(cache_path, header, header_offset)
+        except OSError as e:
+            logger.warning("can not update cache file %s: %s", cache_path, e)
+        return measurements
+
+    def _updateHeader(self, cache_path, header):
+        # appends a changed header to the cache file
+        try:
+            with open(cache_path, 'r+b') as f:
+                f.seek(0, os.SEEK_END)
+                header_offset = _writeHeader(f, header)
+            self._compactIfStale(cache_path, header, header_offset)
+        except OSError as e:
+            logger.warning("can not update cache file %s: %s", cache_path, e)
+
+    def _compactIfStale(self, cache_path, header, header_offset):
+        # everything in front of the header that is not a section of it is outdated
+        live = _liveSize(header)
+        if header_offset - live > max(live, _MIN_STALE_SIZE):
+            logger.info("compacting cache file %s", cache_path)
+            _compact(cache_path)
+
+    def loadIndex(self, source_path):
+        """Returns the :class:`inphase.experimentindex.ExperimentIndex` stored with the cached measurements or None."""
+        cache_path = self.path(source_path)
+        try:
+            with open(cache_path, 'rb') as f:
+                header = _readHeader(f)
+                if header is None or 'index' not in header or not _isValid(header, source_path):
+                    return None
+                return _readSection(f, header['index'])
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("ignoring unreadable index in cache file %s: %s", cache_path, e)
+            return None
+
+    def storeIndex(self, source_path, index):
+        """Adds an index to the cache file of an experiment file, if there is a valid one."""
+        cache_path = self.path(source_path)
+        try:
+            with open(cache_path, 'r+b') as f:
+                header = _readHeader(f)
+                if header is None or not _isValid(header, source_path):
+                    return
+                # the old header stays in the file, the new one follows the index
+                f.seek(0, os.SEEK_END)
+                offset = f.tell()
+                pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+                header['index'] = (offset, f.tell() - offset)
+                header_offset = _writeHeader(f, header)
+            self._compactIfStale(cache_path, header, header_offset)
+        except FileNotFoundError:
+            pass
+
+    def evict(self, keep=None):
+        """Deletes the least recently used cache files until their total size is below `max_size`."""
+        entries = list()
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(CACHE_SUFFIX) and entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            logger.info("evicting cache file %s", path)
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def _writeSegment(f, header, measurements):
+    # writes the measurements as new segment at the current position of f, followed by header and trailer
+    segment = {'count': len(measurements), 'fields': dict()}
+    for key, column in _toColumns(measurements).items():
+        offset = f.tell()
+        pickle.dump(column, f, protocol=pickle.HIGHEST_PROTOCOL)
+        segment['fields'][key] = (offset, f.tell() - offset)
+    header['segments'].append(segment)
+    header['count'] += len(measurements)
+    return _writeHeader(f, header)
+
+
+def _writeHeader(f, header):
+    # writes header and trailer at the current position of f, returns the offset of the header
+    header_offset = f.tell()
+    pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+    f.write(_TRAILER.pack(header_offset, CACHE_MAGIC))
+    return header_offset
+
+
+def _liveSize(header):
+    # bytes of the sections the header refers to
+    sections = [section for segment in header['segments'] for section in segment['fields'].values()]
+    if 'index' in header:
+        sections.append(header['index'])
+    return sum(length for offset, length in sections)
+
+
+def _compact(cache_path):
+    # rewrites the cache file with only the sections of its current header, the file is replaced atomically
+    temp_path = cache_path + TEMP_SUFFIX
+    with open(cache_path, 'rb') as source, open(temp_path, 'wb') as target:
+        header = _readHeader(source)
+
+        def copy(section):
+            offset, length = section
+            source.seek(offset)
+            new_offset = target.tell()
+            target.write(source.read(length))
+            return (new_offset, length)
+
+        for segment in header['segments']:
+            segment['fields'] = {key: copy(section) for key, section in segment['fields'].items()}
+        if 'index' in header:
+            header['index'] = copy(header['index'])
+        _writeHeader(target, header)
+    os.replace(temp_path, cache_path)
+
+
+def _hashFile(path, size=None):
+    # returns the SHA-1 of the file, with size a tuple of the SHA-1 of its first size bytes and of the whole file
+    sha1 = hashlib.sha1()
+    prefix = None
+    with open(path, 'rb') as f:
+        if size is not None:
+            remaining = size
+            while remaining > 0:
+                block = f.read(min(_HASH_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                sha1.update(block)
+                remaining -= len(block)
+            prefix = sha1.hexdigest()
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b''):
+            sha1.update(block)
+    if size is not None:
+        return prefix, sha1.hexdigest()
+    return sha1.hexdigest()
+
+
+def _appendedHash(header, source_path):
+    # returns the SHA-1 of the experiment file if it only grew since the cache file was written, None otherwise
+    if os.path.getsize(source_path) <= header['source_size']:
+        return None
+    prefix, sha1 = _hashFile(source_path, header['source_size'])
+    if prefix != header['source_sha1']:
+        return None
+    return sha1
+
+
+def _isValid(header, source_path):
+    # size and modification time are compared first, the file is only hashed if the time differs and the header
+    # gets the new time if the hash matches
+    if header.get('version') != CACHE_FORMAT_VERSION:
+        return False
+    stat = os.stat(source_path)
+    if header['source_size'] != stat.st_size:
+        return False
+    if header.get('source_mtime') == stat.st_mtime_ns:
+        return True
+    if header['source_sha1'] != _hashFile(source_path):
+        return False
+    header['source_mtime'] = stat.st_mtime_ns
+    return True
+
+
+def _readHeader(f):
+    # returns the header of a cache file or None if the file is no cache file of this format
+    f.seek(0, os.SEEK_END)
+    if f.tell() < _TRAILER.size:
+        return None
+    f.seek(-_TRAILER.size, os.SEEK_END)
+    header_offset, magic = _TRAILER.unpack(f.read(_TRAILER.size))
+    if magic != CACHE_MAGIC:
+        return None
+    f.seek(header_offset)
+    return pickle.load(f)
+
+
+def _readSection(f, section):
+    offset, length = section
+    f.seek(offset)
+    return pickle.loads(f.read(length))
+
+
+def _toColumns(measurements):
+    # one column per field, holding the indices of the measurements having it (None for all) and their values
+    keys = dict.fromkeys(key for m in measurements for key in m)
+    columns = dict()
+    for key in keys:
+        values = [m[key] for m in measurements if key in m]
+        if len(values) == len(measurements):
+            columns[key] = (None, values)
+        else:
+            columns[key] = ([i for i, m in enumerate(measurements) if key in m], values)
+    return columns
+
+
+def _fromColumns(columns, count, fields=None, registry=None):
+    # the stored values were validated before they were cached, so the measurements are not constructed again
+    rows = [dict() for i in range(count)]
+    for key, (indices, values) in columns.items():
+        if key in ('initiator', 'reflector'):
+            # every measurement gets a node of its own
+            values = [internNode(value, registry) for value in values]
+        if indices is None:
+            for row, value in zip(rows, values):
+                row[key] = value
+        else:
+            for i, value in zip(indices, values):
+                rows[i][key] = value
+
+    cls = Measurement if fields is None else ProjectedMeasurement
+    measurements = list()
+    for row in rows:
+        measurement = cls.__new__(cls)
+        dict.update(measurement, row)
+        if fields is not None:
+            measurement.loaded_fields = fields
+        measurements.append(measurement)
+    return measurements
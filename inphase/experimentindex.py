@@ -0,0 +1,111 @@
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ExperimentIndex:
+    """Indexes on the fields experiments are usually filtered by.
+
+    Reflector uids, initiator uids and links, i.e. pairs of initiator and reflector uid, map to the sorted indices of
+    their measurements. Timestamps and real distances are kept sorted together with the indices of their measurements,
+    so ranges are found by binary search. The index is built once from a list of measurements and can be pickled,
+    see :meth:`inphase.dataformat.Experiment.query`.
+
+    Args:
+        measurements (sequence): measurements to index
+    """
+
+    def __init__(self, measurements):
+        self.count = len(measurements)
+
+        reflectors = dict()
+        initiators = dict()
+        links = dict()
+        timestamps = list()
+        distances = list()
+        nlos = list()
+        los = list()
+        for i, m in enumerate(measurements):
+            initiator = m['initiator'].get('uid') if 'initiator' in m else None
+            reflector = m['reflector'].get('uid') if 'reflector' in m else None
+            if initiator is not None:
+                initiators.setdefault(initiator, list()).append(i)
+            if reflector is not None:
+                reflectors.setdefault(reflector, list()).append(i)
+            if initiator is not None or reflector is not None:
+                links.setdefault((initiator, reflector), list()).append(i)
+            if 'timestamp' in m:
+                timestamps.append((m['timestamp'], i))
+            if 'real_distance' in m:
+                distances.append((m['real_distance'], i))
+            if 'real_nlos' in m:
+                (nlos if m['real_nlos'] else los).append(i)
+
+        self.reflectors = {uid: np.array(indices, dtype=np.int64) for uid, indices in reflectors.items()}
+        self.initiators = {uid: np.array(indices, dtype=np.int64) for uid, indices in initiators.items()}
+        self.links = {link: np.array(indices, dtype=np.int64) for link, indices in links.items()}
+        self.timestamps, self.timestamp_order = _sortedColumn(timestamps)
+        self.real_distances, self.real_distance_order = _sortedColumn(distances)
+        self.nlos = np.array(nlos, dtype=np.int64)
+        self.los = np.array(los, dtype=np.int64)
+
+    def select(self, reflector=None, initiator=None, link=None, start=None, end=None, min_distance=None,
+               max_distance=None, nlos=None):
+        """Returns the sorted indices of the measurements matching all given criteria.
+
+        Args:
+            reflector (str, optional): uid of the reflector
+            initiator (str, optional): uid of the initiator
+            link (tuple, optional): uids of initiator and reflector
+            start (float, optional): minimum timestamp
+            end (float, optional): timestamp the measurements have to be before
+            min_distance (float, optional): minimum real_distance
+            max_distance (float, optional): maximum real_distance
+            nlos (bool, optional): value of real_nlos
+
+        Returns:
+            numpy.ndarray: indices of the measurements
+        """
+        selections = list()
+        if reflector is not None:
+            selections.append(self.reflectors.get(reflector, _EMPTY))
+        if initiator is not None:
+            selections.append(self.initiators.get(initiator, _EMPTY))
+        if link is not None:
+            selections.append(self.links.get(tuple(link), _EMPTY))
+        if nlos is not None:
+            selections.append(self.nlos if nlos else self.los)
+        if start is not None or end is not None:
+            selections.append(_range(self.timestamps, self.timestamp_order, start, end, 'left'))
+        if min_distance is not None or max_distance is not None:
+            selections.append(_range(self.real_distances, self.real_distance_order, min_distance, max_distance, 'right'))
+
+        if not selections:
+            return np.arange(self.count)
+
+        # intersect the smallest selections first
+        selections.sort(key=len)
+        indices = selections[0]
+        for selection in selections[1:]:
+            if not len(indices):
+                break
+            indices = np.intersect1d(indices, selection, assume_unique=True)
+        return indices
+
+
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+
+def _sortedColumn(values):
+    # returns the sorted values and the indices of their measurements
+    values = np.array([v for v, i in values], dtype=np.float64), np.array([i for v, i in values], dtype=np.int64)
+    order = np.argsort(values[0], kind='stable')
+    return values[0][order], values[1][order]
+
+
+def _range(values, order, low, high, high_side):
+    # indices of the measurements with low <= value and value < high ('left') or value <= high ('right'), sorted
+    begin = 0 if low is None else np.searchsorted(values, low, 'left')
+    end = len(values) if high is None else np.searchsorted(values, high, high_side)
+    return np.sort(order[begin:end])
@@ -0,0 +1,146 @@
+from inphase.binarydecoder import INDEX_SUFFIX
+from inphase.binaryexperiment import isBinaryExperiment
+from inphase.columnar import COLUMNAR_EXPERIMENT_SUFFIX
+from inphase.dataformat import SIDECAR_SUFFIXES, Experiment
+from inphase.experimentcache import ExperimentCache
+
+import concurrent.futures
+import glob
+import heapq
+import itertools
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ExperimentSet:
+    """Many experiment files treated as one logical experiment.
+
+    Long campaigns are often split into shards, e.g. one file per day and initiator. Every shard is an
+    :class:`inphase.dataformat.Experiment` of its own, with its own cache file, and shards without an up to date cache
+    file can be parsed by a pool of processes. Iterating over the set merges the measurements of all shards by
+    timestamp on the fly, assuming every shard is in chronological order like files written by appending measurements
+    are. Measurements without a
+    timestamp are treated as older than all others.
+
+    :meth:`getIndex` and :meth:`query` work like for a single experiment on the merged measurements. Measurements
+    added with :meth:`addMeasurements` are appended to the shard returned by `shard` for each of them, new files
+    (and their directories) are created and become new shards of the set.
+
+    Args:
+        paths (str or list): experiment file names or glob patterns, e.g. 'campaign/*/*.yml'. Sidecar files like
+            caches, summaries, frame indexes and temporary files of interrupted writes are ignored, patterns not
+            matching any file are allowed.
+        shard (callable, optional): returns the file name of the shard a new measurement is appended to, by default
+            measurements are appended to the last shard in the sorted order of the file names
+        processes (int, optional): number of processes parsing YAML shards without an up to date cache file in
+            parallel, `None` uses all CPUs. The processes only write the cache files, all shards are loaded by this
+            process. Not used with `lazy` or without `caching`.
+        **kwargs: passed to every :class:`inphase.dataformat.Experiment`, e.g. `lazy`, `fields`, `caching` or
+            `cache_dir`
+    """
+
+    def __init__(self, paths, shard=None, processes=1, **kwargs):
+        if isinstance(paths, str):
+            paths = [paths]
+        self.shard = shard
+        self.kwargs = kwargs
+        self.lazy = kwargs.get('lazy', False)
+        self._measurements = None
+        self._index = None
+
+        file_paths = set()
+        for pattern in paths:
+            file_paths.update(path for path in glob.glob(pattern)
+                              if os.path.isfile(path) and not path.endswith(SIDECAR_SUFFIXES + (INDEX_SUFFIX,)))
+        file_paths = sorted(file_paths)
+
+        if processes is None:
+            processes = os.cpu_count()
+        if processes != 1 and not self.lazy and kwargs.get('caching', True):
+            # passing loaded experiments back costs more than loading cached ones here
+            cache = ExperimentCache(kwargs.get('cache_dir'))
+            misses = [path for path in file_paths if _isCachedYAML(path) and not cache.isValid(path)]
+            if len(misses) > 1:
+                logger.info("parsing %d shards with %d processes", len(misses), processes)
+                with concurrent.futures.ProcessPoolExecutor(min(processes, len(misses))) as executor:
+                    list(executor.map(_warmCache, misses, itertools.repeat(kwargs)))
+        self.experiments = {path: Experiment(path, **kwargs) for path in file_paths}
+
+    def __iter__(self):
+        return self.iterMeasurements()
+
+    def __len__(self):
+        return sum(len(experiment) for experiment in self.experiments.values())
+
+    @property
+    def measurements(self):
+        """List of the measurements of all shards merged by timestamp, built on first use."""
+        if self.lazy:
+            raise Exception('measurements of lazy experiment sets are only available by iterating')
+        if self._measurements is None:
+            self._measurements = list(self.iterMeasurements())
+        return self._measurements
+
+    def iterMeasurements(self):
+        """Returns an iterator over the measurements of all shards, merged by timestamp.
+
+        The shards are iterated at the same time, lazy shards are read from their files one measurement at a time.
+        """
+        shards = [iter(self.experiments[path]) for path in sorted(self.experiments)]
+        return heapq.merge(*shards, key=_timestamp)
+
+    def getIndex(self):
+        """Returns the :class:`inphase.experimentindex.ExperimentIndex` of the merged measurements, built on first use."""
+        if self.lazy:
+            raise Exception('lazy experiment sets can not be indexed')
+        if self._index is None:
+            from inphase.experimentindex import ExperimentIndex
+            self._index = ExperimentIndex(self.measurements)
+        return self._index
+
+    def query(self, **criteria):
+        """Returns a list of the measurements matching all criteria, see :meth:`inphase.dataformat.Experiment.query`."""
+        measurements = self.measurements
+        return [measurements[i] for i in self.getIndex().select(**criteria).tolist()]
+
+    def addMeasurements(self, measurements):
+        # appends every measurement to its shard, each shard file is written once
+        shards = dict()
+        for measurement in measurements:
+            shards.setdefault(self._shardPath(measurement), list()).append(measurement)
+
+        self._measurements = None
+        self._index = None
+        for path, shard_measurements in shards.items():
+            if path not in self.experiments:
+                logger.info("adding shard %s", path)
+                if os.path.dirname(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                self.experiments[path] = Experiment(path, **self.kwargs)
+            self.experiments[path].addMeasurements(shard_measurements)
+
+    def addMeasurement(self, measurement):
+        self.addMeasurements([measurement])
+
+    def _shardPath(self, measurement):
+        if self.shard is not None:
+            return self.shard(measurement)
+        if not self.experiments:
+            raise Exception('experiment set has no shard to append to')
+        return max(self.experiments)
+
+
+def _isCachedYAML(path):
+    # binary and columnar experiments are read without a cache file
+    return not path.endswith(COLUMNAR_EXPERIMENT_SUFFIX) and not isBinaryExperiment(path)
+
+
+def _warmCache(path, kwargs):
+    # parses a shard to write its cache file, the cache needs all fields
+    Experiment(path, cache_dir=kwargs.get('cache_dir'), max_cache_size=kwargs.get('max_cache_size'))
+
+
+def _timestamp(measurement):
+    return measurement.get('timestamp', float('-inf'))
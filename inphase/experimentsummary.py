@@ -0,0 +1,165 @@
+from inphase.dataformat import SUMMARY_SUFFIX, TEMP_SUFFIX
+
+import hashlib
+import json
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FORMAT_VERSION = 2  # increase whenever the layout of summary files or ExperimentSummary change
+
+
+class ExperimentSummary:
+    """Overview of the measurements of an experiment that is cheap to keep up to date.
+
+    Summaries are stored as JSON in a small sidecar file, see :meth:`inphase.dataformat.Experiment.summary`, and can
+    be updated with new measurements without looking at the old ones again.
+
+    Attributes:
+        count (int): number of measurements
+        links (dict): number of measurements per tuple of initiator and reflector uid, a uid is None if the node
+            has none
+        nodes (dict): the last seen initiator or reflector node per uid
+        timestamp_min (float): timestamp of the oldest measurement, None if no measurement has one
+        timestamp_max (float): timestamp of the newest measurement, None if no measurement has one
+        real_distances (dict): number of measurements per real_distance value
+        sample_geometry (dict): number of measurements per tuple of number of samples and number of pmu_values of
+            the first sample, measurements without samples are not counted
+
+    Args:
+        measurements (iterable, optional): measurements to start with
+    """
+
+    def __init__(self, measurements=()):
+        self.count = 0
+        self.links = dict()
+        self.nodes = dict()
+        self.timestamp_min = None
+        self.timestamp_max = None
+        self.real_distances = dict()
+        self.sample_geometry = dict()
+        self.update(measurements)
+
+    def __repr__(self):
+        return '<ExperimentSummary: %d measurements, %d links, %s - %s>' % (
+            self.count, len(self.links), self.timestamp_min, self.timestamp_max)
+
+    def update(self, measurements):
+        """Adds measurements to the summary."""
+        for m in measurements:
+            self.count += 1
+
+            uids = list()
+            for key in ('initiator', 'reflector'):
+                node = m.get(key)
+                uid = node.get('uid') if node is not None else None
+                if uid is not None:
+                    self.nodes[uid] = {name: _plain(value) for name, value in dict.items(node)}
+                uids.append(uid)
+            if uids != [None, None]:
+                link = tuple(uids)
+                self.links[link] = self.links.get(link, 0) + 1
+
+            if 'timestamp' in m:
+                timestamp = m['timestamp']
+                if self.timestamp_min is None or timestamp < self.timestamp_min:
+                    self.timestamp_min = timestamp
+                if self.timestamp_max is None or timestamp > self.timestamp_max:
+                    self.timestamp_max = timestamp
+
+            if 'real_distance' in m:
+                distance = m['real_distance']
+                self.real_distances[distance] = self.real_distances.get(distance, 0) + 1
+
+            samples = m.get('samples')
+            if samples:
+                geometry = (len(samples), len(samples[0].get('pmu_values', ())))
+                self.sample_geometry[geometry] = self.sample_geometry.get(geometry, 0) + 1
+
+
+def _plain(value):
+    # copies nested lists, those of loaded nodes are read without making the node copy them, see internNode
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    return value
+
+
+def summaryPath(source_path, cache_dir=None):
+    """Returns the summary sidecar file of an experiment file.
+
+    Like cache files, see :meth:`inphase.experimentcache.ExperimentCache.path`, it is placed next to the experiment
+    file or, with a `cache_dir`, in that directory.
+    """
+    if cache_dir is None:
+        return source_path + SUMMARY_SUFFIX
+    name = hashlib.sha1(os.path.abspath(source_path).encode()).hexdigest()
+    return os.path.join(cache_dir, name + SUMMARY_SUFFIX)
+
+
+def loadSummary(source_path, cache_dir=None):
+    """Returns the summary stored for an experiment file or None if there is no up to date one.
+
+    A summary is only up to date if size and modification time of the experiment file are the ones it was stored
+    for, so changes not made through :meth:`inphase.dataformat.Experiment.addMeasurements` are noticed.
+    """
+    path = summaryPath(source_path, cache_dir)
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        stat = os.stat(source_path)
+        if data.get('version') != SUMMARY_FORMAT_VERSION:
+            logger.info("summary file %s is outdated", path)
+            return None
+        if data.get('source_size') != stat.st_size or data.get('source_mtime') != stat.st_mtime_ns:
+            logger.info("summary file %s is outdated", path)
+            return None
+        return _fromJSON(data)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("ignoring unreadable summary file %s: %s", path, e)
+        return None
+
+
+def storeSummary(source_path, summary, cache_dir=None):
+    """Writes the summary of an experiment file in its current state."""
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+    path = summaryPath(source_path, cache_dir)
+    stat = os.stat(source_path)
+    data = _toJSON(summary)
+    data.update({
+        'version': SUMMARY_FORMAT_VERSION,
+        'source_size': stat.st_size,
+        'source_mtime': stat.st_mtime_ns,
+    })
+    temp_path = path + TEMP_SUFFIX
+    with open(temp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+
+def _toJSON(summary):
+    # plain JSON, summary files are read without trusting them
+    return {
+        'count': summary.count,
+        'links': [[initiator, reflector, count] for (initiator, reflector), count in summary.links.items()],
+        'nodes': list(summary.nodes.values()),
+        'timestamp_min': summary.timestamp_min,
+        'timestamp_max': summary.timestamp_max,
+        'real_distances': [[distance, count] for distance, count in summary.real_distances.items()],
+        'sample_geometry': [[samples, values, count] for (samples, values), count in summary.sample_geometry.items()],
+    }
+
+
+def _fromJSON(data):
+    summary = ExperimentSummary.__new__(ExperimentSummary)
+    summary.count = data['count']
+    summary.links = {(initiator, reflector): count for initiator, reflector, count in data['links']}
+    summary.nodes = {node['uid']: node for node in data['nodes']}
+    summary.timestamp_min = data['timestamp_min']
+    summary.timestamp_max = data['timestamp_max']
+    summary.real_distances = {distance: count for distance, count in data['real_distances']}
+    summary.sample_geometry = {(samples, values): count for samples, values, count in data['sample_geometry']}
+    return summary
@@ -0,0 +1,123 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 10000  # measurements waiting to be written
+DEFAULT_BATCH_SIZE = 1000  # measurements written at once at most
+DEFAULT_FLUSH_INTERVAL = 1  # seconds
+
+
+class ExperimentWriter:
+    """Appends measurements to an experiment in a background thread.
+
+    :meth:`addMeasurements` only puts the measurements in a queue, a background thread collects them for up to
+    `flush_interval` seconds and writes them with a single call of :meth:`inphase.dataformat.Experiment.addMeasurements`,
+    so the file is opened and dumped to once per batch instead of once per measurement. If the queue is full,
+    :meth:`addMeasurements` blocks until the writer caught up.
+
+    Errors of the background thread are raised by the next call of :meth:`addMeasurements`, :meth:`flush` or
+    :meth:`close`. The writer can be used as a context manager, it is closed on exit. While it is open, measurements
+    should not be added to the experiment directly.
+
+    Args:
+        experiment (:class:`inphase.dataformat.Experiment`): experiment to append to
+        queue_size (int, optional): maximum number of measurements waiting to be written
+        batch_size (int, optional): maximum number of measurements written at once
+        flush_interval (float, optional): maximum time in seconds measurements wait before they are written
+        fsync (bool, optional): call os.fsync after every batch, so written measurements survive a system crash
+    """
+
+    def __init__(self, experiment, queue_size=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, fsync=False):
+        self.experiment = experiment
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self.flushing = threading.Event()
+        self.running = True
+        self.child_thread = threading.Thread(target=self.writer_thread, daemon=True)
+        self.child_thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def addMeasurements(self, measurements):
+        """Queues measurements to be appended to the experiment."""
+        self._raiseError()
+        if not self.running:
+            raise Exception('ExperimentWriter is closed')
+        for measurement in measurements:
+            self.queue.put(measurement)
+
+    def addMeasurement(self, measurement):
+        self.addMeasurements([measurement])
+
+    def flush(self):
+        """Blocks until all queued measurements are written."""
+        self.flushing.set()
+        self.queue.join()
+        self.flushing.clear()
+        self._raiseError()
+
+    def close(self):
+        """Writes all queued measurements and stops the background thread."""
+        if self.running:
+            self.running = False
+            self.child_thread.join()
+        self._raiseError()
+
+    def writer_thread(self):
+        while self.running or not self.queue.empty():
+            batch = self._collectBatch()
+            if not batch:
+                continue
+            try:
+                if self.error is None:
+                    self._write(batch)
+            except Exception as e:
+                logger.error("writing %d measurements failed: %s", len(batch), e)
+                self.error = e
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _collectBatch(self):
+        # waits for the first measurement, then collects more until the batch is full or flush_interval has passed
+        batch = list()
+        try:
+            batch.append(self.queue.get(timeout=0.1))
+        except queue.Empty:
+            return batch
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=min(timeout, 0.1)))
+            except queue.Empty:
+                if not self.running or self.flushing.is_set():
+                    # closing or flushing, do not wait for more
+                    break
+        return batch
+
+    def _write(self, batch):
+        logger.debug("writing %d measurements", len(batch))
+        self.experiment.addMeasurements(batch)
+        if self.fsync:
+            with open(self.experiment.file_path, 'ab') as f:
+                os.fsync(f.fileno())
+
+    def _raiseError(self):
+        if self.error is not None:
+            raise self.error
@@ -6,18 +6,22 @@ import time
 import logging
 import queue
 
-from inphase.parameterdecoder import decodeParameters
+from inphase.demultiplexer import StreamDemultiplexer
 
 
 class inphasectl():
     """Python counterpart of inphasectl which is running as contiki-shell.
     This class uses logging for output.
 
+    Measurements decoded from binary frames are put into `measurement_queue`. It holds at most
+    `measurement_queue_size` lists of measurements, when nobody takes them the oldest ones are dropped.
+
     Args:
         logger (:obj:`logging`, optional): logger to use
+        measurement_queue_size (int, optional): maximum number of lists of measurements kept in `measurement_queue`
     """
 
-    def __init__(self):
+    def __init__(self, measurement_queue_size=1000):
         self.logger = logging.getLogger(__name__)
         self.running = False
         self.measuring = False
@@ -27,9 +31,10 @@ class inphasectl():
         self.received_data_lock = threading.Lock()
         self.write_data_lock = threading.Lock()
         self.read_parameters = dict()
-        self.remaining_padec = bytearray()
+        self.demultiplexer = StreamDemultiplexer()
         self.single_query = False
-        self.data_queue = queue.Queue()
+        self.data_queue = queue.Queue()  # data that is neither a parameter nor a binary frame
+        self.measurement_queue = queue.Queue(measurement_queue_size)  # lists of measurements decoded from binary frames
         self.logger.info("init done")
 
     def connect(self, serial_port=None, baudrate=38400, address=None, port=50000):
@@ -158,12 +163,29 @@ class inphasectl():
             avail_read, avail_write, avail_error = select.select([self.ser], [], [], 1)
             self.received_data = self.ser.read(1000)
 
-            decoded_parameters, self.remaining_padec, clean = decodeParameters(self.remaining_padec + self.received_data)
+            decoded_parameters, measurements, clean = self.demultiplexer.feed(self.received_data)
+            if measurements:
+                self.logger.debug("put %d measurements in queue", len(measurements))
+                self._putMeasurements(measurements)
             self.read_parameters.update(decoded_parameters)
             if clean != b'':
-                self.logger.debug("put clean in queue: %s" % clean)
+                self.logger.debug("put clean in queue: %s", clean)
                 self.data_queue.put(clean)
 
         # TODO: maybe delete read_parameters here, becaue we will be out of sync
         self.logger.info("serial_thread stopped")
         self.ser.close()
+
+    def _putMeasurements(self, measurements):
+        # never blocks the serial thread, drops the oldest measurements nobody took instead
+        while True:
+            try:
+                self.measurement_queue.put_nowait(measurements)
+                return
+            except queue.Full:
+                try:
+                    dropped = self.measurement_queue.get_nowait()
+                    self.measurement_queue.task_done()
+                    self.logger.warning("measurement queue full, dropped %d measurements", len(dropped))
+                except queue.Empty:
+                    pass
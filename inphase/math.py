@@ -10,6 +10,7 @@ measurement data.
 from scipy.signal import argrelmax
 import numpy as np
 
+from inphase.dataformat import SampleArray
 from inphase.interpolation import parabolic
 from inphase.constants import SPEED_OF_LIGHT, DEFAULT_FREQ_SPACING, MAX_DISTANCE
 from inphase.slope_sampling import calc_dvss_spectrum
@@ -223,18 +224,26 @@ def calc_fft_spectrum(measurement, calc_type, fft_bins=DEFAULT_FFT_LEN):
     pmu_values = list()
     rssi = list()
 
-    for sample in measurement['samples']:
-        frequencies.append(sample['frequency'])
-        pmu_values.append(sample['pmu_values'])
-        if 'rssi_remote' in sample:
-            rssi.append(sample['rssi_remote'])
+    if isinstance(measurement['samples'], SampleArray):
+        # the values are already arrays
+        columns = measurement['samples'].columns
+        frequencies = columns['frequency']
+        pmu_values = columns['pmu_values']
+        if 'rssi_remote' in columns:
+            rssi = columns['rssi_remote']
+    else:
+        for sample in measurement['samples']:
+            frequencies.append(sample['frequency'])
+            pmu_values.append(sample['pmu_values'])
+            if 'rssi_remote' in sample:
+                rssi.append(sample['rssi_remote'])
 
     # take mean of values as they might contain more than one pmu value per frequency
     # TODO: this is a bad idea, phase angles have to be averaged in the complex plane!
     means = np.mean(pmu_values[:], 1)
 
     # take mean of rssi samples
-    if rssi:
+    if len(rssi):
         rssi = np.mean(rssi[:], 1)
         # convert rssi values to dBm according to the AT86RF233 datasheet
         rssi = -94 + 3 * rssi
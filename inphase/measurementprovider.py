@@ -1,6 +1,8 @@
-from inphase import Measurement
+from inphase import Measurement, validateMeasurements
 from inphase import Experiment
 from inphase import decodeBinary
+from inphase.binarydecoder import StreamingBinaryDecoder, BinaryFileIndex, iterBinaryFile, decodeBinaryFile, DEFAULT_CHUNK_SIZE
+from inphase.compression import isCompressed
 from inphase import signals
 from inphase.inphasectl import inphasectl
 
@@ -12,23 +14,130 @@ import threading
 import socket
 import logging
 import queue
+import collections.abc
 import itertools
 
 
+DEFAULT_CLEAN_BUFFER_SIZE = 64 * 1024  # clean data kept by providers if no other sink is given
+
+
 class MeasurementProvider:
 
+    @property
+    def clean(self):
+        """Clean data (data that is not part of a binary frame) kept by the provider's :class:`CleanDataSink`."""
+        return self.clean_sink.getvalue()
+
     def close(self):
         pass
 
 
+class CleanDataSink:
+    """Receives clean data, i.e. data that is not part of a binary frame, from a MeasurementProvider.
+
+    Sinks count the received bytes and the bytes they dropped, subclasses decide what happens to the data.
+    """
+
+    def __init__(self):
+        self.bytes_received = 0
+        self.bytes_dropped = 0
+
+    def write(self, data):
+        self.bytes_received += len(data)
+
+    def getvalue(self):
+        """Returns the data kept by the sink."""
+        return bytes()
+
+
+class DiscardSink(CleanDataSink):
+    """Discards all clean data, only the byte counters are kept."""
+
+    def write(self, data):
+        super(DiscardSink, self).write(data)
+        self.bytes_dropped += len(data)
+
+
+class RingBufferSink(CleanDataSink):
+    """Keeps the most recent `max_size` bytes of clean data, older data is dropped. With `max_size` None all data is
+    kept."""
+
+    def __init__(self, max_size=DEFAULT_CLEAN_BUFFER_SIZE):
+        super(RingBufferSink, self).__init__()
+        self.max_size = max_size
+        self.buffer = bytearray()
+
+    def write(self, data):
+        super(RingBufferSink, self).write(data)
+        self.buffer += data
+        if self.max_size is None:
+            return
+        excess = len(self.buffer) - self.max_size
+        if excess > 0:
+            # deleting from the front of a bytearray does not move the remaining data
+            del self.buffer[:excess]
+            self.bytes_dropped += excess
+
+    def getvalue(self):
+        return bytes(self.buffer)
+
+
+class LineCallbackSink(CleanDataSink):
+    """Calls `callback` with every complete line of clean data (without line ending).
+
+    Only an incomplete line is buffered, it is passed to the callback anyway once it exceeds `max_line_length`.
+    """
+
+    def __init__(self, callback, max_line_length=DEFAULT_CLEAN_BUFFER_SIZE):
+        super(LineCallbackSink, self).__init__()
+        self.callback = callback
+        self.max_line_length = max_line_length
+        self.buffer = bytearray()
+
+    def write(self, data):
+        super(LineCallbackSink, self).write(data)
+        start = len(self.buffer)
+        self.buffer += data
+        # the buffered incomplete line has no line ending, only the new data needs to be searched
+        end = self.buffer.rfind(b'\n', start)
+        if end >= 0:
+            lines = self.buffer[:end].split(b'\n')
+            del self.buffer[:end + 1]
+            for line in lines:
+                self.callback(bytes(line.rstrip(b'\r')))
+        if len(self.buffer) > self.max_line_length:
+            self.callback(bytes(self.buffer))
+            self.buffer = bytearray()
+
+    def getvalue(self):
+        return bytes(self.buffer)
+
+
 class ConstantRateMeasurementProvider(MeasurementProvider):
+    """A MeasurementProvider that outputs the given measurements at a constant rate with new timestamps.
+
+    The measurements are validated once, a sequence of measurements when the provider is created and the items of
+    other iterables when they are output for the first time. Replaying them does not validate them again.
+    """
 
     def __init__(self, measurements, output_rate=1, loop=True):
+        if isinstance(measurements, collections.abc.Sequence):
+            validateMeasurements(measurements)
+            validated = measurements
+        else:
+            validated = _validated(measurements)
+
         if loop:
             # iterator should start from the beginning if list ended
-            self.measurements = itertools.cycle(measurements)
+            if isinstance(measurements, collections.abc.Sequence):
+                self.measurements = _cycle(measurements)
+            elif iter(measurements) is measurements:
+                # a one-shot iterator, its items need to be kept to start over
+                self.measurements = itertools.cycle(validated)
+            else:
+                self.measurements = itertools.chain(validated, _cycle(measurements))
         else:
-            self.measurements = iter(measurements)
+            self.measurements = iter(validated)
 
         self.output_rate = output_rate
         self.last_timestamp = time.time()
@@ -52,7 +161,7 @@ class ConstantRateMeasurementProvider(MeasurementProvider):
 
         # get measurements from list
         for m in self.measurements:
-            m_copy = Measurement(m)
+            m_copy = Measurement.trusted(m)  # validated when it entered the provider
 
             # set new timestamp
             self.last_timestamp += (1 / self.output_rate)
@@ -67,11 +176,11 @@ class ConstantRateMeasurementProvider(MeasurementProvider):
 
 class SerialMeasurementProvider(MeasurementProvider):
 
-    def __init__(self, serial_port, baudrate=38400):
+    def __init__(self, serial_port, baudrate=38400, clean_sink=None):
         self.serial_port = serial_port
         self.baudrate = baudrate
-        self.remaining = bytes()
-        self.clean = bytes()
+        self.decoder = StreamingBinaryDecoder()
+        self.clean_sink = clean_sink if clean_sink is not None else RingBufferSink()
         self.measurements = list()
         self.measurements_lock = threading.Lock()
         self.running = True
@@ -91,10 +200,10 @@ class SerialMeasurementProvider(MeasurementProvider):
                     self.running = False
                     continue
 
-                measurements, self.remaining, clean = decodeBinary(self.remaining + ser_data)
+                measurements, clean = self.decoder.feed(ser_data)
                 with self.measurements_lock:
                     self.measurements += measurements
-                self.clean += clean
+                self.clean_sink.write(clean)
 
     def getMeasurements(self):
         with self.measurements_lock:
@@ -149,12 +258,16 @@ class SawtoothMeasurementProvider(MeasurementProvider):
 
 
 class InphasectlMeasurementProvider(MeasurementProvider):
-    """ A MeasurementProvider using inphasectl to setup node and get measurements on demand."""
+    """ A MeasurementProvider using inphasectl to setup node and get measurements on demand.
 
-    def __init__(self, serial_port=None, baudrate=38400, address=None, port=50000, count=3, target=None):
+    Measurements are decoded by the :class:`inphase.demultiplexer.StreamDemultiplexer` of the node, everything that is
+    neither a parameter nor a binary frame is passed to `clean_sink`, which defaults to a :class:`RingBufferSink`.
+    """
+
+    def __init__(self, serial_port=None, baudrate=38400, address=None, port=50000, count=3, target=None, clean_sink=None):
         self.count = count
         self.target = target
-        self.remaining = bytes()
+        self.clean_sink = clean_sink if clean_sink is not None else RingBufferSink()
         self.measurements = list()
         self.measurements_lock = threading.Lock()
         self.measuring = False
@@ -194,31 +307,15 @@ class InphasectlMeasurementProvider(MeasurementProvider):
             if not self.node.set_param(parameter_to_set, value_to_set):
                 raise ValueError("Setting parameter failed %s", parameter_to_set)
 
-    def process_data_stream(self, data):
-        """ Process read datastream and extract measurements from binary data
-
-        Args:
-            data (str): datastream to process
-
-        Returns:
-            measurements (list): List of measurements extracted
-        """
-
-        measurements, self.remaining, clean = decodeBinary(self.remaining + data)
-        self.logger.debug("bindec -> remaining: {}".format(self.remaining))
-        self.logger.debug("bindec -> len measurements: {}".format(len(measurements)))
-        self.logger.debug("bindec -> clean: {}".format(clean))
-        return measurements
-
     def measurement_thread(self):
         self.logger.info("start measurement_thread")
         while self.running:
+            self._drainClean()
             try:
-                data_to_process = self.node.data_queue.get(timeout=0.5)
-                self.logger.debug("new data_to_process len %d", len(data_to_process))
+                measurements = self.node.measurement_queue.get(timeout=0.5)
+                self.logger.debug("new measurements len %d", len(measurements))
                 self.measuring = True
-                measurements = self.process_data_stream(data_to_process)
-                self.node.data_queue.task_done()
+                self.node.measurement_queue.task_done()
                 with self.measurements_lock:
                     self.measurements += measurements
             except queue.Empty:
@@ -231,6 +328,15 @@ class InphasectlMeasurementProvider(MeasurementProvider):
 
         self.logger.info("stop measurement_thread")
 
+    def _drainClean(self):
+        while True:
+            try:
+                clean = self.node.data_queue.get_nowait()
+            except queue.Empty:
+                return
+            self.clean_sink.write(clean)
+            self.node.data_queue.task_done()
+
     def getMeasurements(self):
         self.logger.info("measurements start")
         self.node.start()
@@ -253,28 +359,115 @@ class InphasectlMeasurementProvider(MeasurementProvider):
 
 
 class BinaryFileMeasurementProvider(ConstantRateMeasurementProvider):
+    """A MeasurementProvider that replays binary capture files at a constant rate.
+
+    Capture files ending with '.gz', '.xz' or '.bz2' are decompressed chunk by chunk while they are decoded, see
+    :func:`inphase.compression.openFile`.
+
+    Args:
+        file_names (str or list): capture file(s) to read
+        output_rate (float, optional): measurements per second
+        loop (bool, optional): start over after the last measurement
+        lazy (bool, optional): memory-map the files and decode measurements on demand instead of decoding everything
+            up front, only a window of `chunk_size` bytes is decoded at a time. Clean data is only collected during
+            the first pass over the files.
+        chunk_size (int, optional): bytes decoded at once in lazy mode
+        processes (int, optional): number of processes decoding each file in parallel, `None` uses all CPUs. Not used
+            in lazy mode.
+        clean_sink (CleanDataSink, optional): receives clean data of the files, defaults to a :class:`RingBufferSink`,
+            pass ``RingBufferSink(max_size=None)`` to keep all clean data of the files
+    """
 
-    def __init__(self, file_names, output_rate=1, loop=True):
+    def __init__(self, file_names, output_rate=1, loop=True, lazy=False, chunk_size=DEFAULT_CHUNK_SIZE, processes=1, clean_sink=None):
         self.measurements = list()
-        self.clean = bytes()
+        self.clean_sink = clean_sink if clean_sink is not None else RingBufferSink()
         if not isinstance(file_names, list):
             file_names = [file_names]
+        self.file_names = file_names
+
+        if lazy:
+            self.first_pass = True
+            super(BinaryFileMeasurementProvider, self).__init__(_ReIterable(self._iterFiles, chunk_size), output_rate, loop)
+            return
+
         for file_name in file_names:
-            with open(file_name, 'rb') as f:
-                m, r, c = decodeBinary(f.read())
+            if processes == 1 and not isCompressed(file_name):
+                with open(file_name, 'rb') as f:
+                    m, r, c = decodeBinary(f.read())
+            else:
+                # also decodes compressed files without decompressing them as a whole
+                m, r, c = decodeBinaryFile(file_name, processes)
             self.measurements += m
-            self.clean += c
+            self.clean_sink.write(c)
 
         super(BinaryFileMeasurementProvider, self).__init__(self.measurements, output_rate, loop)
 
+    def _iterFiles(self, chunk_size):
+        for file_name in self.file_names:
+            for measurements, clean in iterBinaryFile(file_name, chunk_size):
+                if self.first_pass:
+                    self.clean_sink.write(clean)
+                yield from measurements
+        self.first_pass = False
+
+
+class IndexedBinaryFileMeasurementProvider(ConstantRateMeasurementProvider):
+    """A MeasurementProvider that replays a range of frames from a binary capture file at a constant rate.
+
+    A :class:`inphase.binarydecoder.BinaryFileIndex` of the file is used (and built if necessary) to only decode the
+    selected frames.
+
+    Args:
+        file_name (str): capture file to read
+        start (int, optional): number of the first frame to replay
+        stop (int, optional): number of the frame to stop at (exclusive)
+        reflector (int, optional): only replay frames of this reflector address
+        output_rate (float, optional): measurements per second
+        loop (bool, optional): start over after the last measurement
+    """
+
+    def __init__(self, file_name, start=None, stop=None, reflector=None, output_rate=1, loop=True):
+        self.index = BinaryFileIndex(file_name)
+        measurements = _ReIterable(self.index.iterMeasurements, start, stop, reflector)
+        super(IndexedBinaryFileMeasurementProvider, self).__init__(measurements, output_rate, loop)
+
+
+class _ReIterable:
+    # calls the generator function again for every iteration
+
+    def __init__(self, function, *args):
+        self.function = function
+        self.args = args
+
+    def __iter__(self):
+        return self.function(*self.args)
+
+
+def _validated(measurements):
+    # validates every measurement when it is pulled
+    for m in measurements:
+        validateMeasurements([m])
+        yield m
+
+
+def _cycle(iterable):
+    # unlike itertools.cycle this does not keep a copy of all items, the iterable is iterated again instead
+    while True:
+        empty = True
+        for item in iterable:
+            empty = False
+            yield item
+        if empty:
+            return
+
 
 class InPhaseBridgeMeasurementProvider(MeasurementProvider):
 
-    def __init__(self, address, port=50000):
+    def __init__(self, address, port=50000, clean_sink=None):
         self.address = address
         self.port = port
-        self.remaining = bytes()
-        self.clean = bytes()
+        self.decoder = StreamingBinaryDecoder()
+        self.clean_sink = clean_sink if clean_sink is not None else RingBufferSink()
         self.measurements = list()
         self.measurements_lock = threading.Lock()
         self.running = True
@@ -287,10 +480,10 @@ class InPhaseBridgeMeasurementProvider(MeasurementProvider):
         while self.running:
             avail_read, avail_write, avail_error = select.select([self.sock], [], [], 1)
             sock_data = self.sock.recv(1000)
-            measurements, self.remaining, clean = decodeBinary(self.remaining + sock_data)
+            measurements, clean = self.decoder.feed(sock_data)
             with self.measurements_lock:
                 self.measurements += measurements
-            self.clean += clean
+            self.clean_sink.write(clean)
         self.sock.close()
 
     def getMeasurements(self):
@@ -304,15 +497,39 @@ class InPhaseBridgeMeasurementProvider(MeasurementProvider):
 
 
 class YAMLMeasurementProvider(MeasurementProvider):
+    """A MeasurementProvider that replays an experiment file.
+
+    Args:
+        experiment_file (str): experiment file to replay
+        realtime (bool, optional): replay measurements according to their timestamps instead of at a constant rate
+        output_rate (float, optional): measurements per second if not in realtime
+        loop (bool, optional): start over after the last measurement
+        lazy (bool, optional): read measurements from the file while replaying instead of loading the whole file, see
+            :meth:`inphase.dataformat.Experiment.iterMeasurements`
+    """
 
-    def __init__(self, experiment_file, realtime=True, output_rate=1, loop=True):
+    def __init__(self, experiment_file, realtime=True, output_rate=1, loop=True, lazy=False):
         self.realtime = realtime
-        self.measurements = Experiment(experiment_file).measurements
+        self.lazy = lazy
+        if lazy:
+            experiment = Experiment(experiment_file, lazy=True)
+            self.measurements = _ReIterable(experiment.iterMeasurements)
+        else:
+            self.measurements = Experiment(experiment_file).measurements
 
         # if this should not run in real time, just use the constant rate provider...
         if not self.realtime:
             self.provider = ConstantRateMeasurementProvider(self.measurements, output_rate, loop)
             self.getMeasurements = self.provider.getMeasurements
+        elif lazy:
+            self.loop = loop
+            self.iterator = iter(self.measurements)
+            self.next_measurement = self._nextMeasurement()
+            if self.next_measurement is None:
+                raise Exception('Experiment does not contain measurements!')
+            self.time_offset = time.time() - self.next_measurement['timestamp']
+            self.last_timestamp = self.next_measurement['timestamp']
+            self.getMeasurements = self._getMeasurementsLazy
         else:
             for m in self.measurements:
                 if 'timestamp' not in m:
@@ -349,3 +566,38 @@ class YAMLMeasurementProvider(MeasurementProvider):
 
         self.last_timestamp = measurement_time
         return to_return
+
+    def _nextMeasurement(self):
+        # returns the next measurement of the file, None at its end
+        m = next(self.iterator, None)
+        if m is not None and 'timestamp' not in m:
+            raise Exception('Measurements do not contain timestamps!')
+        return m
+
+    def _getMeasurementsLazy(self):
+        # like getMeasurements, but measurements are read from the file as they are due
+        current_time = time.time()
+        measurement_time = current_time - self.time_offset
+
+        to_return = list()
+
+        while True:
+            if self.next_measurement is None:
+                if not self.loop:
+                    # not looping, break here
+                    break
+                # start over
+                self.iterator = iter(self.measurements)
+                self.next_measurement = self._nextMeasurement()
+                if self.next_measurement is None:
+                    break
+                self.time_offset = current_time - self.next_measurement['timestamp']
+                measurement_time = self.next_measurement['timestamp']
+            if self.next_measurement['timestamp'] > measurement_time:
+                break
+
+            to_return.append(self.next_measurement)
+            self.next_measurement = self._nextMeasurement()
+
+        self.last_timestamp = measurement_time
+        return to_return
@@ -4,85 +4,102 @@ import logging
 logger = logging.getLogger(__name__)
 
 REGEX_KEYVALUE = r"^(\s*)(?P<key>(?:\w+\.){0,}(?:\w+))(?P<sep>:\s*)(?P<value>[\S ]*)"
+_KEYVALUE = re.compile(REGEX_KEYVALUE)
 
+LINE_END = b'\r\n'
 
-def decodeParameters(data, timestamp=True):
-    """Returns parsed parameters from data, also returns remaining data that still needs parsing and clean data that does not contain any parameters."""
-    parameters = dict()
-    remaining_data = data
-    clean_data = bytearray()
 
-    start = 0
-    end = -1
+class ParameterDecoder:
+    """Incrementally decodes `key: value` lines from a byte stream.
 
-    while True:
-        start = 0
-        logger.debug("> start {} end {}".format(start, end))
-        logger.debug("remaining_data: %s" % remaining_data)
-        end = remaining_data.find(b'\r\n', start)
-        if end == -1:
-            break
-        logger.debug((len("remaining_data b'") + end) * ' ' + "^")
-        logger.debug("end {}".format(end))
+    The decoder owns its receive buffer and remembers where it stopped searching for a line end, so feeding a
+    stream in small chunks does not re-scan or copy the unconsumed tail on every call.
+    """
 
-        line = remaining_data[start:end]
-        logger.debug("line: %s" % line)
-        parameter, value = _parse_line(line.decode(errors='replace'))
+    def __init__(self):
+        self._buffer = bytearray()
+        self._pos = 0  # start of unconsumed data in the buffer
+        self._scan = 0  # position from which to continue searching for a line end
 
-        remaining_data = remaining_data[end + 2:]
+    @property
+    def remaining(self):
+        """Data that still needs parsing, i.e. an incomplete line."""
+        return bytes(self._buffer[self._pos:])
 
-        start = end
+    def feed(self, data):
+        """Adds data to the stream and returns decoded parameters and clean data that does not contain any parameters."""
+        parameters = dict()
+        clean_data = bytearray()
 
-        if parameter:
-            parameters[parameter] = value
-        else:
-            logger.debug("ignoring %s" % line)
-            clean_data += line + b'\r\n'
+        buf = self._buffer
+        buf += data
+
+        while True:
+            end = buf.find(LINE_END, self._scan)
+            if end == -1:
+                # the last byte might be the first byte of a line end
+                self._scan = max(self._pos, len(buf) - 1)
+                break
+
+            line = buf[self._pos:end]
+            self._pos = self._scan = end + len(LINE_END)
+
+            parameter, value = _parse_line(line.decode(errors='replace'))
+            if parameter:
+                parameters[parameter] = value
+            else:
+                logger.debug("ignoring %s", line)
+                clean_data += line + LINE_END
+
+        # drop consumed data once it makes up most of the buffer, this keeps the amortized cost linear
+        if self._pos > len(buf) // 2:
+            del buf[:self._pos]
+            self._scan -= self._pos
+            self._pos = 0
 
-    logger.debug("parameters: %s" % parameters)
-    logger.debug("remaining_data: %s" % remaining_data)
-    logger.debug("clean_data %s\n" % clean_data)
+        logger.debug("parameters: %s", parameters)
+        logger.debug("clean_data: %s", clean_data)
 
-    return parameters, remaining_data, clean_data
+        return parameters, clean_data
+
+
+def decodeParameters(data, timestamp=True):
+    """Returns parsed parameters from data, also returns remaining data that still needs parsing and clean data that does not contain any parameters."""
+    decoder = ParameterDecoder()
+    parameters, clean_data = decoder.feed(data)
+    return parameters, decoder.remaining, clean_data
 
 
 def _parse_line(line_to_parse):
-    # logger.debug("Parsing line: '{}'".format(line_to_parse))
     key = value = None
-    for keyvalues in re.compile(REGEX_KEYVALUE).finditer(str(line_to_parse)):
-        try:
-            key = keyvalues.group('key')
-            # logger.debug("key: {}({})".format(key, type(key)))
-            value = keyvalues.group('value')
-            # logger.debug("value: {}({})".format(value, type(value)))
-            if _parse_kv(key, value):
-                try:
-                    # try to parse as number (dec, hex)
-                    value = int(value, 0)
-                except Exception:
-                    # parse as string
-                    pass
-            else:
-                key = value = None
-
-        except Exception as excpt:
-            logger.debug("Exception: {}".format(type(excpt)))
-            logger.error("no key-values")
+    keyvalues = _KEYVALUE.match(line_to_parse)
+    if keyvalues is not None:
+        key = keyvalues.group('key')
+        value = keyvalues.group('value')
+        if _parse_kv(key, value):
+            try:
+                # try to parse as number (dec, hex)
+                value = int(value, 0)
+            except ValueError:
+                # parse as string
+                pass
+        else:
+            key = value = None
 
     return key, value
 
 
 def _parse_kv(key, value):
     if value == "Contiki> ":
-        logger.debug("ignoring contiki-prompt '{}' '{}'".format(key, value))
+        logger.debug("ignoring contiki-prompt '%s' '%s'", key, value)
         return False
 
     if key == "err":
-        logger.error("INPHASE:" + str(value))
+        logger.error("INPHASE:%s", value)
         return False
     elif key == "DBG":
-        logger.debug("INPHASE:" + str(value))
+        logger.debug("INPHASE:%s", value)
         return False
     else:
-        logger.debug("key:'{}'; value:'{}';".format(key, value))
+        logger.debug("key:'%s'; value:'%s';", key, value)
         return True
@@ -0,0 +1,256 @@
+import concurrent.futures
+import itertools
+import mmap
+import os
+import re
+import warnings
+import logging
+
+from inphase.compression import isCompressed, openFile
+
+import yaml
+try:
+    from yaml import CLoader as Loader
+except ImportError:
+    warnings.warn("Using pure python yaml library, this might be very slow!", ImportWarning)
+    from yaml import Loader
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 256 * 1024  # characters of YAML parsed at once
+DEFAULT_SPLIT_SIZE = 1024 * 1024  # minimum part size when parsing files in parallel
+
+_KEY = re.compile(r'([A-Za-z_][\w-]*)[ \t]*:(?:[ \t]|$)')  # plain key of a block mapping
+
+
+def iterYAMLList(path, batch_size=DEFAULT_BATCH_SIZE):
+    """Yields the items of a YAML file containing a list one at a time.
+
+    Files written by :meth:`inphase.dataformat.Experiment.addMeasurements` are a block sequence whose items all start
+    with a `- ` at the beginning of a line. The file is split at these lines and only about `batch_size` characters
+    are parsed at once, so memory usage does not depend on the size of the file. Files that are not a block sequence,
+    e.g. a flow style list, are parsed as a whole. Compressed files are decompressed while they are read, see
+    :func:`inphase.compression.openFile`.
+
+    Raises:
+        Exception: If the file does not contain a list.
+    """
+    with openFile(path, 'r') as f:
+        chunks = _iterChunks(f)
+        first = next(chunks, None)
+        if first is None:
+            return
+
+        if not _isSequenceItem(_firstContentLine(first)):
+            logger.info("%s is no block sequence, loading it at once", path)
+            f.seek(0)
+            data = yaml.load(f, Loader=Loader)
+            if not data:
+                return
+            if not isinstance(data, list):
+                raise Exception('experiment file does not contain a list of measurements')
+            yield from data
+            return
+
+        batch = list()
+        length = 0
+        for chunk in itertools.chain([first], chunks):
+            batch.append(chunk)
+            length += len(chunk)
+            if length >= batch_size:
+                yield from _loadBatch(batch)
+                batch = list()
+                length = 0
+        yield from _loadBatch(batch)
+
+
+def iterFieldLines(lines, fields):
+    """Yields the lines of a YAML list of mappings without the keys that are not in fields.
+
+    Works on the block sequences of block mappings written by :meth:`inphase.dataformat.Experiment.addMeasurements`,
+    only looking at the indentation of the lines, which is much faster than parsing the left out values. Items that
+    are no block mappings, e.g. flow style mappings, are passed through unchanged, so the parsed items can still
+    contain other keys. An item without any of the fields becomes null.
+    """
+    indent = None  # indentation of the keys of the current item
+    keep = True
+    for line in lines:
+        stripped = line.lstrip(' ')
+        if not stripped.strip() or stripped.startswith('#'):
+            # comments and empty lines do not belong to a value
+            yield line
+            continue
+
+        if _isSequenceItem(line):
+            content = line[1:].lstrip(' ')
+            indent = len(line) - len(content)
+            match = _KEY.match(content)
+            keep = match is None or match.group(1) in fields
+            if keep:
+                yield line
+            else:
+                # keep the item, the next kept key is its first one
+                yield '-\n'
+            continue
+
+        line_indent = len(line) - len(stripped)
+        if indent is None or line_indent < indent:
+            # e.g. document markers
+            yield line
+            continue
+        if line_indent == indent and not _isSequenceItem(stripped):
+            # a key of the current item, sequences may start at the indentation of their key
+            match = _KEY.match(stripped)
+            keep = match is None or match.group(1) in fields
+        if keep:
+            yield line
+
+
+def loadYAMLList(path, processes=None, fields=None, check=None, split_size=DEFAULT_SPLIT_SIZE):
+    """Parses a YAML file containing a list with a pool of processes.
+
+    The file is split in front of lines starting a top-level item of a block sequence, like
+    :func:`iterYAMLList` does, and the parts are parsed in parallel and merged in their original order. Files that
+    are not a block sequence are parsed as a whole. Compressed files can not be split without decompressing them, they
+    are parsed as a whole in the calling process.
+
+    Args:
+        path (str): YAML file
+        processes (int, optional): number of worker processes, defaults to the number of CPUs
+        fields (iterable, optional): only keep these keys of the items, see :func:`iterFieldLines`. Items without any
+            of them become empty dicts.
+        check (callable, optional): called with the items of every part in the worker processes, e.g. to validate
+            them. It has to be picklable, i.e. a module level function.
+        split_size (int, optional): minimum size of a part in bytes
+
+    Returns:
+        list: items of the list, an empty list for an empty file
+
+    Raises:
+        Exception: If the file does not contain a list.
+    """
+    if processes is None:
+        processes = os.cpu_count()
+    if fields is not None:
+        fields = frozenset(fields)
+
+    if isCompressed(path):
+        return _loadYAMLRange(path, 0, None, fields, check)
+
+    borders = _splitYAMLFile(path, processes * 4, split_size)
+    if len(borders) < 2:
+        # empty file
+        return list()
+    if len(borders) == 2:
+        return _loadYAMLRange(path, borders[0], borders[1], fields, check)
+
+    data = list()
+    with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+        parts = executor.map(_loadYAMLRange, itertools.repeat(path), borders[:-1], borders[1:],
+                             itertools.repeat(fields), itertools.repeat(check))
+        for part in parts:
+            data += part
+    return data
+
+
+def countYAMLList(path):
+    """Returns the number of items of a YAML file containing a list without parsing the items."""
+    with openFile(path, 'r') as f:
+        chunks = _iterChunks(f)
+        first = next(chunks, None)
+        if first is None:
+            return 0
+        if not _isSequenceItem(_firstContentLine(first)):
+            f.seek(0)
+            data = yaml.load(f, Loader=Loader)
+            return len(data) if data else 0
+        return 1 + sum(1 for chunk in chunks)
+
+
+def _splitYAMLFile(path, parts, split_size):
+    # returns the borders of up to the given number of parts, each border is in front of a top-level sequence item
+    file_size = os.path.getsize(path)
+    if file_size == 0:
+        return []
+
+    with open(path, 'r') as f:
+        first = _firstContentLine(''.join(itertools.islice(_iterChunks(f), 1)))
+    parts = max(1, min(parts, file_size // split_size))
+    if not _isSequenceItem(first):
+        # no block sequence, can not be split
+        parts = 1
+
+    borders = [0]
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for i in range(1, parts):
+                position = max(i * file_size // parts, borders[-1] + 1) - 1
+                while True:
+                    position = data.find(b'\n-', position)
+                    if position == -1 or data[position + 2:position + 3] in (b'', b' ', b'\t', b'\r', b'\n'):
+                        break
+                    position += 1
+                if position == -1:
+                    break
+                borders.append(position + 1)
+    borders.append(file_size)
+    return borders
+
+
+def _loadYAMLRange(path, begin, end, fields, check):
+    # end None reads until the end of the file
+    with openFile(path, 'rb') as f:
+        f.seek(begin)
+        text = f.read(-1 if end is None else end - begin).decode()
+    if fields is not None:
+        text = ''.join(iterFieldLines(text.splitlines(True), fields))
+    data = yaml.load(text, Loader=Loader)
+    if not data:
+        data = list()
+    if not isinstance(data, list):
+        raise Exception('experiment file does not contain a list of measurements')
+    if fields is not None:
+        data = [{key: value for key, value in (item or dict()).items() if key in fields} for item in data]
+    if check is not None:
+        check(data)
+    return data
+
+
+def _loadBatch(batch):
+    if not batch:
+        return []
+    data = yaml.load(''.join(batch), Loader=Loader)
+    if not data:
+        return []
+    if not isinstance(data, list):
+        raise Exception('experiment file does not contain a list of measurements')
+    return data
+
+
+def _iterChunks(f):
+    # yields the text of every top-level item of a block sequence, lines in front of the first item belong to it
+    chunk = list()
+    has_item = False
+    for line in f:
+        if _isSequenceItem(line):
+            if has_item:
+                yield ''.join(chunk)
+                chunk = list()
+            has_item = True
+        chunk.append(line)
+    if chunk and (has_item or _firstContentLine(''.join(chunk))):
+        yield ''.join(chunk)
+
+
+def _isSequenceItem(line):
+    return line[:1] == '-' and line[1:2] in ('', ' ', '\t', '\r', '\n')
+
+
+def _firstContentLine(text):
+    # returns the first line that is no comment, directive or document marker, '' if there is none
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith(('#', '%')) or line.startswith('---'):
+            continue
+        return line
+    return ''
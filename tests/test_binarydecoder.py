@@ -5,7 +5,11 @@ import inphase
 from inphase.binarydecoder import SERIAL_FRAME_START, SERIAL_FRAME_END, SERIAL_ESCAPE_BYTE, SERIAL_ESCAPE_ADD
 from inphase.binarydecoder import _unescape
 
+import numpy as np
 import unittest
+import unittest.mock
+import random
+import tempfile
 import os
 THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -122,11 +126,173 @@ class UnitTest(unittest.TestCase):
         self.assertEqual(clean_data, self.clean_reference)
         self.assertEqual(remaining_data, self.remaining_reference)
 
+    def test_streaming_decoder(self):
+        # feed serial data in pieces of 10 bytes into a single decoder
+        decoder = inphase.StreamingBinaryDecoder()
+        measurements = list()
+        clean_data = bytearray()
+        for i in range(0, len(self.serial_data), 10):
+            m, c = decoder.feed(self.serial_data[i:i + 10])
+            clean_data += c
+            measurements += m
+
+        self.assertEqual(len(measurements), 665)
+        self.assertEqual(len(measurements[100]['samples']), 200)
+        self.assertEqual(measurements[100]['reflector']['uid'], 9476)
+        self.assertEqual(clean_data, self.clean_reference)
+        self.assertEqual(decoder.remaining, self.remaining_reference)
+
+    def test_streaming_decoder_chunk_sizes(self):
+        reference, remaining_reference, clean_reference = inphase.decodeBinary(self.serial_data_v2, timestamp=False)
+        for chunk_size in [1, 7, 1000, len(self.serial_data_v2)]:
+            decoder = inphase.StreamingBinaryDecoder(timestamp=False)
+            measurements = list()
+            clean_data = bytearray()
+            for i in range(0, len(self.serial_data_v2), chunk_size):
+                m, c = decoder.feed(self.serial_data_v2[i:i + chunk_size])
+                clean_data += c
+                measurements += m
+            self.assertEqual(measurements, reference)
+            self.assertEqual(clean_data, clean_reference)
+            self.assertEqual(decoder.remaining, remaining_reference)
+
+    def test_columnar(self):
+        for data in [self.serial_data, self.serial_data_v2]:
+            measurements, remaining_reference, clean_reference = inphase.decodeBinary(data)
+            batch, remaining_data, clean_data = inphase.decodeBinaryColumnar(data)
+
+            self.assertEqual(remaining_data, remaining_reference)
+            self.assertEqual(clean_data, clean_reference)
+            self.assertEqual(batch['pmu_values'].shape[0], len(measurements))
+            self.assertEqual(batch['pmu_values'].dtype, np.int8)
+            self.assertEqual(len(batch['timestamp']), len(measurements))
+
+            for i, m in enumerate(measurements):
+                self.assertEqual(batch['reflector'][i], m['reflector']['uid'])
+                self.assertEqual(batch['dqi'][i], m['dqi'])
+                self.assertEqual(batch['measured_distance'][i], m['measured_distance'])
+                self.assertEqual(batch['frequency_count'][i], len(m['samples']))
+                frequencies = batch['frequency_start'][i] + np.arange(batch['frequency_count'][i]) * batch['frequency_step'][i]
+                np.testing.assert_array_equal(frequencies, [s['frequency'] for s in m['samples']])
+                np.testing.assert_array_equal(batch['pmu_values'][i, :, :batch['sample_count'][i]], [s['pmu_values'] for s in m['samples']])
+                if batch['protocol_version'][i] == 2:
+                    np.testing.assert_array_equal(batch['rssi'][i], [s['rssi'][0] for s in m['samples']])
+
+    def test_columnar_empty(self):
+        batch, remaining_data, clean_data = inphase.decodeBinaryColumnar(b'no frames', timestamp=False)
+        self.assertEqual(batch['pmu_values'].shape, (0, 0, 0))
+        self.assertNotIn('timestamp', batch)
+        self.assertEqual(clean_data, b'no frames')
+
+    def test_index(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_name = os.path.join(temp_dir, 'capture.txt')
+            with open(file_name, 'wb') as f:
+                f.write(self.serial_data)
+
+            reference, remaining_data, clean_data = inphase.decodeBinary(self.serial_data, timestamp=False)
+
+            index = inphase.BinaryFileIndex(file_name)
+            self.assertTrue(os.path.exists(file_name + '.idx'))
+            self.assertEqual(len(index), 665)
+            self.assertEqual(index.decode(100, 110, timestamp=False), reference[100:110])
+            self.assertEqual(index.decode(-1, timestamp=False), reference[-1:])
+
+            reflector = reference[100]['reflector']['uid']
+            measurements = index.decode(reflector=reflector, timestamp=False)
+            self.assertEqual(measurements, [m for m in reference if m['reflector']['uid'] == reflector])
+
+            # the sidecar file is used on the next run
+            with unittest.mock.patch.object(inphase.BinaryFileIndex, '_scan', side_effect=AssertionError):
+                index = inphase.BinaryFileIndex(file_name)
+            self.assertEqual(len(index), 665)
+
+            # the index is rebuilt if the capture changed
+            with open(file_name, 'ab') as f:
+                f.write(self.serial_data)
+            index = inphase.BinaryFileIndex(file_name)
+            self.assertEqual(len(index), 665 * 2)
+
+    def test_parallel(self):
+        # frames with a step of a whole number of MHz have integer frequencies
+        measurements, remaining, clean = inphase.decodeBinary(self.serial_data, timestamp=False)
+        for m in measurements:
+            for i, s in enumerate(m['samples']):
+                s['frequency'] = 2400 + i
+        whole_steps = inphase.encodeBinary(measurements)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for data in [self.serial_data, self.serial_data_v2, whole_steps, b'', b'no frames']:
+                file_name = os.path.join(temp_dir, 'capture.txt')
+                with open(file_name, 'wb') as f:
+                    f.write(data)
+
+                reference = inphase.decodeBinary(data, timestamp=False)
+                # use small parts to split the file at many frame borders
+                result = inphase.decodeBinaryFile(file_name, processes=2, timestamp=False, split_size=100)
+                self.assertEqual(result, reference)
+                # the measurements built from the batches of the workers have the same value types
+                self.assertEqual(repr(result), repr(reference))
+
+                # a single process decodes the file without a pool
+                with unittest.mock.patch('concurrent.futures.ProcessPoolExecutor') as executor:
+                    result = inphase.decodeBinaryFile(file_name, processes=1, timestamp=False, split_size=100)
+                    executor.assert_not_called()
+                self.assertEqual(result, reference)
+
+    def test_encode(self):
+        for data in [self.serial_data, self.serial_data_v2]:
+            measurements, remaining, clean = inphase.decodeBinary(data, timestamp=False)
+            encoded = inphase.encodeBinary(measurements)
+            decoded, remaining, clean = inphase.decodeBinary(encoded, timestamp=False)
+            self.assertEqual(decoded, measurements)
+            self.assertEqual(remaining, b'')
+            self.assertEqual(clean, b'')
+
+    def test_encode_unrepresentable(self):
+        measurements, remaining, clean = inphase.decodeBinary(self.serial_data, timestamp=False)
+        m = measurements[0]
+
+        with self.assertRaises(ValueError):
+            inphase.encodeBinary([inphase.Measurement(m, measured_distance=1230.5)])
+        with self.assertRaises(ValueError):
+            inphase.encodeBinary([inphase.Measurement(m, samples=m['samples'][:1] + m['samples'][2:])])
+        with self.assertRaises(ValueError):
+            inphase.encodeBinary([inphase.Measurement(m, samples=[dict(s, pmu_values=[200]) for s in m['samples']])])
+        with self.assertRaises(ValueError):
+            inphase.encodeBinary([inphase.Measurement(m, samples=list())])
+
     def test_unescape(self):
         frame = bytearray([ord(b'<'), SERIAL_ESCAPE_BYTE, SERIAL_ESCAPE_BYTE-SERIAL_ESCAPE_ADD, SERIAL_ESCAPE_BYTE, SERIAL_FRAME_START-SERIAL_ESCAPE_ADD, SERIAL_ESCAPE_BYTE, SERIAL_FRAME_END-SERIAL_ESCAPE_ADD, ord(b'>')])
         result = bytearray([ord(b'<'), SERIAL_ESCAPE_BYTE, SERIAL_FRAME_START, SERIAL_FRAME_END, ord(b'>')])
         self.assertEqual(_unescape(frame), result)
 
+    def test_unescape_random(self):
+        rng = random.Random(42)
+        for escape_ratio in [0, 0.1, 0.5, 1]:
+            frame = self.helper_random_frame(rng, 403, escape_ratio)
+            self.assertEqual(_unescape(bytearray(frame)), self.helper_unescape_reference(bytearray(frame)))
+
+    @staticmethod
+    def helper_random_frame(rng, length, escape_ratio):
+        # random frame content where escape_ratio of the bytes are escape sequences
+        frame = bytearray([SERIAL_FRAME_START])
+        while len(frame) < length - 1:
+            if rng.random() < escape_ratio:
+                frame += bytes([SERIAL_ESCAPE_BYTE, (rng.choice([SERIAL_FRAME_START, SERIAL_FRAME_END, SERIAL_ESCAPE_BYTE, 0x05]) - SERIAL_ESCAPE_ADD) % 256])
+            else:
+                frame.append(rng.choice([b for b in range(256) if b not in (SERIAL_FRAME_START, SERIAL_FRAME_END, SERIAL_ESCAPE_BYTE)]))
+        frame.append(SERIAL_FRAME_END)
+        return bytes(frame)
+
+    @staticmethod
+    def helper_unescape_reference(frame):
+        # the original list based implementation
+        indices = [i for i, x in enumerate(frame) if x == SERIAL_ESCAPE_BYTE]
+        for i in indices:
+            frame[i + 1] = (frame[i + 1] + SERIAL_ESCAPE_ADD) % 256
+        return bytearray([i for j, i in enumerate(frame) if j not in indices])
+
 
 if __name__ == "__main__":
     unittest.main()
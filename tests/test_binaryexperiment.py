@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import inphase
+from inphase import binaryexperiment
+
+import unittest
+import os
+import shutil
+import tempfile
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class UnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'experiment' + binaryexperiment.BINARY_EXPERIMENT_SUFFIX)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def helper_roundtrip(self, measurements):
+        e = inphase.Experiment(self.path)
+        e.addMeasurements(measurements)
+        self.assertTrue(binaryexperiment.isBinaryExperiment(self.path))
+
+        e = inphase.Experiment(self.path)
+        self.assertEqual(len(e), len(measurements))
+        for m, original in zip(e, measurements):
+            self.assertIsInstance(m, inphase.Measurement)
+            self.assertEqual(m, original)
+
+    def test_yaml_experiments(self):
+        for name in ['measurement_data/experiment.yml', 'measurement_data/timestamped.yml', 'math_data/experiment.yml', 'math_data/experiment_rssi.yml']:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self.helper_roundtrip(inphase.Experiment(os.path.join(THIS_DIR, 'testdata', name), caching=False).measurements)
+
+    def test_serial_measurements(self):
+        for name in ['test_13.txt', 'serial_dump_version2_rssi.txt']:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            with open(os.path.join(THIS_DIR, 'testdata/serial_data', name), 'rb') as f:
+                data = f.read()
+            measurements, remaining, clean = inphase.decodeBinary(data)
+            self.helper_roundtrip(measurements)
+
+            # frame plus timestamp is not much larger than the frames themselves
+            self.assertLess(os.path.getsize(self.path), 1.3 * len(inphase.encodeBinary(measurements)))
+
+    def test_append(self):
+        with open(os.path.join(THIS_DIR, 'testdata/serial_data/test_13.txt'), 'rb') as f:
+            measurements, remaining, clean = inphase.decodeBinary(f.read())
+        e = inphase.Experiment(self.path)
+        e.addMeasurements(measurements[:10])
+        e.addMeasurement(measurements[10])
+        e = inphase.Experiment(self.path)
+        e.addMeasurements(measurements[11:20])
+
+        e = inphase.Experiment(self.path)
+        self.assertEqual(e.measurements, measurements[:20])
+
+    def test_truncated(self):
+        with open(os.path.join(THIS_DIR, 'testdata/serial_data/test_13.txt'), 'rb') as f:
+            measurements, remaining, clean = inphase.decodeBinary(f.read())
+        binaryexperiment.appendBinaryExperiment(self.path, measurements[:2])
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 1)
+        with self.assertRaises(Exception):
+            binaryexperiment.readBinaryExperiment(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
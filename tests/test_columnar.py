@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import inphase
+
+import numpy as np
+import unittest
+import os
+import shutil
+import tempfile
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class UnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'experiment.npz')
+        self.yaml_measurements = inphase.Experiment(os.path.join(THIS_DIR, 'testdata/math_data/experiment.yml'), caching=False).measurements
+        self.rssi_measurements = inphase.Experiment(os.path.join(THIS_DIR, 'testdata/math_data/experiment_rssi.yml'), caching=False).measurements
+        with open(os.path.join(THIS_DIR, 'testdata/serial_data/test_13.txt'), 'rb') as f:
+            self.serial_measurements, remaining, clean = inphase.decodeBinary(f.read())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_views(self):
+        for measurements in [self.yaml_measurements, self.rssi_measurements, self.serial_measurements]:
+            c = inphase.ColumnarMeasurements(measurements)
+            self.assertEqual(len(c), len(measurements))
+            self.assertEqual(list(c), measurements)
+            self.assertIsInstance(c[0], inphase.Measurement)
+            self.assertIsInstance(c[0]['samples'][0], inphase.Sample)
+            self.assertEqual(c[-1], measurements[-1])
+            self.assertEqual(c[1:3], measurements[1:3])
+            with self.assertRaises(IndexError):
+                c[len(measurements)]
+
+    def test_columns(self):
+        c = inphase.ColumnarMeasurements(self.serial_measurements)
+        self.assertEqual(c.columns['timestamp'].dtype, np.float64)
+        self.assertEqual(len(c.columns['timestamp']), len(self.serial_measurements))
+        self.assertEqual(len(c.columns['samples.frequency']), sum(len(m['samples']) for m in self.serial_measurements))
+        # PMU values are stored with the smallest dtype holding them
+        self.assertEqual(c.columns['samples.pmu_values'].dtype, np.int8)
+        self.assertEqual(c.schema['dtypes']['samples.pmu_values'], 'int8')
+        self.assertEqual(c.nodes[c.columns['reflector'][0]], self.serial_measurements[0]['reflector'])
+
+        np.testing.assert_array_equal(c.columns['measured_distance'], [m['measured_distance'] for m in self.serial_measurements])
+
+    def test_extend(self):
+        # different fields and kinds are merged
+        measurements = self.yaml_measurements + self.rssi_measurements + self.serial_measurements
+        c = inphase.ColumnarMeasurements()
+        for i in range(0, len(measurements), 7):
+            c += measurements[i:i + 7]
+        self.assertEqual(list(c), measurements)
+
+        extra = [inphase.Measurement({'dqi': 1.5, 'comment': 42}), inphase.Measurement({'comment': 'text'})]
+        c.extend(extra[:1])
+        self.assertEqual(c.schema['measurement']['dqi'], 'float')
+        self.assertEqual(c.schema['measurement']['comment'], 'int')
+        c.extend(extra[1:])
+        self.assertEqual(c.schema['measurement']['comment'], 'json')
+        self.assertEqual(list(c), measurements + extra)
+
+    def test_extend_widens_lists(self):
+        c = inphase.ColumnarMeasurements(self.serial_measurements[:2])
+        self.assertEqual(c.columns['samples.pmu_values'].dtype, np.int8)
+        larger = inphase.Measurement({'samples': [{'frequency': 2400, 'pmu_values': [-1, 1000]}]})
+        c.extend([larger])
+        self.assertEqual(c.columns['samples.pmu_values'].dtype, np.int16)
+        self.assertEqual(c.schema['dtypes']['samples.pmu_values'], 'int16')
+        self.assertEqual(list(c), self.serial_measurements[:2] + [larger])
+
+        # the dtypes are kept when saving and loading
+        c.save(self.path)
+        loaded = inphase.ColumnarMeasurements.load(self.path)
+        self.assertEqual(loaded.columns['samples.pmu_values'].dtype, np.int16)
+        self.assertEqual(loaded.schema['dtypes'], c.schema['dtypes'])
+        self.assertEqual(list(loaded), list(c))
+
+    def test_experiment(self):
+        e = inphase.Experiment(self.path)
+        self.assertEqual(len(e), 0)
+        e.addMeasurements(self.yaml_measurements)
+        e.addMeasurement(self.serial_measurements[0])
+
+        e = inphase.Experiment(self.path)
+        self.assertIsInstance(e.measurements, inphase.ColumnarMeasurements)
+        self.assertEqual(list(e), self.yaml_measurements + self.serial_measurements[:1])
+
+
+if __name__ == "__main__":
+    unittest.main()
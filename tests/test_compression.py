@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import inphase
+from inphase import compression, experimentcache
+from inphase.binaryexperiment import countBinaryExperiment
+from inphase.binarydecoder import decodeBinary, decodeBinaryFile
+from inphase.measurementprovider import BinaryFileMeasurementProvider
+
+import gzip
+import unittest
+import unittest.mock
+import os
+import shutil
+import tempfile
+import time
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SUFFIXES = ['.gz', '.xz', '.bz2']
+
+
+class UnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.reference = inphase.Experiment(os.path.join(THIS_DIR, 'testdata/measurement_data/timestamped.yml'), caching=False).measurements
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_openFile(self):
+        for suffix in SUFFIXES:
+            path = os.path.join(self.temp_dir, 'file.txt' + suffix)
+            with compression.openFile(path, 'w', level=1) as f:
+                f.write('first\n')
+            with compression.openFile(path, 'a') as f:
+                f.write('second\n')
+            with open(path, 'rb') as f:
+                self.assertNotEqual(f.read(), b'first\nsecond\n')
+            with compression.openFile(path, 'r') as f:
+                self.assertEqual(f.read(), 'first\nsecond\n')
+        self.assertEqual(compression.stripCompressionSuffix('experiment.ibx.xz'), 'experiment.ibx')
+        self.assertEqual(compression.stripCompressionSuffix('experiment.yml'), 'experiment.yml')
+
+    def test_yaml(self):
+        for suffix in SUFFIXES:
+            path = os.path.join(self.temp_dir, 'experiment.yml' + suffix)
+            e = inphase.Experiment(path)
+            e.addMeasurements(self.reference)
+            e.addMeasurement(self.reference[0])
+            expected = self.reference + self.reference[:1]
+
+            self.assertEqual(inphase.Experiment(path, caching=False).measurements, expected)
+            self.assertEqual(inphase.Experiment(path, caching=False, processes=2).measurements, expected)
+            self.assertEqual(list(inphase.Experiment(path, lazy=True)), expected)
+            self.assertEqual(len(inphase.Experiment(path, lazy=True)), len(expected))
+            self.assertEqual(inphase.Experiment(path, caching=False, fields=['dqi']).measurements, [{'dqi': m['dqi']} for m in expected])
+
+    def test_new_lazy(self):
+        path = os.path.join(self.temp_dir, 'experiment.yml.gz')
+        e = inphase.Experiment(path, lazy=True)
+        self.assertEqual(len(e), 0)
+        e.addMeasurements(self.reference)
+        self.assertEqual(list(inphase.Experiment(path, lazy=True)), self.reference)
+
+    def test_binary(self):
+        for suffix in SUFFIXES:
+            path = os.path.join(self.temp_dir, 'experiment.ibx' + suffix)
+            e = inphase.Experiment(path)
+            self.assertTrue(e.binary)
+            e.addMeasurements(self.reference)
+            e.addMeasurements(self.reference)
+
+            e = inphase.Experiment(path)
+            self.assertTrue(e.binary)
+            self.assertEqual(e.measurements, self.reference * 2)
+            self.assertEqual(countBinaryExperiment(path), len(self.reference) * 2)
+            self.assertEqual(len(inphase.Experiment(path, lazy=True)), len(self.reference) * 2)
+
+    def test_binary_truncated(self):
+        path = os.path.join(self.temp_dir, 'experiment.ibx.gz')
+        inphase.Experiment(path).addMeasurements(self.reference)
+        with gzip.open(path, 'rb') as f:
+            data = f.read()
+        with gzip.open(path, 'wb') as f:
+            f.write(data[:-3])
+        with self.assertRaises(Exception):
+            countBinaryExperiment(path)
+
+    def test_cache(self):
+        path = os.path.join(self.temp_dir, 'experiment.yml.gz')
+        inphase.Experiment(path).addMeasurements(self.reference)
+        inphase.Experiment(path)
+        self.assertEqual(experimentcache.ExperimentCache().load(path), self.reference)
+
+        # appending adds a new gzip member, the cache is refreshed with it only
+        inphase.Experiment(path, caching=False).addMeasurements(self.reference[:2])
+        with unittest.mock.patch.object(experimentcache.ExperimentCache, 'store') as store:
+            e = inphase.Experiment(path)
+            store.assert_not_called()
+        self.assertEqual(e.measurements, self.reference + self.reference[:2])
+        self.assertEqual(experimentcache.ExperimentCache().load(path), e.measurements)
+
+    def test_capture(self):
+        reference = os.path.join(THIS_DIR, 'testdata/serial_data/test_13.txt')
+        with open(reference, 'rb') as f:
+            data = f.read()
+        expected, remaining, clean = decodeBinary(data, timestamp=False)
+
+        for suffix in SUFFIXES:
+            path = os.path.join(self.temp_dir, 'capture.bin' + suffix)
+            with compression.openFile(path, 'wb') as f:
+                f.write(data)
+
+            m, r, c = decodeBinaryFile(path, processes=2, timestamp=False)
+            self.assertEqual(m, expected)
+            self.assertEqual(bytes(c), bytes(clean))
+
+            for lazy in (False, True):
+                p = BinaryFileMeasurementProvider(path, output_rate=10000, loop=False, lazy=lazy, chunk_size=1000)
+                time.sleep(0.1)
+                self.assertEqual(len(p.getMeasurements()), len(expected))
+                p.close()
+
+        with self.assertRaises(Exception):
+            inphase.BinaryFileIndex(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
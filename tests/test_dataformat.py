@@ -1,10 +1,16 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from inphase import Experiment, Measurement, Sample, Node
+from inphase import Experiment, Measurement, ProjectedMeasurement, FieldNotLoadedError, Sample, SampleArray, Node, internNode, validateMeasurements
+import inphase
 
+import numpy as np
+import pickle
+import shutil
+import tempfile
 import unittest
 import os
+import yaml
 THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
@@ -290,5 +296,239 @@ class UnitTest(unittest.TestCase):
         self.helper_check_list_int_float(self.sample_dict, 'pmu_reflector', Sample)
         self.helper_check_list_int_float(self.sample_dict, 'rssi', Sample)
 
+    def test_measurement_trusted(self):
+        m = Measurement.trusted(self.measurement_dict)
+        self.assertEqual(m, Measurement(self.measurement_dict))
+        self.assertIsInstance(m['reflector'], Node)
+        self.assertIsInstance(m['samples'][0], Sample)
+        self.assertIsNot(m['samples'][0], self.measurement_dict['samples'][0])
+
+        # no validation at all
+        self.measurement_dict['dqi'] = 'string'
+        Measurement.trusted(self.measurement_dict)
+        self.sample_dict['rssi'] = 'string'
+        self.assertIsInstance(Sample.trusted(self.sample_dict), Sample)
+
+    def test_validateMeasurements(self):
+        def validate(d):
+            validateMeasurements([self.measurement_dict, d])
+
+        validateMeasurements([])
+        validate(self.measurement_dict)
+        self.helper_check_int_float(self.measurement_dict, 'dqi', validate)
+        self.helper_check_int_float(self.measurement_dict, 'measured_distance', validate)
+        self.helper_check_int_float(self.measurement_dict, 'real_distance', validate)
+
+        for timestamp in ['string', float('nan'), 10 ** 20]:
+            with self.assertRaises(Exception):
+                validate(dict(self.measurement_dict, timestamp=timestamp))
+        with self.assertRaises(Exception):
+            validate(dict(self.measurement_dict, real_nlos=0))
+        with self.assertRaises(Exception):
+            validate(dict(self.measurement_dict, reflector=[]))
+        with self.assertRaises(Exception):
+            validate(dict(self.measurement_dict, initiator=dict(self.node_dict, moving=None)))
+        validate(dict(self.measurement_dict, samples=[dict(self.sample_dict, pmu_values=[2 ** 70, 1.5])]))
+
+        def validate_sample(d):
+            validate(dict(self.measurement_dict, samples=[self.sample_dict, d]))
+
+        for pmu_values in [[1, None], [1, [2]], [[1, 2]]]:
+            with self.assertRaises(Exception):
+                validate_sample(dict(self.sample_dict, pmu_values=pmu_values))
+            # nested values are rejected even if no other values are validated along with them
+            with self.assertRaises(Exception):
+                validateMeasurements([{'samples': [{'pmu_values': pmu_values}]}])
+        with self.assertRaises(Exception):
+            validateMeasurements([{'dqi': [1]}, {'dqi': [2]}])
+        self.helper_check_int_float(self.sample_dict, 'frequency', validate_sample)
+        self.helper_check_list_int_float(self.sample_dict, 'pmu_values', validate_sample)
+        self.helper_check_list_int_float(self.sample_dict, 'rssi', validate_sample)
+
+    def test_sampleArray(self):
+        samples = [Sample(s) for s in self.measurement_dict['samples']]
+        a = SampleArray(samples)
+        self.assertEqual(len(a), 3)
+        self.assertEqual(a, samples)
+        self.assertEqual(samples, a)
+        self.assertEqual(a.toList(), samples)
+        self.assertEqual(a.columns['pmu_values'].dtype, np.int8)
+        self.assertEqual(a.columns['pmu_values'].shape, (3, 4))
+        self.assertEqual(a[-1], samples[-1])
+        self.assertEqual(a[1:], samples[1:])
+        self.assertIsInstance(a[1:], SampleArray)
+        self.assertEqual([dict(s) for s in a], samples)
+
+        # views write through and widen the dtype if needed
+        a[0]['pmu_values'] = [1000, 0, 0, 0]
+        self.assertEqual(a.columns['pmu_values'][0].tolist(), [1000, 0, 0, 0])
+        a[1:][0]['frequency'] = 1
+        self.assertEqual(a[1]['frequency'], 1)
+        with self.assertRaises(ValueError):
+            a[0]['pmu_values'] = [1, 2]
+        with self.assertRaises(KeyError):
+            a[0]['unknown'] = 1
+
+        a.append(samples[0])
+        del a[0]
+        self.assertEqual(a[-1], samples[0])
+        self.assertEqual(len(a), 3)
+
+        with self.assertRaises(ValueError):
+            SampleArray([samples[0], {'frequency': 1}])
+        with self.assertRaises(ValueError):
+            SampleArray([samples[0], dict(samples[0], pmu_values=[1])])
+        with self.assertRaises(ValueError):
+            SampleArray([dict(samples[0], rssi='string')])
+
+
+class ExperimentFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+        self.node_dict = {
+            'antenna_offset': 563.4,
+            'location': [12000, 4000.5, None],
+            'moving': False,
+            'name': "Anchor 42",
+            'uid': "1e:e3:f5:ff:fe:91:dc:3e"
+        }
+
+        self.measurement_dict = {
+            'dqi': 86,
+            'initiator': dict(self.node_dict),
+            'measured_distance': 1230.5,
+            'reflector': {
+                'antenna_offset': 563.4,
+                'location': [15000, 8000, None],
+                'moving': False,
+                'name': 'Anchor 23',
+                'uid': '1e:e3:f5:ff:fe:91:dc:4f'
+            },
+            'samples': [
+                {
+                    'frequency': 2435.5,
+                    'pmu_initiator': [49, 43, -10, 12],
+                    'pmu_reflector': [-95, -113, -126, 12],
+                    'pmu_values': [-112, -100, 120, 0],
+                    'rssi': [-70, -52, -60, -90]
+                }
+            ],
+            'timestamp': 1481120002.23
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_sampleArray_measurement(self):
+        e = Experiment(os.path.join(THIS_DIR, 'testdata/math_data/clean_sawtooth.yml'), caching=False)
+        m = e.measurements[0]
+        compact = Measurement(dict(m, samples=SampleArray(m['samples'])))
+        self.assertIsInstance(compact['samples'], SampleArray)
+        self.assertEqual(compact, m)
+        self.assertEqual(Measurement.trusted(compact), m)
+        validateMeasurements([compact])
+        self.assertEqual(inphase.math.calculateDistance(compact)[0], inphase.math.calculateDistance(m)[0])
+
+        modified = Measurement(compact)
+        inphase.MRLADecimator().modify(modified)
+        self.assertEqual(len(modified['samples']), 25)
+        inphase.PMUSampleError(count=10).modify(compact)
+        self.assertNotEqual(compact, m)
+
+        # YAML and binary export write plain samples
+        for name in ['experiment.yml', 'experiment.ibx']:
+            path = os.path.join(self.temp_dir, name)
+            Experiment(path, caching=False).addMeasurements([compact])
+            self.assertEqual(Experiment(path, caching=False).measurements, [compact])
+
+    def test_internNode(self):
+        registry = dict()
+        node = internNode(self.node_dict, registry)
+        other = internNode(dict(self.node_dict), registry)
+        self.assertIsInstance(node, Node)
+        self.assertIsNot(other, node)
+        self.assertEqual(node, self.node_dict)
+        # the values are shared until a list is handed out
+        self.assertIs(dict.__getitem__(other, 'location'), dict.__getitem__(node, 'location'))
+        self.assertIs(other['name'], node['name'])
+        self.assertIsNot(dict.__getitem__(internNode(self.node_dict, dict()), 'location'), dict.__getitem__(node, 'location'))
+        self.assertIsNot(dict.__getitem__(internNode(self.node_dict), 'location'), dict.__getitem__(node, 'location'))
+        self.assertEqual(pickle.loads(pickle.dumps(node)), node)
+
+        # every node can be changed in place on its own
+        node['location'][2] = 1000
+        node['name'] = 'changed'
+        self.assertEqual(node['location'], [12000, 4000.5, 1000])
+        self.assertEqual(other, self.node_dict)
+        self.assertIs(type(node), Node)
+        self.assertEqual(self.node_dict['location'], [12000, 4000.5, None])
+
+        # copies do not share the lists with other nodes either
+        third = internNode(self.node_dict, registry)
+        copy = dict(other)
+        copy['location'][0] = 99
+        self.assertEqual(third['location'], self.node_dict['location'])
+
+        # loaded nodes are plain dicts and lists for YAML
+        self.assertEqual(yaml.safe_load(yaml.safe_dump(dict(third))), self.node_dict)
+        self.assertNotIn('!!python', yaml.dump(dict(third)))
+
+    def test_experiment_shared_nodes(self):
+        for name in ['experiment.yml', 'experiment.ibx', 'experiment.npz']:
+            path = os.path.join(self.temp_dir, name)
+            Experiment(path).addMeasurements([Measurement(self.measurement_dict)] * 3)
+            # the second load of the YAML file uses the cache
+            loads = [list(Experiment(path)), list(Experiment(path))]
+            for measurements in loads:
+                self.assertEqual(len(measurements), 3)
+                self.assertEqual(len(set(id(m['reflector']) for m in measurements)), 3, name)
+                self.assertEqual(len(set(id(dict.__getitem__(m['reflector'], 'location')) for m in measurements)), 1, name)
+                for m in measurements:
+                    self.assertEqual(m, self.measurement_dict)
+
+                # changing the node of one measurement in place does not change the others
+                a, b = measurements[0], measurements[1]
+                a['reflector']['name'] = 'changed'
+                a['reflector']['location'][2] = 1000
+                self.assertEqual(a['reflector']['location'], [15000, 8000, 1000])
+                self.assertEqual(b['reflector'], self.measurement_dict['reflector'])
+                self.assertEqual(measurements[2], self.measurement_dict)
+                self.assertEqual(yaml.safe_load(yaml.safe_dump(dict(b['reflector']))), self.measurement_dict['reflector'])
+
+            # every load has its own nodes
+            self.assertIsNot(dict.__getitem__(loads[0][2]['reflector'], 'location'), dict.__getitem__(loads[1][2]['reflector'], 'location'))
+
+            # shared lists are written as plain lists
+            if name == 'experiment.yml':
+                Experiment(path).addMeasurement(loads[1][2])
+                self.assertEqual(Experiment(path, caching=False).measurements[-1], self.measurement_dict)
+
+    def test_experiment_fields(self):
+        reference = Experiment(os.path.join(THIS_DIR, 'testdata/measurement_data/timestamped.yml'), caching=False).measurements
+        fields = ['timestamp', 'reflector', 'dqi']
+        projected = [{key: value for key, value in m.items() if key in fields} for m in reference]
+
+        for name in ['experiment.yml', 'experiment.ibx', 'experiment.npz']:
+            path = os.path.join(self.temp_dir, name)
+            Experiment(path, caching=False).addMeasurements(reference)
+            # YAML is loaded without a cache file, with one and lazily
+            for e in [Experiment(path, fields=fields), Experiment(path), Experiment(path, fields=fields), Experiment(path, fields=fields, lazy=True)]:
+                if e.fields is None:
+                    continue
+                self.assertEqual(list(e), projected, name)
+                m = next(iter(e))
+                self.assertIsInstance(m, ProjectedMeasurement)
+                self.assertEqual(m.loaded_fields, frozenset(fields))
+                with self.assertRaises(FieldNotLoadedError):
+                    m['samples']
+                with self.assertRaises(KeyError):
+                    m['samples']
+                with self.assertRaises(Exception):
+                    e.addMeasurements(reference)
+            self.assertEqual(list(Experiment(path)), reference)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import inphase
+
+import unittest
+import os
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class UnitTest(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(THIS_DIR, 'testdata/serial_data/inphasectl_single_shot.txt'), 'rb') as f:
+            self.single_shot = f.read()
+        with open(os.path.join(THIS_DIR, 'testdata/serial_data/test_13.txt'), 'rb') as f:
+            self.binary_only = f.read()
+
+    def helper_feed(self, data, chunk_size):
+        demultiplexer = inphase.StreamDemultiplexer(timestamp=False)
+        parameters = dict()
+        measurements = list()
+        clean = bytearray()
+        for i in range(0, len(data), chunk_size):
+            p, m, c = demultiplexer.feed(data[i:i + chunk_size])
+            parameters.update(p)
+            measurements += m
+            clean += c
+        return parameters, measurements, bytes(clean), demultiplexer.remaining
+
+    def test_two_stage_pipeline(self):
+        # decoding parameters first and binary frames from the clean data afterwards gives the same result
+        parameters, remaining, clean = inphase.decodeParameters(self.single_shot)
+        measurements, _, clean = inphase.decodeBinary(clean, timestamp=False)
+
+        for chunk_size in [1, 10, len(self.single_shot)]:
+            p, m, c, r = self.helper_feed(self.single_shot, chunk_size)
+            self.assertDictEqual(p, parameters)
+            self.assertEqual(m, measurements)
+            self.assertEqual(c, clean)
+            self.assertEqual(r, remaining)
+
+    def test_binary_only(self):
+        measurements, _, _ = inphase.decodeBinary(self.binary_only, timestamp=False)
+
+        p, m, c, r = self.helper_feed(self.binary_only, 1000)
+        self.assertDictEqual(p, dict())
+        self.assertEqual(m, measurements)
+
+    def test_line_after_start_byte(self):
+        # start bytes without a valid frame header must not hold back the following lines
+        d = inphase.StreamDemultiplexer()
+        p, m, c = d.feed(b'>>-- inphasectl --<<\r\ndistance_sensor0.start:1\r\n')
+        self.assertDictEqual(p, {'distance_sensor0.start': 1})
+        self.assertEqual(m, list())
+        self.assertEqual(c, b'>>-- inphasectl --<<\r\n')
+        self.assertEqual(d.remaining, b'')
+
+    def test_callbacks(self):
+        received = dict()
+        d = inphase.StreamDemultiplexer(on_parameters=lambda p: received.setdefault('p', p),
+                                        on_measurements=lambda m: received.setdefault('m', m),
+                                        on_clean=lambda c: received.setdefault('c', c))
+        d.feed(self.single_shot)
+        self.assertIn('p', received)
+        self.assertIn('m', received)
+        self.assertIn('c', received)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import inphase
+from inphase import experimentcache
+
+import pickle
+import unittest
+import unittest.mock
+import os
+import shutil
+import tempfile
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class UnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'experiment.yml')
+        shutil.copy2(os.path.join(THIS_DIR, 'testdata/math_data/experiment.yml'), self.path)
+        self.reference = inphase.Experiment(self.path, caching=False).measurements
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_load_without_validation(self):
+        inphase.Experiment(self.path)
+        self.assertTrue(os.path.exists(self.path + experimentcache.CACHE_SUFFIX))
+
+        with unittest.mock.patch.object(inphase.Measurement, 'validate') as validate:
+            e = inphase.Experiment(self.path)
+            validate.assert_not_called()
+        self.assertEqual(e.measurements, self.reference)
+        self.assertIsInstance(e.measurements[0], inphase.Measurement)
+        self.assertIsInstance(e.measurements[0]['initiator'], inphase.Node)
+        self.assertIsInstance(e.measurements[0]['samples'][0], inphase.Sample)
+
+    def test_changed_source(self):
+        inphase.Experiment(self.path)
+
+        # change the content but keep the size
+        stat = os.stat(self.path)
+        with open(self.path, 'r+b') as f:
+            content = f.read()
+            f.seek(0)
+            f.write(content.replace(b'dqi: 14', b'dqi: 15', 1))
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        e = inphase.Experiment(self.path)
+        self.assertEqual(e.measurements[0]['dqi'], 15)
+
+    def test_source_hashed_only_if_touched(self):
+        inphase.Experiment(self.path)
+        cache_path = self.path + experimentcache.CACHE_SUFFIX
+
+        # size and modification time match, the file is not hashed
+        with unittest.mock.patch.object(experimentcache, '_hashFile') as hash_file:
+            self.assertEqual(inphase.Experiment(self.path).measurements, self.reference)
+            hash_file.assert_not_called()
+
+        # touched but unchanged, the file is hashed once and the cache file gets the new time
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        with unittest.mock.patch.object(experimentcache.ExperimentCache, 'store') as store:
+            self.assertEqual(inphase.Experiment(self.path).measurements, self.reference)
+            store.assert_not_called()
+        with open(cache_path, 'rb') as f:
+            self.assertEqual(experimentcache._readHeader(f)['source_mtime'], stat.st_mtime_ns + 10 ** 9)
+        with unittest.mock.patch.object(experimentcache, '_hashFile') as hash_file:
+            self.assertEqual(inphase.Experiment(self.path).measurements, self.reference)
+            hash_file.assert_not_called()
+
+    def test_compaction(self):
+        inphase.Experiment(self.path)
+        cache_path = self.path + experimentcache.CACHE_SUFFIX
+        cache = experimentcache.ExperimentCache()
+        size = os.path.getsize(cache_path) + len(pickle.dumps(list(range(1000))))
+
+        # every stored index leaves the previous index and header behind, until the file is rewritten without them
+        with unittest.mock.patch.object(experimentcache, '_MIN_STALE_SIZE', 0):
+            for i in range(50):
+                cache.storeIndex(self.path, list(range(1000)))
+                self.assertLess(os.path.getsize(cache_path), 3 * size)
+        self.assertFalse(os.path.exists(cache_path + experimentcache.TEMP_SUFFIX))
+        self.assertEqual(cache.load(self.path), self.reference)
+        self.assertEqual(cache.loadIndex(self.path), list(range(1000)))
+
+    def test_appended_source(self):
+        inphase.Experiment(self.path)
+        cache_path = self.path + experimentcache.CACHE_SUFFIX
+
+        e = inphase.Experiment(self.path, caching=False)
+        e.addMeasurements(self.reference)
+        e.addMeasurements(self.reference[:1])
+
+        # only the appended measurements are parsed, the cache file grows by a segment
+        with unittest.mock.patch.object(experimentcache.ExperimentCache, 'store') as store:
+            e = inphase.Experiment(self.path)
+            store.assert_not_called()
+        self.assertEqual(e.measurements, self.reference * 2 + self.reference[:1])
+        self.assertEqual(experimentcache.ExperimentCache().load(self.path), e.measurements)
+        with open(cache_path, 'rb') as f:
+            header = experimentcache._readHeader(f)
+        self.assertEqual(len(header['segments']), 2)
+        self.assertEqual(header['count'], len(e.measurements))
+
+        projected = inphase.Experiment(self.path, fields=['dqi']).measurements
+        self.assertEqual(projected, [{'dqi': m['dqi']} for m in e.measurements])
+
+        # appended data that is not a measurement of its own makes the whole file parsed again
+        with open(self.path, 'a') as f:
+            f.write('  - {frequency: 2400, pmu_values: [1]}\n')
+        self.assertIsNone(experimentcache.ExperimentCache().load(self.path))
+        self.assertEqual(len(inphase.Experiment(self.path).measurements[-1]['samples']), len(self.reference[0]['samples']) + 1)
+
+    def test_invalid_cache_files(self):
+        cache_path = self.path + experimentcache.CACHE_SUFFIX
+
+        # a cache file of the old format containing the raw YAML data
+        with open(cache_path, 'wb') as f:
+            pickle.dump([{'dqi': 1}], f)
+        self.assertEqual(inphase.Experiment(self.path).measurements, self.reference)
+
+        with unittest.mock.patch.object(experimentcache, 'CACHE_FORMAT_VERSION', experimentcache.CACHE_FORMAT_VERSION + 1):
+            self.assertIsNone(experimentcache.ExperimentCache().load(self.path))
+
+        with open(cache_path, 'r+b') as f:
+            f.truncate(100)
+        self.assertIsNone(experimentcache.ExperimentCache().load(self.path))
+
+    def test_cache_dir_eviction(self):
+        cache_dir = os.path.join(self.temp_dir, 'cache')
+        paths = list()
+        for i in range(4):
+            path = os.path.join(self.temp_dir, 'experiment_%d.yml' % i)
+            shutil.copy2(self.path, path)
+            paths.append(path)
+
+        cache = experimentcache.ExperimentCache(cache_dir)
+        inphase.Experiment(paths[0], cache_dir=cache_dir)
+        size = os.path.getsize(cache.path(paths[0]))
+        self.assertFalse(os.path.exists(paths[0] + experimentcache.CACHE_SUFFIX))
+
+        for i, path in enumerate(paths[1:]):
+            os.utime(cache.path(paths[0]), (i, i))  # make the first cache file the least recently used one
+            inphase.Experiment(path, cache_dir=cache_dir, max_cache_size=3 * size)
+
+        self.assertFalse(os.path.exists(cache.path(paths[0])))
+        for path in paths[1:]:
+            self.assertTrue(os.path.exists(cache.path(path)))
+            self.assertEqual(cache.load(path), self.reference)
+
+
+if __name__ == "__main__":
+    unittest.main()
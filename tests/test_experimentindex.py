@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import inphase
+from inphase import experimentcache
+from inphase.experimentindex import ExperimentIndex
+
+import pickle
+import random
+import unittest
+import unittest.mock
+import os
+import shutil
+import tempfile
+
+
+class UnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = random.Random(17121986)
+        self.measurements = list()
+        for i in range(500):
+            m = {
+                'initiator': {'uid': 'i%d' % rng.randrange(3)},
+                'reflector': {'uid': 'r%d' % rng.randrange(5)},
+                'timestamp': 1481120000 + rng.randrange(1000) / 10,
+                'real_distance': rng.randrange(100) * 100,
+                'real_nlos': rng.random() < 0.3,
+            }
+            if i % 7 == 0:
+                del m['real_distance']
+                del m['real_nlos']
+            self.measurements.append(inphase.Measurement(m))
+        self.path = os.path.join(self.temp_dir, 'experiment.yml')
+        inphase.Experiment(self.path).addMeasurements(self.measurements)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def helper_scan(self, reflector=None, initiator=None, link=None, start=None, end=None, min_distance=None, max_distance=None, nlos=None):
+        # the linear scan the index replaces
+        result = list()
+        for m in self.measurements:
+            if reflector is not None and m['reflector']['uid'] != reflector:
+                continue
+            if initiator is not None and m['initiator']['uid'] != initiator:
+                continue
+            if link is not None and (m['initiator']['uid'], m['reflector']['uid']) != link:
+                continue
+            if start is not None and m['timestamp'] < start:
+                continue
+            if end is not None and m['timestamp'] >= end:
+                continue
+            if (min_distance is not None or max_distance is not None) and 'real_distance' not in m:
+                continue
+            if min_distance is not None and m['real_distance'] < min_distance:
+                continue
+            if max_distance is not None and m['real_distance'] > max_distance:
+                continue
+            if nlos is not None and m.get('real_nlos') is not nlos:
+                continue
+            result.append(m)
+        return result
+
+    def test_query(self):
+        e = inphase.Experiment(self.path)
+        queries = [
+            dict(),
+            dict(reflector='r1'),
+            dict(reflector='unknown'),
+            dict(initiator='i2', nlos=True),
+            dict(link=('i0', 'r3')),
+            dict(link=('i0', 'r3'), start=1481120010, end=1481120050.5),
+            dict(start=1481120050),
+            dict(end=1481120000),
+            dict(min_distance=2000, max_distance=3000),
+            dict(reflector='r4', max_distance=5000, nlos=False),
+        ]
+        for criteria in queries:
+            self.assertEqual(e.query(**criteria), self.helper_scan(**criteria), criteria)
+
+    def test_index_in_cache(self):
+        e = inphase.Experiment(self.path)
+        index = e.getIndex()
+        self.assertIs(e.getIndex(), index)
+
+        # loaded from the cache file, not built again
+        with unittest.mock.patch.object(ExperimentIndex, '__init__') as init:
+            e = inphase.Experiment(self.path)
+            self.assertEqual(e.query(reflector='r2'), self.helper_scan(reflector='r2'))
+            init.assert_not_called()
+
+        # the cached measurements are still valid
+        self.assertEqual(experimentcache.ExperimentCache().load(self.path), self.measurements)
+
+        # appending invalidates the index
+        new = inphase.Measurement({'reflector': {'uid': 'r2'}, 'initiator': {'uid': 'i0'}, 'timestamp': 1481130000})
+        e.addMeasurement(new)
+        self.measurements.append(new)
+        self.assertEqual(e.query(reflector='r2'), self.helper_scan(reflector='r2'))
+        self.assertEqual(inphase.Experiment(self.path).query(start=1481130000), [new])
+
+    def test_fields(self):
+        # the index of projected measurements is not stored in the cache file
+        e = inphase.Experiment(self.path, fields=['timestamp'])
+        self.assertEqual([m['timestamp'] for m in e.query(start=1481120050)], [m['timestamp'] for m in self.helper_scan(start=1481120050)])
+        self.assertEqual(inphase.Experiment(self.path).query(reflector='r2'), self.helper_scan(reflector='r2'))
+
+        # and an index in the cache file is not used for them
+        e = inphase.Experiment(self.path, fields=['timestamp'])
+        self.assertEqual(e.query(reflector='r2'), list())
+
+    def test_pickle(self):
+        index = pickle.loads(pickle.dumps(ExperimentIndex(self.measurements)))
+        self.assertEqual(index.select(initiator='i1').tolist(), [i for i, m in enumerate(self.measurements) if m['initiator']['uid'] == 'i1'])
+
+    def test_lazy(self):
+        with self.assertRaises(Exception):
+            inphase.Experiment(self.path, lazy=True).query(reflector='r1')
+
+
+if __name__ == "__main__":
+    unittest.main()
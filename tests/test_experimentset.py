@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import inphase
+from inphase import experimentcache
+
+import random
+import unittest
+import unittest.mock
+import os
+import shutil
+import tempfile
+
+
+class UnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = random.Random(17121986)
+        self.measurements = list()
+        timestamp = 1481120000
+        for i in range(300):
+            timestamp += rng.randrange(1, 100) / 10
+            self.measurements.append(inphase.Measurement({
+                'initiator': {'uid': 'i%d' % rng.randrange(3)},
+                'reflector': {'uid': 'r%d' % rng.randrange(5)},
+                'timestamp': timestamp,
+                'real_distance': rng.randrange(100) * 100,
+            }))
+        for m in self.measurements:
+            path = self.helper_shard(m)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            inphase.Experiment(path, caching=False).addMeasurement(m)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def helper_shard(self, measurement):
+        # one directory per day and one file per initiator
+        day = int(measurement['timestamp'] - 1481120000) // 500
+        return os.path.join(self.temp_dir, 'day%d' % day, '%s.yml' % measurement['initiator']['uid'])
+
+    def test_load(self):
+        pattern = os.path.join(self.temp_dir, '*', '*.yml')
+        s = inphase.ExperimentSet(pattern)
+        self.assertGreater(len(s.experiments), 3)
+        self.assertEqual(len(s), len(self.measurements))
+        self.assertEqual(list(s), self.measurements)
+        self.assertEqual(s.measurements, self.measurements)
+
+        # every shard has its own cache file, which are not taken for shards
+        for path in s.experiments:
+            self.assertTrue(os.path.exists(path + experimentcache.CACHE_SUFFIX))
+        # neither are other sidecar files or leftovers of interrupted atomic writes
+        for suffix in ['.idx', '.tmp', '.cache.tmp', '.summary.tmp']:
+            with open(path + suffix, 'wb') as f:
+                f.write(b'\x00not an experiment')
+        s = inphase.ExperimentSet(os.path.join(self.temp_dir, '*', '*'), processes=2)
+        self.assertEqual(sorted(s.experiments), sorted(inphase.ExperimentSet(pattern).experiments))
+        self.assertEqual(s.measurements, self.measurements)
+
+    def test_processes(self):
+        # the pool only writes the cache files of shards that have none, the parent loads them
+        pattern = os.path.join(self.temp_dir, '*', '*.yml')
+        s = inphase.ExperimentSet(pattern, processes=2)
+        self.assertEqual(s.measurements, self.measurements)
+        for path in s.experiments:
+            self.assertTrue(experimentcache.ExperimentCache().isValid(path))
+
+        # shards with an up to date cache file are loaded without a pool
+        with unittest.mock.patch('concurrent.futures.ProcessPoolExecutor') as executor:
+            s = inphase.ExperimentSet(pattern, processes=2)
+            executor.assert_not_called()
+        self.assertEqual(s.measurements, self.measurements)
+
+        # without caching there is nothing to warm
+        for path in s.experiments:
+            os.remove(path + experimentcache.CACHE_SUFFIX)
+        with unittest.mock.patch('concurrent.futures.ProcessPoolExecutor') as executor:
+            s = inphase.ExperimentSet(pattern, processes=2, caching=False)
+            executor.assert_not_called()
+        self.assertEqual(s.measurements, self.measurements)
+
+    def test_lazy(self):
+        s = inphase.ExperimentSet(os.path.join(self.temp_dir, '*', '*.yml'), lazy=True)
+        self.assertEqual(list(s), self.measurements)
+        self.assertEqual(len(s), len(self.measurements))
+        with self.assertRaises(Exception):
+            s.measurements
+        with self.assertRaises(Exception):
+            s.query(reflector='r1')
+
+    def test_query(self):
+        s = inphase.ExperimentSet([os.path.join(self.temp_dir, 'day0', '*.yml'), os.path.join(self.temp_dir, 'day[1-9]*', '*.yml')])
+        self.assertEqual(s.query(reflector='r1', min_distance=5000),
+                         [m for m in self.measurements if m['reflector']['uid'] == 'r1' and m['real_distance'] >= 5000])
+
+    def test_append(self):
+        pattern = os.path.join(self.temp_dir, '*', '*.yml')
+        s = inphase.ExperimentSet(pattern, shard=self.helper_shard)
+        s.query(initiator='i0')
+        new = [
+            inphase.Measurement({'initiator': {'uid': 'i0'}, 'reflector': {'uid': 'r0'}, 'timestamp': 1481200000}),
+            inphase.Measurement({'initiator': {'uid': 'i9'}, 'reflector': {'uid': 'r0'}, 'timestamp': 1481200001}),
+        ]
+        s.addMeasurements(new)
+        self.assertEqual(s.measurements, self.measurements + new)
+        self.assertEqual(s.query(initiator='i0', start=1481200000), new[:1])
+        self.assertTrue(os.path.exists(self.helper_shard(new[1])))
+        self.assertEqual(inphase.ExperimentSet(pattern).measurements, self.measurements + new)
+
+        # without a shard function, measurements are appended to the last file
+        s = inphase.ExperimentSet(pattern)
+        last = max(s.experiments)
+        s.addMeasurement(new[0])
+        self.assertEqual(inphase.Experiment(last).measurements[-1], new[0])
+
+        with self.assertRaises(Exception):
+            inphase.ExperimentSet(os.path.join(self.temp_dir, 'none', '*.yml')).addMeasurement(new[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
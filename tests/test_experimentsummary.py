@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import inphase
+from inphase.experimentsummary import ExperimentSummary, SUMMARY_SUFFIX
+
+import unittest
+import unittest.mock
+import os
+import shutil
+import tempfile
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class UnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.reference = inphase.Experiment(os.path.join(THIS_DIR, 'testdata/measurement_data/timestamped.yml'), caching=False).measurements
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def helper_check(self, summary, measurements):
+        self.assertEqual(summary.count, len(measurements))
+        timestamps = [m['timestamp'] for m in measurements]
+        self.assertEqual(summary.timestamp_min, min(timestamps))
+        self.assertEqual(summary.timestamp_max, max(timestamps))
+        links = dict()
+        for m in measurements:
+            link = (m['initiator']['uid'] if 'initiator' in m else None, m['reflector']['uid'])
+            links[link] = links.get(link, 0) + 1
+        self.assertEqual(summary.links, links)
+        self.assertEqual(sum(summary.sample_geometry.values()), len(measurements))
+        self.assertEqual(sum(summary.real_distances.values()), sum(1 for m in measurements if 'real_distance' in m))
+        for m in measurements:
+            self.assertIn(m['reflector']['uid'], summary.nodes)
+
+    def test_summary(self):
+        summary = ExperimentSummary(self.reference)
+        self.helper_check(summary, self.reference)
+        self.assertEqual(list(summary.sample_geometry), [(len(self.reference[0]['samples']), len(self.reference[0]['samples'][0]['pmu_values']))])
+
+        empty = ExperimentSummary()
+        self.assertEqual(empty.count, 0)
+        self.assertIsNone(empty.timestamp_min)
+
+    def test_sidecar(self):
+        for name in ('experiment.yml', 'experiment.ibx', 'experiment.npz', 'experiment.yml.gz'):
+            path = os.path.join(self.temp_dir, name)
+            e = inphase.Experiment(path, summarize=True)
+            e.addMeasurements(self.reference)
+            self.assertTrue(os.path.exists(path + SUMMARY_SUFFIX))
+
+            # only the new measurements are added to the summary
+            with unittest.mock.patch.object(ExperimentSummary, 'update', autospec=True, side_effect=ExperimentSummary.update) as update:
+                e.addMeasurement(self.reference[0])
+                update.assert_called_once()
+                self.assertEqual(update.call_args[0][1], [self.reference[0]])
+
+            # no experiment file is read for the summary
+            with unittest.mock.patch.object(inphase.Experiment, '__init__') as init:
+                summary = inphase.Experiment.summary(path)
+                init.assert_not_called()
+            self.helper_check(summary, self.reference + self.reference[:1])
+
+    def test_cache_dir(self):
+        data_dir = os.path.join(self.temp_dir, 'data')
+        cache_dir = os.path.join(self.temp_dir, 'cache')
+        os.mkdir(data_dir)
+        path = os.path.join(data_dir, 'experiment.yml')
+
+        # no summary file without summarize
+        inphase.Experiment(path).addMeasurements(self.reference)
+        self.assertEqual(os.listdir(data_dir), ['experiment.yml'])
+
+        e = inphase.Experiment(path, cache_dir=cache_dir, summarize=True)
+        e.addMeasurements(self.reference)
+        self.assertEqual(sorted(os.listdir(data_dir)), ['experiment.yml'])
+        self.assertTrue(any(name.endswith(SUMMARY_SUFFIX) for name in os.listdir(cache_dir)))
+        with unittest.mock.patch.object(inphase.Experiment, '__init__') as init:
+            summary = inphase.Experiment.summary(path, cache_dir=cache_dir)
+            init.assert_not_called()
+        self.helper_check(summary, self.reference * 2)
+
+    def test_lazy(self):
+        path = os.path.join(self.temp_dir, 'experiment.yml')
+        inphase.Experiment(path, lazy=True, summarize=True).addMeasurements(self.reference)
+        # no summary without loaded measurements to make it from
+        self.assertFalse(os.path.exists(path + SUMMARY_SUFFIX))
+
+        # the summary is made once, then updated by lazy experiments as well
+        self.helper_check(inphase.Experiment.summary(path), self.reference)
+        inphase.Experiment(path, lazy=True, summarize=True).addMeasurements(self.reference[:2])
+        with unittest.mock.patch.object(inphase.Experiment, '__init__') as init:
+            summary = inphase.Experiment.summary(path)
+            init.assert_not_called()
+        self.helper_check(summary, self.reference + self.reference[:2])
+
+    def test_outdated(self):
+        path = os.path.join(self.temp_dir, 'experiment.yml')
+        inphase.Experiment(path, summarize=True).addMeasurements(self.reference)
+
+        # changes made without updating the summary are noticed
+        inphase.Experiment(path).addMeasurements(self.reference[:3])
+        self.helper_check(inphase.Experiment.summary(path), self.reference + self.reference[:3])
+
+        with open(path + SUMMARY_SUFFIX, 'wb') as f:
+            f.write(b'broken')
+        self.helper_check(inphase.Experiment.summary(path), self.reference + self.reference[:3])
+
+        with open(path + SUMMARY_SUFFIX, 'w') as f:
+            f.write('{"version": 2}')
+        self.helper_check(inphase.Experiment.summary(path), self.reference + self.reference[:3])
+
+        with self.assertRaises(Exception):
+            inphase.Experiment.summary(os.path.join(self.temp_dir, 'missing.yml'))
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, 'missing.yml')))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import inphase
+
+import unittest
+import unittest.mock
+import os
+import shutil
+import tempfile
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class UnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.reference = inphase.Experiment(os.path.join(THIS_DIR, 'testdata/measurement_data/timestamped.yml'), caching=False).measurements
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def helper_write(self, name, **kwargs):
+        path = os.path.join(self.temp_dir, name)
+        experiment = inphase.Experiment(path, caching=False)
+        with inphase.ExperimentWriter(experiment, **kwargs) as writer:
+            for m in self.reference:
+                writer.addMeasurement(m)
+        self.assertEqual(experiment.measurements, self.reference)
+        return path
+
+    def test_yaml(self):
+        path = self.helper_write('experiment.yml', fsync=True)
+        self.assertEqual(inphase.Experiment(path, caching=False).measurements, self.reference)
+
+    def test_binary(self):
+        path = self.helper_write('experiment.ibx', batch_size=2)
+        self.assertEqual(inphase.Experiment(path).measurements, self.reference)
+
+    def test_batches(self):
+        experiment = inphase.Experiment(os.path.join(self.temp_dir, 'experiment.yml'), caching=False)
+        with unittest.mock.patch.object(experiment, 'addMeasurements') as add:
+            writer = inphase.ExperimentWriter(experiment, batch_size=3, flush_interval=10)
+            writer.addMeasurements(self.reference)
+            writer.flush()
+            self.assertEqual([len(c[0][0]) for c in add.call_args_list], [3, 3, 1])
+            writer.close()
+
+    def test_error(self):
+        experiment = inphase.Experiment(os.path.join(self.temp_dir, 'experiment.yml'), caching=False)
+        writer = inphase.ExperimentWriter(experiment)
+        writer.addMeasurement({'samples': 'broken'})
+        with self.assertRaises(Exception):
+            writer.flush()
+        with self.assertRaises(Exception):
+            writer.addMeasurements(self.reference)
+        with self.assertRaises(Exception):
+            writer.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
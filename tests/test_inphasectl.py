@@ -156,8 +156,19 @@ class TestInphasectlNode(unittest.TestCase):
         self.logger.info(">> test_start")
         self.assertTrue(self.node.running)
         self.node.start()
-        data_to_process = self.node.data_queue.get(timeout=0.5)
-        self.assertGreater(len(data_to_process), 0)
+        measurements = self.node.measurement_queue.get(timeout=0.5)
+        self.assertGreater(len(measurements), 0)
+
+    def test_measurement_queue_full(self):
+        '''
+        Test that a full measurement queue drops the oldest measurements instead of blocking.
+        '''
+        self.logger.info(">> test_measurement_queue_full")
+        node = inphasectl(measurement_queue_size=2)
+        for i in range(5):
+            node._putMeasurements([i])
+        self.assertEqual(node.measurement_queue.get_nowait(), [3])
+        self.assertEqual(node.measurement_queue.get_nowait(), [4])
 
     def test_list_parameters(self):
         '''
@@ -7,11 +7,14 @@ from inphase.measurementprovider import *
 from tests import inphasectl_mockup
 
 import unittest
+import unittest.mock
+import itertools
 import time
 import socket
 import logging
 import sys
 import tempfile
+import shutil
 import os
 THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -136,6 +139,88 @@ class UnitTest(unittest.TestCase):
         self.assertEqual(len(self.p.getMeasurements()), 665 * 2)
         self.assertEqual(len(self.p.getMeasurements()), 0)
 
+    def test_BinaryFileMeasurementProviderParallel(self):
+        self.p = BinaryFileMeasurementProvider(os.path.join(THIS_DIR, 'testdata/serial_data/test_13.txt'), output_rate=10000, loop=False, processes=2)
+        time.sleep(0.1)
+        self.assertEqual(len(self.p.getMeasurements()), 665)
+        self.assertEqual(len(self.p.getMeasurements()), 0)
+
+    def test_BinaryFileMeasurementProviderLazy(self):
+        file_name = os.path.join(THIS_DIR, 'testdata/serial_data/test_13.txt')
+        eager = BinaryFileMeasurementProvider(file_name, output_rate=10000, loop=False)
+        self.p = BinaryFileMeasurementProvider(file_name, output_rate=10000, loop=False, lazy=True, chunk_size=1000)
+        time.sleep(0.1)
+        measurements = self.p.getMeasurements()
+        self.assertEqual(len(measurements), 665)
+        self.assertEqual(len(self.p.getMeasurements()), 0)
+        self.assertEqual(measurements[100]['samples'], next(itertools.islice(eager.measurements, 100, None))['samples'])
+        self.assertEqual(self.p.clean, eager.clean)
+
+    def test_BinaryFileMeasurementProviderLazyLoop(self):
+        file_name = os.path.join(THIS_DIR, 'testdata/serial_data/test_13.txt')
+        eager = BinaryFileMeasurementProvider(file_name, output_rate=10000, loop=False)
+        self.p = BinaryFileMeasurementProvider(file_name, output_rate=10000, loop=True, lazy=True)
+        time.sleep(0.1)
+        # more measurements than in the file, the provider started over
+        self.assertGreater(len(self.p.getMeasurements()), 665)
+        self.assertEqual(self.p.clean, eager.clean)
+
+    def test_IndexedBinaryFileMeasurementProvider(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_name = os.path.join(temp_dir, 'capture.txt')
+            shutil.copy(os.path.join(THIS_DIR, 'testdata/serial_data/test_13.txt'), file_name)
+            self.p = IndexedBinaryFileMeasurementProvider(file_name, start=100, stop=200, output_rate=10000, loop=False)
+            time.sleep(0.1)
+            self.assertEqual(len(self.p.getMeasurements()), 100)
+            self.assertEqual(len(self.p.getMeasurements()), 0)
+
+    def test_RingBufferSink(self):
+        sink = RingBufferSink(max_size=10)
+        sink.write(b'0123456')
+        sink.write(b'789abcdef')
+        self.assertEqual(sink.getvalue(), b'6789abcdef')
+        self.assertEqual(sink.bytes_received, 16)
+        self.assertEqual(sink.bytes_dropped, 6)
+
+    def test_BinaryFileMeasurementProviderClean(self):
+        # an unbounded sink keeps all clean data of a file, even more than the default ring buffer holds
+        with open(os.path.join(THIS_DIR, 'testdata/serial_data/test_13.txt'), 'rb') as f:
+            data = b'clean line\n' * (DEFAULT_CLEAN_BUFFER_SIZE // 10) + f.read()
+        m, r, c = inphase.decodeBinary(data)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_name = os.path.join(temp_dir, 'capture.txt')
+            with open(file_name, 'wb') as f:
+                f.write(data)
+            bounded = BinaryFileMeasurementProvider(file_name, loop=False)
+            self.p = BinaryFileMeasurementProvider(file_name, loop=False, clean_sink=RingBufferSink(max_size=None))
+        bounded.close()
+        # by default only the most recent clean data is kept
+        self.assertEqual(bounded.clean, c[-DEFAULT_CLEAN_BUFFER_SIZE:])
+        self.assertGreater(len(self.p.clean), DEFAULT_CLEAN_BUFFER_SIZE)
+        self.assertEqual(self.p.clean, c)
+
+        sink = RingBufferSink(max_size=None)
+        sink.write(b'0123456789')
+        self.assertEqual(sink.getvalue(), b'0123456789')
+        self.assertEqual(sink.bytes_dropped, 0)
+
+    def test_LineCallbackSink(self):
+        lines = list()
+        sink = LineCallbackSink(lines.append, max_line_length=10)
+        sink.write(b'first line\r\nsec')
+        sink.write(b'ond\nthird line is too long')
+        self.assertEqual(lines, [b'first line', b'second', b'third line is too long'])
+        sink.write(b'rest')
+        self.assertEqual(sink.getvalue(), b'rest')
+        self.assertEqual(sink.bytes_received, 45)
+        self.assertEqual(sink.bytes_dropped, 0)
+
+    def test_DiscardSink(self):
+        self.p = BinaryFileMeasurementProvider(os.path.join(THIS_DIR, 'testdata/serial_data/test_13.txt'), clean_sink=DiscardSink())
+        self.assertEqual(self.p.clean, b'')
+        self.assertEqual(self.p.clean_sink.bytes_received, self.p.clean_sink.bytes_dropped)
+        self.assertGreater(self.p.clean_sink.bytes_received, 0)
+
     def test_ConstantRateMeasurementProvider1(self):
         self.p = ConstantRateMeasurementProvider(self.measurements, output_rate=10, loop=True)
         self.assertEqual(len(self.p.getMeasurements()), 0)
@@ -179,6 +264,31 @@ class UnitTest(unittest.TestCase):
         # the two measurements should not be the same object, they need to be copies of each other!
         self.assertFalse(m1[0] is m2[0])
 
+    def test_ConstantRateMeasurementProvider_validate(self):
+        # a list of measurements is validated up front, other iterables when an item is output for the first time
+        with self.assertRaises(Exception):
+            ConstantRateMeasurementProvider(self.measurements[:2] + [{'dqi': 'invalid'}], output_rate=10)
+        self.p = ConstantRateMeasurementProvider(iter([{'dqi': 'invalid'}]), output_rate=10)
+        time.sleep(0.2)
+        with self.assertRaises(Exception):
+            self.p.getMeasurements()
+
+        # replaying does not validate again
+        reiterable = inphase.measurementprovider._ReIterable(lambda: iter(self.measurements[:2]))
+        for measurements in [self.measurements[:2], iter(self.measurements[:2]), reiterable]:
+            self.p = ConstantRateMeasurementProvider(measurements, output_rate=1000, loop=True)
+            time.sleep(0.01)
+            self.assertGreater(len(self.p.getMeasurements()), 2)
+            with unittest.mock.patch('inphase.measurementprovider.validateMeasurements') as validate, \
+                    unittest.mock.patch.object(Measurement, 'validate') as validate_measurement:
+                time.sleep(0.01)
+                replayed = self.p.getMeasurements()
+            self.assertGreater(len(replayed), 2)
+            validate.assert_not_called()
+            validate_measurement.assert_not_called()
+            for m in replayed:
+                self.assertIn(dict(m, timestamp=None), [dict(r, timestamp=None) for r in self.measurements[:2]])
+
     def test_ConstantRateMeasurementProviderTimestamps(self):
         self.p = ConstantRateMeasurementProvider(self.measurements, output_rate=100, loop=True)
         time.sleep(0.1)
@@ -262,9 +372,31 @@ class UnitTest(unittest.TestCase):
         time.sleep(2)
         self.assertEqual(len(self.p.getMeasurements()), 7)
 
+    def test_YAMLMeasurementProviderLazyConstantRate(self):
+        self.p = YAMLMeasurementProvider(os.path.join(THIS_DIR, 'testdata/measurement_data/timestamped.yml'), realtime=False, output_rate=10000, loop=False, lazy=True)
+        time.sleep(0.1)
+        self.assertEqual(len(self.p.getMeasurements()), 7)
+        self.assertEqual(len(self.p.getMeasurements()), 0)
+
+    def test_YAMLMeasurementProviderLazyRealtimeLoop(self):
+        self.p = YAMLMeasurementProvider(os.path.join(THIS_DIR, 'testdata/measurement_data/timestamped.yml'), realtime=True, loop=True, lazy=True)
+        self.assertEqual(len(self.p.getMeasurements()), 1)
+        time.sleep(1)
+        self.assertEqual(len(self.p.getMeasurements()), 3)
+        time.sleep(0.1)
+        self.assertEqual(len(self.p.getMeasurements()), 0)
+        time.sleep(0.5)
+        self.assertEqual(len(self.p.getMeasurements()), 2)
+        time.sleep(1)
+        self.assertEqual(len(self.p.getMeasurements()), 2)
+        time.sleep(1)
+        self.assertEqual(len(self.p.getMeasurements()), 3)
+
     def test_YAMLMeasurementProviderException(self):
         with self.assertRaises(Exception):
             self.p = YAMLMeasurementProvider(os.path.join(THIS_DIR, 'testdata/measurement_data/experiment_no_timestamp.yml'), realtime=True, loop=False)
+        with self.assertRaises(Exception):
+            self.p = YAMLMeasurementProvider(os.path.join(THIS_DIR, 'testdata/measurement_data/experiment_no_timestamp.yml'), realtime=True, loop=False, lazy=True)
 
     def test_ConstantRateMeasurementProviderNotSame(self):
         self.p = ConstantRateMeasurementProvider(self.measurements, output_rate=1, loop=True)
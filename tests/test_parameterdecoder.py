@@ -86,6 +86,30 @@ class UnitTest(unittest.TestCase):
         self.assertIn('distance_sensor0.start', parameters)
         self.assertEqual(parameters['distance_sensor0.start'], 1)
 
+    def test_streaming(self):
+        # feeding the decoder in pieces gives the same result as decoding everything at once
+        parameters, remaining, clean = inphase.decodeParameters(self.serial_dump)
+        for chunk_size in [1, 2, 10, 1000]:
+            decoder = inphase.ParameterDecoder()
+            p = dict()
+            c = bytearray()
+            for i in range(0, len(self.serial_dump), chunk_size):
+                parameters_found, clean_found = decoder.feed(self.serial_dump[i:i + chunk_size])
+                p.update(parameters_found)
+                c += clean_found
+            self.assertDictEqual(p, parameters)
+            self.assertEqual(c, clean)
+            self.assertEqual(decoder.remaining, remaining)
+
+    def test_streaming_split_line_end(self):
+        decoder = inphase.ParameterDecoder()
+        p, c = decoder.feed(b'test_key: 1234\r')
+        self.assertDictEqual(p, dict())
+        self.assertEqual(decoder.remaining, b'test_key: 1234\r')
+        p, c = decoder.feed(b'\nincompl')
+        self.assertDictEqual(p, {'test_key': 1234})
+        self.assertEqual(decoder.remaining, b'incompl')
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import inphase
+from inphase.yamlstream import iterYAMLList, countYAMLList, iterFieldLines, loadYAMLList
+
+import yaml
+import unittest
+import os
+import shutil
+import tempfile
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class UnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def helper_write(self, content):
+        path = os.path.join(self.temp_dir, 'experiment.yml')
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_experiments(self):
+        for name in ['measurement_data/experiment.yml', 'measurement_data/timestamped.yml', 'math_data/clean_sawtooth.yml']:
+            path = os.path.join(THIS_DIR, 'testdata', name)
+            with open(path) as f:
+                reference = yaml.safe_load(f)
+            for batch_size in [1, 1000, 10 ** 7]:
+                self.assertEqual(list(iterYAMLList(path, batch_size=batch_size)), reference)
+            self.assertEqual(countYAMLList(path), len(reference))
+
+    def test_formats(self):
+        # comments and document markers in front of the list, a flow style list and empty files
+        contents = [
+            '# comment\n---\n- a: 1\n  b: [1, 2]\n-\n  a: 2\n- 3\n',
+            '[{a: 1}, {a: 2}]\n',
+            '',
+            '# only a comment\n',
+        ]
+        for content in contents:
+            path = self.helper_write(content)
+            reference = yaml.safe_load(content) or list()
+            self.assertEqual(list(iterYAMLList(path, batch_size=1)), reference)
+            self.assertEqual(countYAMLList(path), len(reference))
+
+    def test_fields(self):
+        for name in ['measurement_data/experiment.yml', 'measurement_data/timestamped.yml', 'math_data/clean_sawtooth.yml']:
+            path = os.path.join(THIS_DIR, 'testdata', name)
+            with open(path) as f:
+                reference = yaml.safe_load(f)
+            for fields in [{'timestamp', 'reflector'}, {'dqi'}, {'samples'}, {'initiator', 'samples', 'real_nlos'}, set()]:
+                with open(path) as f:
+                    data = yaml.safe_load(''.join(iterFieldLines(f, fields)))
+                self.assertEqual(data, [{k: v for k, v in m.items() if k in fields} or None for m in reference])
+
+        # other layouts are passed through
+        content = '# comment\n---\n- {a: 1, b: 2}\n-   a: 1\n    b:\n    - 1\n    c: |\n      text\n\n      b: 3\n  # comment\n'
+        data = yaml.safe_load(''.join(iterFieldLines(content.splitlines(True), {'a', 'c'})))
+        self.assertEqual(data, [{'a': 1, 'b': 2}, {'a': 1, 'c': 'text\n\nb: 3\n'}])
+
+    def test_parallel(self):
+        for name in ['measurement_data/experiment.yml', 'measurement_data/timestamped.yml', 'math_data/clean_sawtooth.yml']:
+            path = os.path.join(THIS_DIR, 'testdata', name)
+            with open(path) as f:
+                reference = yaml.safe_load(f)
+            for split_size in [1, 1000, 10 ** 7]:
+                self.assertEqual(loadYAMLList(path, processes=2, split_size=split_size), reference)
+            self.assertEqual(loadYAMLList(path, processes=2, fields=['dqi'], split_size=1), [{'dqi': m['dqi']} for m in reference])
+
+        for content in ['# comment\n---\n- a: 1\n  b:\n  - 1\n-\n  a: 2\n- -- a\n', '[{a: 1}, {a: 2}]\n', '']:
+            path = self.helper_write(content)
+            self.assertEqual(loadYAMLList(path, processes=2, split_size=1), yaml.safe_load(content) or list())
+
+        with self.assertRaises(Exception):
+            loadYAMLList(os.path.join(THIS_DIR, 'testdata/measurement_data/experiment_bad.yml'), processes=2, split_size=1)
+
+    def test_parallel_experiment(self):
+        path = os.path.join(THIS_DIR, 'testdata/math_data/clean_sawtooth.yml')
+        reference = inphase.Experiment(path, caching=False).measurements
+        e = inphase.Experiment(path, caching=False, processes=2)
+        self.assertEqual(e.measurements, reference)
+        self.assertIsInstance(e.measurements[0], inphase.Measurement)
+
+        path = self.helper_write('- {dqi: 1}\n- {dqi: string}\n')
+        with self.assertRaises(Exception):
+            inphase.Experiment(path, caching=False, processes=2)
+
+    def test_no_list(self):
+        with self.assertRaises(Exception):
+            list(iterYAMLList(os.path.join(THIS_DIR, 'testdata/measurement_data/experiment_bad.yml')))
+
+    def test_lazy_experiment(self):
+        path = os.path.join(THIS_DIR, 'testdata/measurement_data/timestamped.yml')
+        reference = inphase.Experiment(path, caching=False).measurements
+
+        e = inphase.Experiment(path, lazy=True)
+        self.assertEqual(e.measurements, list())
+        self.assertEqual(len(e), len(reference))
+        self.assertEqual(list(e), reference)
+        self.assertIsInstance(next(e.iterMeasurements()), inphase.Measurement)
+
+        # appending to a lazy experiment
+        path = os.path.join(self.temp_dir, 'new.yml')
+        e = inphase.Experiment(path, lazy=True)
+        self.assertEqual(len(e), 0)
+        e.addMeasurements(reference)
+        self.assertEqual(e.measurements, list())
+        self.assertEqual(list(e), reference)
+
+
+if __name__ == "__main__":
+    unittest.main()